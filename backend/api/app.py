@@ -0,0 +1,162 @@
+import argparse
+import inspect
+import json
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlencode
+
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import JSONResponse, Response
+from starlette.concurrency import run_in_threadpool
+
+from api.cache import CachedResponse, ResponseCache
+from graph.backend import GraphBackend
+
+if TYPE_CHECKING:
+    from graph.async_kg_manager import AsyncKnowledgeGraphManager
+
+MAX_DEPTH = 3
+MAX_LIMIT = 1000
+
+
+def _serialize(payload: Any) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def _cache_key(request: Request) -> str:
+    """Request path with sorted query parameters, so equivalent URLs share an entry."""
+    query = sorted(request.query_params.multi_items())
+    return request.url.path + ('?' + urlencode(query) if query else '')
+
+
+async def _call(method: Callable, *args) -> Any:
+    """Await a coroutine method directly; run a blocking one in the thread pool."""
+    if inspect.iscoroutinefunction(method):
+        return await method(*args)
+    return await run_in_threadpool(method, *args)
+
+
+def create_app(backend: Union[GraphBackend, 'AsyncKnowledgeGraphManager'], cache_size: int = 10000,
+               cache_ttl: float = 30.0, close_backend: bool = False) -> FastAPI:
+    """
+    Create the graph query API.
+
+    Blocking backends run in the thread pool while the event loop keeps
+    serving; an async backend such as ``AsyncKnowledgeGraphManager`` is
+    awaited directly, so concurrent requests are not limited by the number
+    of threads. All requests share the backend's connection pool.
+    Responses are serialized once, cached in-process for ``cache_ttl``
+    seconds and sent with an ETag and Cache-Control header.
+
+    Args:
+        backend: Graph backend (or async manager) shared by all requests
+        cache_size: Maximum number of cached responses (0 disables caching)
+        cache_ttl: Seconds a cached response stays valid
+        close_backend: If True, close the backend on shutdown
+
+    Returns:
+        FastAPI application
+    """
+    cache = ResponseCache(cache_size, cache_ttl)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        yield
+        if close_backend:
+            await _call(backend.close)
+
+    app = FastAPI(title="Synapse Knowledge Graph API", lifespan=lifespan)
+    app.state.backend = backend
+    app.state.cache = cache
+
+    async def respond(request: Request, compute: Callable[[], Awaitable[Tuple[int, Any]]]) -> Response:
+        async def run() -> Tuple[int, bytes]:
+            status_code, payload = await compute()
+            return status_code, _serialize(payload)
+
+        entry: CachedResponse = await cache.get_or_compute(_cache_key(request), run)
+        headers = {'ETag': entry.etag, 'Cache-Control': f'public, max-age={int(cache.ttl)}'}
+        if request.headers.get('if-none-match') == entry.etag:
+            return Response(status_code=304, headers=headers)
+        return Response(entry.body, status_code=entry.status_code, headers=headers,
+                        media_type='application/json')
+
+    def not_found(node_id: str) -> Tuple[int, Dict]:
+        return 404, {'detail': f'Node {node_id} not found'}
+
+    @app.get('/health')
+    async def health():
+        return JSONResponse({'status': 'ok', 'cache': cache.stats()})
+
+    @app.get('/nodes/{node_id}')
+    async def get_node(request: Request, node_id: str):
+        async def compute():
+            entity = await _call(backend.get_entity, node_id)
+            return (200, entity) if entity is not None else not_found(node_id)
+        return await respond(request, compute)
+
+    @app.get('/nodes/{node_id}/neighborhood')
+    async def get_neighborhood(request: Request, node_id: str,
+                               depth: int = Query(1, ge=0, le=MAX_DEPTH),
+                               rel_type: Optional[List[str]] = Query(None),
+                               limit_per_hop: int = Query(100, ge=1, le=MAX_LIMIT)):
+        async def compute():
+            neighborhood = await _call(backend.get_neighborhood, node_id, depth, rel_type, limit_per_hop)
+            return (200, neighborhood) if neighborhood is not None else not_found(node_id)
+        return await respond(request, compute)
+
+    @app.get('/nodes/{node_id}/children')
+    async def get_children(request: Request, node_id: str, rel_type: Optional[str] = None,
+                           limit: int = Query(100, ge=1, le=MAX_LIMIT)):
+        async def compute():
+            relationships = [r for r in await _call(backend.get_relationships, node_id, rel_type)
+                             if r['source_id'] == node_id][:limit]
+            if not relationships and await _call(backend.get_entity, node_id) is None:
+                return not_found(node_id)
+            nodes = await _call(backend.get_entities, [r['target_id'] for r in relationships])
+            return 200, {
+                'id': node_id,
+                'children': [{'type': r['type'], 'properties': r['properties'],
+                              'node': nodes.get(r['target_id'], {'id': r['target_id']})}
+                             for r in relationships]
+            }
+        return await respond(request, compute)
+
+    @app.get('/search')
+    async def search(request: Request, label: Optional[str] = None, name: Optional[str] = None,
+                     ner_type: Optional[str] = None, limit: int = Query(100, ge=1, le=MAX_LIMIT),
+                     after: Optional[str] = None):
+        properties = {key: value for key, value in (('name', name), ('ner_type', ner_type)) if value is not None}
+
+        async def compute():
+            entities, cursor = await _call(backend.search_entities_page, label, properties or None,
+                                           None, limit, after)
+            return 200, {'results': entities, 'next': cursor}
+        return await respond(request, compute)
+
+    return app
+
+
+def main():
+    import uvicorn
+    from config import load_config
+    from graph.async_kg_manager import AsyncKnowledgeGraphManager
+
+    parser = argparse.ArgumentParser(description="Serve the knowledge graph query API")
+    parser.add_argument('--env', default='development', help="Configuration environment")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+
+    config = load_config(args.env)
+    api_config = config.get('api', {})
+    app = create_app(
+        AsyncKnowledgeGraphManager.from_config(config),
+        cache_size=api_config.get('cache_size', 10000),
+        cache_ttl=api_config.get('cache_ttl', 30.0),
+        close_backend=True
+    )
+    uvicorn.run(app, host=args.host, port=args.port)
+
+if __name__ == '__main__':
+    main()
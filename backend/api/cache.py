@@ -0,0 +1,111 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+
+class CachedResponse:
+    """Serialized response body with its ETag."""
+
+    __slots__ = ('status_code', 'body', 'etag', 'expires')
+
+    def __init__(self, status_code: int, body: bytes, expires: float):
+        self.status_code = status_code
+        self.body = body
+        self.etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        self.expires = expires
+
+
+class ResponseCache:
+    """
+    In-process LRU cache of serialized responses with a time-to-live.
+
+    Concurrent misses for the same key share one computation, so a burst of
+    requests for a hot node costs a single database query. Only used from
+    the event loop thread, so no locking is needed.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 30.0):
+        """
+        Args:
+            max_entries: Maximum number of cached responses
+            ttl: Seconds a response stays valid
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: 'OrderedDict[str, CachedResponse]' = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, status_code: int, body: bytes) -> CachedResponse:
+        entry = CachedResponse(status_code, body, time.monotonic() + self.ttl)
+        if self.max_entries > 0:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    async def get_or_compute(self, key: str,
+                             compute: Callable[[], Awaitable[Tuple[int, bytes]]]) -> CachedResponse:
+        """
+        Return the cached response for ``key`` or compute and cache it.
+
+        Args:
+            key: Cache key (normalized request path and query)
+            compute: Coroutine function returning (status code, body)
+
+        Returns:
+            CachedResponse
+        """
+        entry = self.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.hits += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            status_code, body = await compute()
+            entry = self.put(key, status_code, body)
+            future.set_result(entry)
+            return entry
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an unobserved failure does not log a warning
+            future.exception()
+            raise
+        finally:
+            del self._pending[key]
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
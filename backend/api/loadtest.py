@@ -0,0 +1,153 @@
+import argparse
+import asyncio
+import inspect
+import random
+import statistics
+import time
+from collections import Counter
+from typing import Dict, List
+
+import httpx
+
+from api.app import create_app
+from graph.backend import GraphBackend
+
+
+def build_synthetic_graph(num_nodes: int = 10000, avg_degree: int = 8, seed: int = 0) -> GraphBackend:
+    """
+    Build an in-process stand-in graph with a skewed degree distribution.
+
+    Args:
+        num_nodes: Number of entities
+        avg_degree: Average number of outgoing relationships per entity
+        seed: Random seed
+
+    Returns:
+        Populated EmbeddedGraphBackend
+    """
+    from graph.embedded_backend import EmbeddedGraphBackend
+
+    rng = random.Random(seed)
+    backend = EmbeddedGraphBackend()
+    backend.add_entities([{'id': f'E{i}', 'type': 'Entity', 'name': f'Entity {i}', 'ner_type': 'MISC'}
+                          for i in range(num_nodes)])
+    relationships = []
+    for i in range(num_nodes):
+        for _ in range(rng.randint(0, 2 * avg_degree)):
+            # Low IDs are hubs
+            target = min(int(rng.paretovariate(1.2)) - 1, num_nodes - 1)
+            if target != i:
+                relationships.append({'source_id': f'E{i}', 'target_id': f'E{target}', 'type': 'RELATED_TO',
+                                      'properties': {'score': rng.random()}})
+    backend.add_relationships(relationships)
+    return backend
+
+
+def make_paths(num_nodes: int, count: int, skew: float, seed: int = 0) -> List[str]:
+    """Generate a request mix whose node popularity follows a power law."""
+    rng = random.Random(seed)
+    paths = []
+    for _ in range(count):
+        node = f'E{min(int(rng.paretovariate(skew)) - 1, num_nodes - 1)}'
+        kind = rng.random()
+        if kind < 0.5:
+            paths.append(f'/nodes/{node}')
+        elif kind < 0.8:
+            paths.append(f'/nodes/{node}/neighborhood?depth={rng.choice((1, 1, 2))}')
+        elif kind < 0.95:
+            paths.append(f'/nodes/{node}/children')
+        else:
+            paths.append(f'/search?limit=50&after=E{rng.randrange(num_nodes)}')
+    return paths
+
+
+async def run_load(client: httpx.AsyncClient, paths: List[str], concurrency: int) -> Dict:
+    """
+    Issue the requests with a fixed number of concurrent clients.
+
+    Returns:
+        Dictionary with latency percentiles (ms), requests/sec and status counts
+    """
+    latencies = []
+    statuses = Counter()
+    queue = iter(paths)
+
+    async def client_loop():
+        for path in queue:
+            start = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'requests_per_sec': len(latencies) / elapsed,
+        'p50_ms': 1000 * statistics.median(latencies),
+        'p99_ms': 1000 * latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))],
+        'statuses': dict(statuses)
+    }
+
+
+async def main_async(args) -> None:
+    paths = make_paths(args.nodes, args.requests, args.skew)
+    if args.url:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30.0) as client:
+            result = await run_load(client, paths, args.concurrency)
+        print(_format(result))
+        return
+
+    if args.neo4j and args.async_driver:
+        from config import load_config
+        from graph.async_kg_manager import AsyncKnowledgeGraphManager
+        backend = AsyncKnowledgeGraphManager.from_config(load_config(args.env))
+    elif args.neo4j:
+        from config import load_config
+        from graph.kg_manager import KnowledgeGraphManager
+        backend = KnowledgeGraphManager.from_config(load_config(args.env))
+    else:
+        backend = build_synthetic_graph(args.nodes, args.degree)
+
+    try:
+        for cache_size in ([args.cache_size] if args.cache_size else [10000]) + ([0] if args.compare else []):
+            app = create_app(backend, cache_size=cache_size, cache_ttl=args.ttl)
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url='http://loadtest') as client:
+                result = await run_load(client, paths, args.concurrency)
+            label = f'cache={cache_size}'
+            print(f'{label}: {_format(result)}  cache {app.state.cache.stats()}')
+    finally:
+        closed = backend.close()
+        if inspect.isawaitable(closed):
+            await closed
+
+
+def _format(result: Dict) -> str:
+    return (f"{result['requests']} requests, {result['requests_per_sec']:.0f} req/s, "
+            f"p50 {result['p50_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms, statuses {result['statuses']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the graph query API")
+    parser.add_argument('--url', help="Test a running server instead of an in-process app")
+    parser.add_argument('--neo4j', action='store_true', help="Serve from Neo4j instead of a synthetic graph")
+    parser.add_argument('--async-driver', action='store_true',
+                        help="With --neo4j, serve from AsyncKnowledgeGraphManager")
+    parser.add_argument('--env', default='development', help="Configuration environment for --neo4j")
+    parser.add_argument('--nodes', type=int, default=10000, help="Nodes in the synthetic graph / ID range")
+    parser.add_argument('--degree', type=int, default=8, help="Average out-degree of the synthetic graph")
+    parser.add_argument('--requests', type=int, default=5000, help="Total number of requests")
+    parser.add_argument('--concurrency', type=int, default=32, help="Concurrent clients")
+    parser.add_argument('--skew', type=float, default=1.1, help="Power-law exponent of node popularity")
+    parser.add_argument('--cache-size', type=int, default=0, help="Response cache size (default 10000)")
+    parser.add_argument('--ttl', type=float, default=30.0, help="Response cache TTL in seconds")
+    parser.add_argument('--compare', action='store_true', help="Also run with the cache disabled")
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+from starlette.requests import Request
+
+from api.app import _cache_key
+from api.cache import ResponseCache
+
+
+def _body(value):
+    async def compute():
+        return 200, value
+    return compute
+
+
+def test_hit_after_miss_and_etag_follows_body():
+    async def scenario():
+        cache = ResponseCache()
+        first = await cache.get_or_compute('/a', _body(b'one'))
+        second = await cache.get_or_compute('/a', _body(b'two'))
+        other = await cache.get_or_compute('/b', _body(b'two'))
+        return cache, first, second, other
+
+    cache, first, second, other = asyncio.run(scenario())
+    assert second is first and first.body == b'one'
+    assert other.etag != first.etag
+    assert cache.stats() == {'entries': 2, 'hits': 1, 'misses': 2, 'hit_rate': 1 / 3}
+
+
+def test_concurrent_misses_share_one_computation():
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 200, b'node'
+
+    async def scenario():
+        cache = ResponseCache()
+        return cache, await asyncio.gather(*(cache.get_or_compute('/hot', slow) for _ in range(10)))
+
+    cache, entries = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert all(entry is entries[0] for entry in entries)
+    assert (cache.hits, cache.misses) == (9, 1)
+
+
+def test_failed_computation_is_not_cached():
+    async def fail():
+        raise RuntimeError("database down")
+
+    async def scenario():
+        cache = ResponseCache()
+        waiters = [cache.get_or_compute('/x', fail) for _ in range(3)]
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        retry = await cache.get_or_compute('/x', _body(b'ok'))
+        return results, retry
+
+    results, retry = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert retry.body == b'ok'
+
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('api.cache.time.monotonic', lambda: now[0])
+    cache = ResponseCache(ttl=30)
+    cache.put('/a', 200, b'old')
+    now[0] += 29
+    assert cache.get('/a').body == b'old'
+    now[0] += 2
+    assert cache.get('/a') is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.put('/a', 200, b'a')
+    cache.put('/b', 200, b'b')
+    cache.get('/a')
+    cache.put('/c', 200, b'c')
+    assert cache.get('/b') is None
+    assert cache.get('/a') is not None and cache.get('/c') is not None
+
+    disabled = ResponseCache(max_entries=0)
+    assert disabled.put('/a', 200, b'a').body == b'a'
+    assert len(disabled) == 0
+
+
+def _request(path, query):
+    return Request({'type': 'http', 'method': 'GET', 'path': path, 'query_string': query.encode(), 'headers': []})
+
+
+@pytest.mark.parametrize('first,second,same', [
+    ('depth=2&limit=5', 'limit=5&depth=2', True),
+    ('q=a%26b%3Dc', 'q=a&b=c', False),
+    ('', '', True),
+])
+def test_cache_key_normalizes_query_order_only(first, second, same):
+    assert (_cache_key(_request('/nodes/x', first)) == _cache_key(_request('/nodes/x', second))) == same
@@ -0,0 +1,220 @@
+import argparse
+import html
+import json
+import multiprocessing as mp
+import os
+import re
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data_processing'))
+
+from synthetic_dump import DumpSpec, generate_dump  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'data_processing.json')
+
+textRE = re.compile(r'<text[^>]*>(.*?)</text>', re.S)
+
+
+def load_articles(xml_path):
+    """Unescaped wikitext of every main-namespace article that is not a redirect."""
+    with open(xml_path, 'r', encoding='utf-8') as f:
+        pages = f.read().split('<page>')[1:]
+    return [html.unescape(textRE.search(page).group(1)) for page in pages
+            if '<ns>0</ns>' in page and '<redirect' not in page]
+
+
+def bench_collect_pages(paths, workdir, source='xml'):
+    from collectPages import collect_pages
+    os.chdir(workdir)  # collect_pages writes next to the working directory
+    start = time.perf_counter()
+    collect_pages(paths[source])
+    elapsed = time.perf_counter() - start
+    output = os.path.splitext(os.path.basename(paths[source]))[0] + '_pages.jsonl'
+    with open(output, 'r', encoding='utf-8') as f:
+        pages = sum(1 for _ in f)
+    return elapsed, pages, os.path.getsize(paths[source])
+
+
+def bench_collect_pages_bz2(paths, workdir):
+    return bench_collect_pages(paths, workdir, 'multistream')
+
+
+def bench_process_chunk(paths, workdir):
+    from processAllPages import process_chunk
+    size = os.path.getsize(paths['xml'])
+    output_dir = os.path.join(workdir, 'processed')
+    os.makedirs(output_dir, exist_ok=True)
+    start = time.perf_counter()
+    _, _, pages, _ = process_chunk((paths['xml'], 0, size, output_dir, 0, None, False, None, None))
+    return time.perf_counter() - start, pages, size
+
+
+def bench_clean_text(paths, workdir):
+    from extractPage import clean_text
+    articles = load_articles(paths['xml'])
+    start = time.perf_counter()
+    for text in articles:
+        clean_text(text)
+    return time.perf_counter() - start, len(articles), sum(len(text.encode('utf-8')) for text in articles)
+
+
+def bench_extract_sections(paths, workdir):
+    from extractPage import extract_sections
+    articles = load_articles(paths['xml'])
+    start = time.perf_counter()
+    for text in articles:
+        extract_sections(text)
+    return time.perf_counter() - start, len(articles), sum(len(text.encode('utf-8')) for text in articles)
+
+
+def bench_find_page_position(paths, workdir, lookups=20):
+    """Look up pages spread evenly over the dump; bytes are the offsets scanned up to each page."""
+    from extractPage import find_page_position
+    with open(paths['xml'], 'r', encoding='utf-8') as f:
+        ids = re.findall(r'<page>\s*<title>[^<]*</title>\s*<ns>\d+</ns>\s*<id>(\d+)</id>', f.read())
+    targets = [ids[i * (len(ids) - 1) // max(lookups - 1, 1)] for i in range(min(lookups, len(ids)))]
+    start = time.perf_counter()
+    scanned = sum(find_page_position(paths['xml'], page_id) for page_id in targets)
+    return time.perf_counter() - start, len(targets), scanned
+
+
+BENCHMARKS = {
+    'collect_pages': bench_collect_pages,
+    'collect_pages_bz2': bench_collect_pages_bz2,
+    'process_chunk': bench_process_chunk,
+    'clean_text': bench_clean_text,
+    'extract_sections': bench_extract_sections,
+    'find_page_position': bench_find_page_position,
+}
+
+
+def _child(name, paths, workdir, results):
+    # Silence progress bars and per-call prints from the scripts
+    sys.stdout = sys.stderr = open(os.devnull, 'w')
+    elapsed, pages, size = BENCHMARKS[name](paths, workdir)
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((elapsed, pages, size, peak_kb))
+
+
+def run_benchmark(name, paths, repeat=3):
+    """
+    Run a benchmark in fresh processes so peak RSS is its own.
+
+    Returns:
+        Dict with pages_per_sec and mb_per_sec of the fastest run and the
+        largest peak_rss_mb
+    """
+    context = mp.get_context('spawn')
+    best, peak_kb = None, 0
+    for _ in range(repeat):
+        workdir = tempfile.mkdtemp(prefix=f'bench_{name}_')
+        results = context.Queue()
+        process = context.Process(target=_child, args=(name, paths, workdir, results))
+        process.start()
+        elapsed, pages, size, peak = results.get()
+        process.join()
+        shutil.rmtree(workdir, ignore_errors=True)
+        if best is None or elapsed < best[0]:
+            best = (elapsed, pages, size)
+        peak_kb = max(peak_kb, peak)
+    elapsed, pages, size = best
+    return {
+        'seconds': elapsed,
+        'pages': pages,
+        'pages_per_sec': pages / max(elapsed, 1e-9),
+        'mb_per_sec': size / 1024 / 1024 / max(elapsed, 1e-9),
+        'peak_rss_mb': peak_kb / 1024
+    }
+
+
+def prepare_dump(dump_dir, spec):
+    """Generate the dump, or reuse one generated earlier from the same spec."""
+    spec_file = os.path.join(dump_dir, 'spec.json')
+    paths = {'xml': os.path.join(dump_dir, 'synthwiki.xml'),
+             'multistream': os.path.join(dump_dir, 'synthwiki-multistream.xml.bz2'),
+             'index': os.path.join(dump_dir, 'synthwiki-multistream-index.txt.bz2')}
+    if os.path.exists(spec_file) and all(os.path.exists(path) for path in paths.values()):
+        with open(spec_file, 'r', encoding='utf-8') as f:
+            if json.load(f) == spec.to_dict():
+                return paths
+    paths = generate_dump(dump_dir, spec)
+    with open(spec_file, 'w', encoding='utf-8') as f:
+        json.dump(spec.to_dict(), f)
+    return paths
+
+
+def compare(results, baseline, tolerance):
+    """Return the regressions of ``results`` against ``baseline`` as messages."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if result['pages_per_sec'] < base['pages_per_sec'] * (1 - tolerance):
+            regressions.append(f"{name}: {result['pages_per_sec']:.1f} pages/s, "
+                               f"baseline {base['pages_per_sec']:.1f}")
+        if result['peak_rss_mb'] > base['peak_rss_mb'] * (1 + tolerance):
+            regressions.append(f"{name}: peak RSS {result['peak_rss_mb']:.0f} MiB, "
+                               f"baseline {base['peak_rss_mb']:.0f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the data-processing scripts on a synthetic dump")
+    parser.add_argument('--pages', type=int, default=2000, help="Pages in the synthetic dump")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed of the dump")
+    parser.add_argument('--mean-kb', type=float, default=8.0, help="Median article size in KiB")
+    parser.add_argument('--dump-dir', default=os.path.join(tempfile.gettempdir(), 'synthwiki_bench'),
+                        help="Where the dump is generated and reused from")
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), help="Run only these benchmarks")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per benchmark; the fastest counts")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline file")
+    parser.add_argument('--save-baseline', action='store_true', help="Store the results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="Allowed relative drop in pages/s or growth in peak RSS")
+    parser.add_argument('--json', help="Also write the results to this file")
+    args = parser.parse_args()
+
+    spec = DumpSpec(args.pages, args.seed, args.mean_kb)
+    paths = prepare_dump(args.dump_dir, spec)
+    print(f"Dump: {args.pages} pages, {os.path.getsize(paths['xml']) / 1024 / 1024:.1f} MiB "
+          f"({os.path.getsize(paths['multistream']) / 1024 / 1024:.1f} MiB multistream bz2)")
+
+    results = {}
+    for name in args.only or BENCHMARKS:
+        results[name] = result = run_benchmark(name, paths, args.repeat)
+        print(f"{name:>20}: {result['pages_per_sec']:10.1f} pages/s {result['mb_per_sec']:8.2f} MB/s "
+              f"peak RSS {result['peak_rss_mb']:6.0f} MiB")
+
+    report = {'spec': spec.to_dict(), 'results': results}
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare against; run with --save-baseline to store one")
+        return
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline['spec'] != spec.to_dict():
+        print("Baseline was recorded on a different dump; not comparing")
+        return
+    regressions = compare(results, baseline['results'], args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        sys.exit(1)
+    print("No regressions against the baseline")
+
+if __name__ == '__main__':
+    main()
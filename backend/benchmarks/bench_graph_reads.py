@@ -0,0 +1,203 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+READS = ('get_entity', 'get_neighborhood', 'get_relationships')
+
+
+class LatencyBackend:
+    """
+    Stand-in for ``KnowledgeGraphManager``: returns precomputed answers
+    after blocking for a simulated round-trip, and caps the queries in
+    flight at ``pool_size`` like the driver's connection pool.
+
+    Answers are computed up front so that only the round-trip, which the
+    server spends, is charged, not the in-process graph lookup.
+    """
+
+    def __init__(self, answers, latency, pool_size):
+        self.answers = answers
+        self.latency = latency
+        self._pool = threading.BoundedSemaphore(pool_size)
+
+    def read(self, method, entity_id):
+        with self._pool:
+            time.sleep(self.latency)
+            return self.answers[method][entity_id]
+
+    def close(self):
+        pass
+
+
+class AsyncLatencyBackend:
+    """
+    Stand-in for ``AsyncKnowledgeGraphManager``: the same answers and
+    simulated round-trip, awaited instead of slept, behind a semaphore of
+    ``max_concurrency``.
+    """
+
+    def __init__(self, answers, latency, max_concurrency):
+        self.answers = answers
+        self.latency = latency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def read(self, method, entity_id):
+        async with self._semaphore:
+            await asyncio.sleep(self.latency)
+            return self.answers[method][entity_id]
+
+    async def close(self):
+        pass
+
+
+class ManagerReads:
+    """Adapts the real managers to the ``read(method, *args)`` calls of the stand-ins."""
+
+    def __init__(self, manager):
+        self.manager = manager
+
+    def read(self, method, entity_id):
+        return getattr(self.manager, method)(entity_id)
+
+    def close(self):
+        return self.manager.close()
+
+
+def make_ids(entity_ids, count, skew, seed=0):
+    """Pick ``count`` IDs with power-law popularity, like the API load test."""
+    rng = random.Random(seed)
+    return [entity_ids[min(int(rng.paretovariate(skew)) - 1, len(entity_ids) - 1)] for _ in range(count)]
+
+
+def _summary(latencies, elapsed, threads):
+    latencies.sort()
+    return {
+        'reads': len(latencies),
+        'reads_per_sec': len(latencies) / elapsed,
+        'p50_ms': 1000 * statistics.median(latencies),
+        'p99_ms': 1000 * latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))],
+        'threads': threads
+    }
+
+
+async def run_thread_pool(backend, method, ids, concurrency):
+    """
+    The workaround for a blocking manager: each read runs in a worker thread.
+
+    Concurrency is the number of threads; latency includes waiting for one.
+    """
+    loop = asyncio.get_running_loop()
+    latencies = []
+
+    async def timed(entity_id):
+        start = time.perf_counter()
+        await loop.run_in_executor(executor, backend.read, method, entity_id)
+        latencies.append(time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        await asyncio.gather(*(timed(entity_id) for entity_id in ids))
+        elapsed = time.perf_counter() - start
+        threads = threading.active_count()
+    return _summary(latencies, elapsed, threads)
+
+
+async def run_async(backend, method, ids):
+    """
+    All reads are started at once with ``gather``; the manager's semaphore caps
+    how many are in flight. Latency includes waiting for the semaphore.
+    """
+    latencies = []
+
+    async def timed(entity_id):
+        start = time.perf_counter()
+        await backend.read(method, entity_id)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(timed(entity_id) for entity_id in ids))
+    elapsed = time.perf_counter() - start
+    return _summary(latencies, elapsed, threading.active_count())
+
+
+async def main_async(args):
+    ids = None
+    if args.neo4j:
+        from config import load_config
+        from graph.async_kg_manager import AsyncKnowledgeGraphManager
+        from graph.kg_manager import KnowledgeGraphManager
+        config = load_config(args.env)
+        sync_manager = KnowledgeGraphManager.from_config(config)
+        entity_ids = [entity['id'] for entity in sync_manager.iter_entities(fields=['id'], page_size=args.nodes)]
+        entity_ids = entity_ids[:args.nodes]
+        print(f"Neo4j at {config['database']['uri']}: {len(entity_ids)} entity IDs sampled")
+        make_sync = lambda concurrency: ManagerReads(sync_manager)  # noqa: E731
+        make_async = lambda concurrency: ManagerReads(AsyncKnowledgeGraphManager.from_config(  # noqa: E731
+            dict(config, database=dict(config['database'], max_concurrency=concurrency))))
+    else:
+        from api.loadtest import build_synthetic_graph
+        graph = build_synthetic_graph(args.nodes, args.degree)
+        ids = make_ids([f'E{i}' for i in range(args.nodes)], args.reads, args.skew)
+        answers = {method: {entity_id: getattr(graph, method)(entity_id) for entity_id in set(ids)}
+                   for method in args.methods}
+        print(f"Stand-in graph: {args.nodes} nodes, {1000 * args.latency:.1f} ms simulated round-trip, "
+              f"pool of {args.pool_size}")
+        make_sync = lambda concurrency: LatencyBackend(answers, args.latency, args.pool_size)  # noqa: E731
+        make_async = lambda concurrency: AsyncLatencyBackend(answers, args.latency, concurrency)  # noqa: E731
+
+    ids = ids or make_ids(entity_ids, args.reads, args.skew)
+    results = []
+    for method in args.methods:
+        for concurrency in args.concurrency:
+            backend = make_sync(concurrency)
+            threaded = await run_thread_pool(backend, method, ids, concurrency)
+            backend = make_async(concurrency)
+            try:
+                gathered = await run_async(backend, method, ids)
+            finally:
+                closed = backend.close()
+                if asyncio.iscoroutine(closed):
+                    await closed
+            for mode, result in (('thread_pool', threaded), ('async_gather', gathered)):
+                results.append(dict(result, method=method, concurrency=concurrency, mode=mode))
+                print(f"{method:>18} c={concurrency:<4} {mode:>12}: {result['reads_per_sec']:9.0f} reads/s, "
+                      f"p50 {result['p50_ms']:7.2f} ms, p99 {result['p99_ms']:7.2f} ms, "
+                      f"{result['threads']} threads")
+            print(f"{'':>18} c={concurrency:<4} {'speedup':>12}: "
+                  f"{gathered['reads_per_sec'] / threaded['reads_per_sec']:.2f}x")
+    if args.neo4j:
+        sync_manager.close()
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare concurrent graph reads: async manager with gather vs blocking manager in threads")
+    parser.add_argument('--neo4j', action='store_true',
+                        help="Read from the configured Neo4j instance instead of the stand-in")
+    parser.add_argument('--env', default='development', help="Configuration environment for --neo4j")
+    parser.add_argument('--nodes', type=int, default=10000, help="Nodes in the stand-in graph / IDs sampled")
+    parser.add_argument('--degree', type=int, default=8, help="Average out-degree of the stand-in graph")
+    parser.add_argument('--latency', type=float, default=0.002, help="Simulated round-trip of the stand-in (s)")
+    parser.add_argument('--pool-size', type=int, default=100, help="Connection pool of the stand-in")
+    parser.add_argument('--reads', type=int, default=5000, help="Reads per run")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[8, 40, 100],
+                        help="Threads of the pool / semaphore size of the async manager")
+    parser.add_argument('--methods', nargs='+', choices=READS, default=['get_entity'], help="Reads to run")
+    parser.add_argument('--skew', type=float, default=1.1, help="Power-law exponent of node popularity")
+    parser.add_argument('--json', help="Write the results to this file")
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == '__main__':
+    main()
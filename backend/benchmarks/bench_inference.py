@@ -0,0 +1,236 @@
+import argparse
+import json
+import math
+import os
+import random
+import re
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_dump import WORDS  # noqa: E402
+
+wordRE = re.compile(r'\w+')
+
+
+def synthetic_article(rng, mean_kb=6.0, sigma=0.8):
+    """Plain article text of log-normal size: sentences in paragraphs, sections separated by blank lines."""
+    target = int(1024 * mean_kb * math.exp(rng.gauss(0, sigma)))
+    sections, size = [], 0
+    while size < target:
+        paragraph = []
+        for _ in range(rng.randint(3, 8)):
+            words = [rng.choice(WORDS) for _ in range(rng.randint(8, 30))]
+            # Capitalized runs look like the names NER is run for
+            for i in range(0, len(words), rng.randint(4, 9)):
+                words[i] = words[i].capitalize()
+            sentence = ' '.join(words)
+            paragraph.append(sentence[0].upper() + sentence[1:] + '.')
+        sections.append(' '.join(paragraph))
+        size += len(sections[-1])
+    return '\n\n'.join(sections)
+
+
+def build_tokenizer(texts, vocab_size=4096):
+    """Train a small WordPiece tokenizer with BERT-style special tokens on local text."""
+    from tokenizers import Tokenizer, decoders, models, normalizers, pre_tokenizers, processors, trainers
+    from transformers import PreTrainedTokenizerFast
+
+    special = ['[PAD]', '[UNK]', '[CLS]', '[SEP]', '[MASK]']
+    tokenizer = Tokenizer(models.WordPiece(unk_token='[UNK]'))
+    tokenizer.normalizer = normalizers.BertNormalizer(lowercase=False)
+    tokenizer.pre_tokenizer = pre_tokenizers.BertPreTokenizer()
+    tokenizer.decoder = decoders.WordPiece()
+    tokenizer.train_from_iterator(texts, trainers.WordPieceTrainer(vocab_size=vocab_size, special_tokens=special))
+    cls_id, sep_id = tokenizer.token_to_id('[CLS]'), tokenizer.token_to_id('[SEP]')
+    tokenizer.post_processor = processors.TemplateProcessing(
+        single='[CLS] $A [SEP]', pair='[CLS] $A [SEP] $B:1 [SEP]:1',
+        special_tokens=[('[CLS]', cls_id), ('[SEP]', sep_id)]
+    )
+    return PreTrainedTokenizerFast(tokenizer_object=tokenizer, unk_token='[UNK]', pad_token='[PAD]',
+                                   cls_token='[CLS]', sep_token='[SEP]', mask_token='[MASK]')
+
+
+def build_tiny_checkpoint(output_dir, hidden_size=64, num_layers=2, num_heads=2, intermediate_size=128,
+                          max_positions=1024, seed=0):
+    """
+    Write a randomly initialized ModernBERT checkpoint and a local tokenizer.
+
+    Both model classes load it with ``from_pretrained(output_dir)``, so
+    nothing is downloaded. The weights are random; only speed and memory
+    are meaningful.
+    """
+    import torch
+    from transformers import AutoModel, ModernBertConfig
+
+    rng = random.Random(seed)
+    tokenizer = build_tokenizer([synthetic_article(rng) for _ in range(50)])
+    config = ModernBertConfig(
+        vocab_size=len(tokenizer),
+        hidden_size=hidden_size,
+        intermediate_size=intermediate_size,
+        num_hidden_layers=num_layers,
+        num_attention_heads=num_heads,
+        max_position_embeddings=max_positions,
+        pad_token_id=tokenizer.pad_token_id,
+        bos_token_id=tokenizer.cls_token_id,
+        eos_token_id=tokenizer.sep_token_id,
+        cls_token_id=tokenizer.cls_token_id,
+        sep_token_id=tokenizer.sep_token_id,
+        local_attention=min(128, max_positions)
+    )
+    torch.manual_seed(seed)
+    model = AutoModel.from_config(config)
+    model.save_pretrained(output_dir)
+    tokenizer.save_pretrained(output_dir)
+    return output_dir
+
+
+def sample_entities(rng, text, mean):
+    """Non-overlapping word spans of a segment, Poisson-distributed in number, in text order."""
+    words = [(m.start(), m.end()) for m in wordRE.finditer(text)]
+    count = min(len(words), int(rng.poisson(mean)))
+    picks = sorted(rng.choice(len(words), count, replace=False)) if count else []
+    return [{'text': text[words[i][0]:words[i][1]], 'type': 'MISC', 'start': words[i][0], 'end': words[i][1]}
+            for i in picks]
+
+
+class ForwardCounter:
+    """Counts forward passes of a model through a forward hook."""
+
+    def __init__(self, model):
+        self.calls = 0
+        self.handle = model.register_forward_hook(self._hook)
+
+    def _hook(self, module, inputs, output):
+        self.calls += 1
+
+
+def percentiles(values):
+    values = sorted(values)
+    pick = lambda q: values[min(len(values) - 1, int(q * len(values)))]  # noqa: E731
+    return {'p50_ms': 1000 * pick(0.5), 'p90_ms': 1000 * pick(0.9), 'p99_ms': 1000 * pick(0.99)}
+
+
+def run(ner, rel, preprocessor, articles, entities_per_segment, batch_size, seed=0):
+    """
+    Process the articles like ``WikipediaKGPipeline.process_article`` does, without the graph.
+
+    Relations are extracted between sampled entity spans rather than the
+    NER output, which is noise with random weights; this keeps the number
+    of relation forward passes realistic.
+
+    Returns:
+        Report dictionary
+    """
+    import torch
+
+    rng = np.random.default_rng(seed)
+    ner_counter, rel_counter = ForwardCounter(ner.model), ForwardCounter(rel.model)
+    timings = {'segment': [], 'ner': [], 'relation': [], 'article': []}
+    forward_passes = {'ner': [], 'relation': []}
+    tokens = segments_total = 0
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+
+    for text in articles:
+        ner_calls, rel_calls = ner_counter.calls, rel_counter.calls
+        t0 = time.perf_counter()
+        segments = preprocessor.split_into_segments(preprocessor.clean_text(text))
+        t1 = time.perf_counter()
+        ner.predict_encoded(segments, batch_size=batch_size)
+        t2 = time.perf_counter()
+        for segment in segments:
+            entities = sample_entities(rng, segment['text'], entities_per_segment)
+            rel.extract_relationships_encoded(segment, [
+                dict(entity, start=entity['start'] + segment['start'], end=entity['end'] + segment['start'])
+                for entity in entities
+            ])
+        t3 = time.perf_counter()
+
+        timings['segment'].append(t1 - t0)
+        timings['ner'].append(t2 - t1)
+        timings['relation'].append(t3 - t2)
+        timings['article'].append(t3 - t0)
+        forward_passes['ner'].append(ner_counter.calls - ner_calls)
+        forward_passes['relation'].append(rel_counter.calls - rel_calls)
+        tokens += sum(len(segment['input_ids']) for segment in segments)
+        segments_total += len(segments)
+
+    elapsed = time.perf_counter() - start
+    report = {
+        'articles': len(articles),
+        'segments': segments_total,
+        'tokens': tokens,
+        'articles_per_sec': len(articles) / elapsed,
+        'tokens_per_sec': tokens / elapsed,
+        'latency': {stage: percentiles(values) for stage, values in timings.items()},
+        'forward_passes_per_article': {stage: sum(calls) / len(calls) for stage, calls in forward_passes.items()},
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'rss_growth_mb': (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024
+    }
+    if torch.cuda.is_available():
+        report['peak_cuda_mb'] = torch.cuda.max_memory_allocated() / 1024 / 1024
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark NER and relation extraction offline")
+    parser.add_argument('--model', help="Local checkpoint directory (default: a tiny random ModernBERT)")
+    parser.add_argument('--hidden-size', type=int, default=64, help="Hidden size of the tiny model")
+    parser.add_argument('--layers', type=int, default=2, help="Layers of the tiny model")
+    parser.add_argument('--heads', type=int, default=2, help="Attention heads of the tiny model")
+    parser.add_argument('--articles', type=int, default=20, help="Number of synthetic articles")
+    parser.add_argument('--mean-kb', type=float, default=6.0, help="Median article size in KiB")
+    parser.add_argument('--entities-per-segment', type=float, default=4.0,
+                        help="Mean number of entities per segment for relation extraction")
+    parser.add_argument('--max-tokens', type=int, default=512, help="Token budget per segment")
+    parser.add_argument('--batch-size', type=int, default=8, help="Segments per NER forward pass")
+    parser.add_argument('--threads', type=int, help="Pin to this many cores and torch threads")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed")
+    parser.add_argument('--json', help="Write the report to this file")
+    args = parser.parse_args()
+
+    if args.threads:
+        from data_processing.resource_governor import available_cores, configure_inference_threads
+        configure_inference_threads(available_cores()[:args.threads])
+
+    from data_processing.text_preprocessor import TextPreprocessor
+    from models.bert_ner import BERTNamedEntityRecognizer
+    from models.bert_rel import ENTITY_MARKERS, BERTRelationshipExtractor
+
+    model_dir = args.model
+    if model_dir is None:
+        model_dir = build_tiny_checkpoint(tempfile.mkdtemp(prefix='tiny_modernbert_'), args.hidden_size,
+                                          args.layers, args.heads, 2 * args.hidden_size,
+                                          max_positions=max(args.max_tokens, 512), seed=args.seed)
+    ner = BERTNamedEntityRecognizer(model_name=model_dir, max_length=args.max_tokens)
+    rel = BERTRelationshipExtractor(model_name=model_dir, max_length=args.max_tokens)
+    # Room for the relation extractor's entity markers, as in WikipediaKGPipeline
+    preprocessor = TextPreprocessor(tokenizer=ner.tokenizer, max_tokens=args.max_tokens - len(ENTITY_MARKERS))
+
+    rng = random.Random(args.seed)
+    articles = [synthetic_article(rng, args.mean_kb) for _ in range(args.articles)]
+    report = run(ner, rel, preprocessor, articles, args.entities_per_segment, args.batch_size, args.seed)
+    report['model'] = args.model or f'tiny ModernBERT ({args.hidden_size}d, {args.layers} layers)'
+
+    print(f"{report['model']}: {report['articles']} articles, {report['segments']} segments, "
+          f"{report['tokens']} tokens")
+    print(f"Throughput: {report['articles_per_sec']:.2f} articles/s, {report['tokens_per_sec']:.0f} tokens/s")
+    for stage, latency in report['latency'].items():
+        print(f"{stage:>10}: p50 {latency['p50_ms']:.1f} ms, p90 {latency['p90_ms']:.1f} ms, "
+              f"p99 {latency['p99_ms']:.1f} ms per article")
+    passes = report['forward_passes_per_article']
+    print(f"Forward passes per article: {passes['ner']:.1f} NER, {passes['relation']:.1f} relation")
+    print(f"Peak RSS {report['peak_rss_mb']:.0f} MiB (+{report['rss_growth_mb']:.0f} MiB while running)")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data_processing'))
+
+from extractPage import clean_section_text, extract_sections  # noqa: E402
+from processAllPages import process_page_content, serialize_page  # noqa: E402
+
+WORDS = ('the', 'history', 'of', 'physics', 'relativity', 'quantum', 'theory', 'was', 'published',
+         'in', 'university', 'research', 'field', 'experiment', 'energy', 'light', 'Einstein')
+
+
+def synthetic_page(page_id, sections=40, subsections=3, paragraphs=4, rng=None):
+    """Build the XML lines of a large synthetic article with links, refs and URLs."""
+    rng = rng or random.Random(page_id)
+
+    def paragraph():
+        words = [rng.choice(WORDS) for _ in range(rng.randint(60, 120))]
+        for i in range(0, len(words), 15):
+            words[i] = f'[[{words[i].capitalize()} {rng.randint(1, 500)}|{words[i]}]]'
+        words.append(f'&lt;ref&gt;Source {rng.randint(1, 99)}&lt;/ref&gt; see https://example.org/{rng.randint(1, 9999)}')
+        return ' '.join(words) + '.\n'
+
+    lines = ['  <page>\n', f'    <title>Synthetic {page_id}</title>\n', '    <ns>0</ns>\n',
+             f'    <id>{page_id}</id>\n', '    <revision>\n', '      <text xml:space="preserve">']
+    lines.extend(paragraph() for _ in range(paragraphs))
+    for s in range(sections):
+        lines.append(f'== Section {s} ==\n')
+        lines.extend(paragraph() for _ in range(paragraphs))
+        for sub in range(subsections):
+            lines.append(f'=== Subsection {s}.{sub} ===\n')
+            lines.extend(paragraph() for _ in range(paragraphs))
+    lines.extend(['</text>\n', '    </revision>\n', '  </page>\n'])
+    return lines
+
+
+def read_dump_pages(dump_file, max_pages):
+    """Yield the lines of the first ``max_pages`` pages of an XML dump."""
+    page, count = None, 0
+    with open(dump_file, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            if '<page>' in line:
+                page = [line]
+            elif page is not None:
+                page.append(line)
+                if '</page>' in line:
+                    yield page
+                    page, count = None, count + 1
+                    if count >= max_pages:
+                        return
+
+
+def legacy_record(page_content):
+    """The dict-based path process_all_pages used before the slotted records."""
+    page_data = {"id": None, "title": None, "namespace": "0", "sections": []}
+    raw_sections = extract_sections(''.join(page_content))
+    page_data["sections"] = clean_section_text(raw_sections)
+    return (json.dumps(page_data, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+def slotted_record(page_content):
+    page = process_page_content(page_content)
+    return serialize_page(page) if page else None
+
+
+def measure(func, pages):
+    """Return (mean peak KiB, max peak KiB, mean ms) per page."""
+    peaks, elapsed = [], 0.0
+    for page in pages:
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        func(page)
+        elapsed += time.perf_counter() - start
+        peaks.append(tracemalloc.get_traced_memory()[1] / 1024)
+        tracemalloc.stop()
+    return sum(peaks) / len(peaks), max(peaks), 1000 * elapsed / len(pages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-page allocation of the page processing path")
+    parser.add_argument('--dump', help="XML dump to take pages from (default: synthetic articles)")
+    parser.add_argument('--pages', type=int, default=20, help="Number of pages")
+    parser.add_argument('--sections', type=int, default=40, help="Sections per synthetic page")
+    args = parser.parse_args()
+
+    if args.dump:
+        pages = list(read_dump_pages(args.dump, args.pages))
+    else:
+        pages = [synthetic_page(i, args.sections) for i in range(1, args.pages + 1)]
+    size = sum(len(''.join(page).encode('utf-8')) for page in pages) / len(pages) / 1024
+    print(f"{len(pages)} pages, {size:.0f} KiB of wikitext per page")
+
+    for name, func in (('dicts (before)', legacy_record), ('slotted records', slotted_record)):
+        mean_peak, max_peak, ms = measure(func, pages)
+        print(f"{name:>16}: peak {mean_peak:8.0f} KiB/page (max {max_peak:.0f}), {ms:.1f} ms/page")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+import argparse
+import bz2
+import contextlib
+import math
+import os
+import random
+from xml.sax.saxutils import escape, quoteattr
+
+WORDS = ('the', 'history', 'of', 'physics', 'relativity', 'quantum', 'theory', 'was', 'published',
+         'in', 'university', 'research', 'field', 'experiment', 'energy', 'light', 'river', 'city',
+         'population', 'century', 'war', 'king', 'music', 'album', 'species', 'island', 'church',
+         'school', 'railway', 'football', 'election', 'party', 'government', 'language', 'Einstein')
+
+# Namespace weights of a typical English dump, restricted to the ones the scripts distinguish
+NAMESPACES = {0: 0.70, 14: 0.12, 10: 0.08, 4: 0.04, 6: 0.06}
+NAMESPACE_PREFIXES = {0: '', 4: 'Wikipedia:', 6: 'File:', 10: 'Template:', 14: 'Category:'}
+
+HEADER = '''<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.11/" version="0.11" xml:lang="en">
+  <siteinfo>
+    <sitename>Wikipedia</sitename>
+    <dbname>synthwiki</dbname>
+    <base>https://en.wikipedia.org/wiki/Main_Page</base>
+    <generator>synthetic_dump</generator>
+    <case>first-letter</case>
+  </siteinfo>
+'''
+FOOTER = '</mediawiki>\n'
+
+
+def page_title(page_id, namespace):
+    return f"{NAMESPACE_PREFIXES[namespace]}Synthetic {page_id}"
+
+
+class DumpSpec:
+    """
+    Parameters of a synthetic dump.
+
+    Every page is generated from its own seeded RNG, so a page's content
+    depends only on the seed and its ID, not on the other settings.
+    """
+
+    def __init__(self, pages=1000, seed=0, mean_kb=8.0, size_sigma=1.0, namespaces=None,
+                 redirect_fraction=0.15, templates_per_kb=0.5, refs_per_kb=1.0, links_per_kb=6.0):
+        """
+        Args:
+            pages: Number of pages
+            seed: Random seed
+            mean_kb: Median wikitext size of an article in KiB
+            size_sigma: Sigma of the log-normal article size distribution
+            namespaces: Mapping of namespace to weight (default: NAMESPACES)
+            redirect_fraction: Share of main-namespace pages that are redirects
+            templates_per_kb: Templates per KiB of wikitext
+            refs_per_kb: ``<ref>`` tags per KiB of wikitext
+            links_per_kb: Wiki links per KiB of wikitext
+        """
+        self.pages = pages
+        self.seed = seed
+        self.mean_kb = mean_kb
+        self.size_sigma = size_sigma
+        self.namespaces = namespaces or NAMESPACES
+        self.redirect_fraction = redirect_fraction
+        self.templates_per_kb = templates_per_kb
+        self.refs_per_kb = refs_per_kb
+        self.links_per_kb = links_per_kb
+
+    def to_dict(self):
+        return dict(vars(self), namespaces={str(ns): w for ns, w in self.namespaces.items()})
+
+
+def _sentence(rng, spec):
+    """One sentence of roughly 100 bytes with links, templates and refs at the configured rates."""
+    words = [rng.choice(WORDS) for _ in range(rng.randint(10, 20))]
+    per_sentence = 0.1  # KiB
+    for i in range(len(words)):
+        if rng.random() < spec.links_per_kb * per_sentence / len(words):
+            target = rng.randint(1, spec.pages)
+            words[i] = f'[[{page_title(target, 0)}|{words[i]}]]' if rng.random() < 0.5 else \
+                f'[[{page_title(target, 0)}]]'
+    text = ' '.join(words)
+    text = text[0].upper() + text[1:] + '.'
+    if rng.random() < spec.templates_per_kb * per_sentence:
+        text += ' {{' + rng.choice(('convert|%d|km' % rng.randint(1, 999), 'citation needed', 'lang|fr|mot',
+                                    'nowrap|%d BC' % rng.randint(1, 3000))) + '}}'
+    if rng.random() < spec.refs_per_kb * per_sentence:
+        text += (f'<ref>{{{{cite web|url=https://example.org/{rng.randint(1, 99999)}'
+                 f'|title={rng.choice(WORDS)}}}}}</ref>')
+    return text
+
+
+def article_text(page_id, spec, rng):
+    """Wikitext of an article of log-normally distributed size with sections and subsections."""
+    target = int(1024 * spec.mean_kb * math.exp(rng.gauss(0, spec.size_sigma)))
+    parts = ['{{Infobox ' + rng.choice(WORDS) + '\n| name = ' + page_title(page_id, 0) +
+             f'\n| founded = {rng.randint(1000, 2020)}\n}}}}\n']
+    size, section, subsection = 0, 0, 0
+    while size < target:
+        roll = rng.random()
+        if roll < 0.08:
+            section += 1
+            subsection = 0
+            parts.append(f'\n== Section {section} ==\n')
+        elif roll < 0.12 and section:
+            subsection += 1
+            parts.append(f'\n=== Subsection {section}.{subsection} ===\n')
+        paragraph = ' '.join(_sentence(rng, spec) for _ in range(rng.randint(2, 6)))
+        parts.append(paragraph + '\n')
+        size += len(paragraph)
+    parts.append('\n== References ==\n{{reflist}}\n')
+    for _ in range(rng.randint(1, 4)):
+        parts.append(f'[[Category:Synthetic {rng.randint(1, max(1, spec.pages // 20))}]]\n')
+    return ''.join(parts)
+
+
+def generate_page(page_id, spec):
+    """Return the XML of one page."""
+    rng = random.Random(spec.seed * 1000003 + page_id)
+    namespace = rng.choices(list(spec.namespaces), weights=list(spec.namespaces.values()))[0]
+    title = page_title(page_id, namespace)
+    redirect = None
+    if namespace == 0 and rng.random() < spec.redirect_fraction:
+        redirect = page_title(rng.randint(1, spec.pages), 0)
+        text = f'#REDIRECT [[{redirect}]]'
+    elif namespace == 0:
+        text = article_text(page_id, spec, rng)
+    else:
+        text = ' '.join(_sentence(rng, spec) for _ in range(rng.randint(1, 8)))
+
+    lines = ['  <page>\n',
+             f'    <title>{escape(title)}</title>\n',
+             f'    <ns>{namespace}</ns>\n',
+             f'    <id>{page_id}</id>\n']
+    if redirect:
+        lines.append(f'    <redirect title={quoteattr(redirect)} />\n')
+    lines.extend(['    <revision>\n',
+                  f'      <id>{1000000 + page_id}</id>\n',
+                  '      <timestamp>2024-01-01T00:00:00Z</timestamp>\n',
+                  f'      <text bytes="{len(text.encode("utf-8"))}" xml:space="preserve">{escape(text)}</text>\n',
+                  '    </revision>\n',
+                  '  </page>\n'])
+    return ''.join(lines), title
+
+
+def generate_dump(output_dir, spec, multistream=True, name='synthwiki', stream_pages=100):
+    """
+    Write ``<name>.xml`` and optionally ``<name>-multistream.xml.bz2`` with its index.
+
+    The multistream file is laid out like pages-articles-multistream: the
+    header, every group of ``stream_pages`` pages and the footer are
+    separate bz2 streams. Index lines are ``offset:page_id:title``, where
+    offset is the byte offset of the stream holding the page. Both dumps
+    hold the same pages; each page is generated once.
+
+    Returns:
+        Dict of the written paths
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {'xml': os.path.join(output_dir, f'{name}.xml')}
+    if multistream:
+        paths['multistream'] = os.path.join(output_dir, f'{name}-multistream.xml.bz2')
+        paths['index'] = os.path.join(output_dir, f'{name}-multistream-index.txt.bz2')
+
+    with contextlib.ExitStack() as stack:
+        plain = stack.enter_context(open(paths['xml'], 'w', encoding='utf-8'))
+        plain.write(HEADER)
+        if multistream:
+            streams = stack.enter_context(open(paths['multistream'], 'wb'))
+            index = stack.enter_context(bz2.open(paths['index'], 'wt', encoding='utf-8'))
+            streams.write(bz2.compress(HEADER.encode('utf-8')))
+        for first in range(1, spec.pages + 1, stream_pages):
+            chunk = []
+            offset = streams.tell() if multistream else 0
+            for page_id in range(first, min(first + stream_pages, spec.pages + 1)):
+                xml, title = generate_page(page_id, spec)
+                chunk.append(xml)
+                if multistream:
+                    index.write(f'{offset}:{page_id}:{title}\n')
+            chunk = ''.join(chunk)
+            plain.write(chunk)
+            if multistream:
+                streams.write(bz2.compress(chunk.encode('utf-8')))
+        plain.write(FOOTER)
+        if multistream:
+            streams.write(bz2.compress(FOOTER.encode('utf-8')))
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic MediaWiki XML dump")
+    parser.add_argument('output_dir', help="Output directory")
+    parser.add_argument('--pages', type=int, default=1000, help="Number of pages")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed")
+    parser.add_argument('--mean-kb', type=float, default=8.0, help="Median article size in KiB")
+    parser.add_argument('--size-sigma', type=float, default=1.0, help="Sigma of the log-normal size distribution")
+    parser.add_argument('--redirects', type=float, default=0.15, help="Share of articles that are redirects")
+    parser.add_argument('--templates', type=float, default=0.5, help="Templates per KiB")
+    parser.add_argument('--refs', type=float, default=1.0, help="References per KiB")
+    parser.add_argument('--links', type=float, default=6.0, help="Wiki links per KiB")
+    parser.add_argument('--no-multistream', action='store_true', help="Only write the plain XML dump")
+    args = parser.parse_args()
+
+    spec = DumpSpec(args.pages, args.seed, args.mean_kb, args.size_sigma, redirect_fraction=args.redirects,
+                    templates_per_kb=args.templates, refs_per_kb=args.refs, links_per_kb=args.links)
+    for kind, path in generate_dump(args.output_dir, spec, not args.no_multistream).items():
+        print(f"{kind}: {path} ({os.path.getsize(path) / 1024 / 1024:.1f} MiB)")
+
+if __name__ == '__main__':
+    main()
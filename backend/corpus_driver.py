@@ -0,0 +1,431 @@
+import argparse
+import json
+import multiprocessing as mp
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from data_processing.instrumentation import DISABLED, Metrics
+from data_processing.resource_governor import available_cores, configure_inference_threads, partition_cores
+
+UNIT_STATES = ('pending', 'leased', 'done')
+
+
+class LeaseLost(Exception):
+    """Raised when a worker's lease on a unit was reclaimed by another worker."""
+
+
+class Manifest:
+    """
+    Work units in a shared directory, coordinated by atomic renames.
+
+    A unit moves ``pending/unit_N.json`` -> ``leased/unit_N@<worker>@<claimed>.json``
+    -> ``done/unit_N.json``. Each move is a single ``os.rename``, so exactly
+    one worker wins a claim without any server. Lease owners touch their
+    leased file as a heartbeat; a lease whose file was not touched within
+    ``lease_timeout`` seconds is moved back to ``pending``.
+    """
+
+    def __init__(self, path: str, lease_timeout: float = 300.0):
+        """
+        Args:
+            path: Manifest directory on the shared filesystem
+            lease_timeout: Seconds without heartbeat after which a lease expires
+        """
+        self.path = path
+        self.lease_timeout = lease_timeout
+
+    def _dir(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def create(self, page_index: str, unit_size: int = 100) -> int:
+        """
+        Split a ``page_index.jsonl`` into pending work units.
+
+        Args:
+            page_index: Index written by ``process_all_pages``
+            unit_size: Pages per unit
+
+        Returns:
+            Number of units created
+        """
+        for name in UNIT_STATES + ('results', 'stats'):
+            os.makedirs(self._dir(name), exist_ok=True)
+        if any(os.listdir(self._dir(state)) for state in UNIT_STATES):
+            raise FileExistsError(f"Manifest {self.path} already contains units")
+
+        units = 0
+        pages = []
+        with open(page_index, 'r', encoding='utf-8') as f:
+            for line in f:
+                page = json.loads(line)
+                pages.append({'id': page['id'], 'title': page['title']})
+                if len(pages) == unit_size:
+                    self._write_unit(units, pages)
+                    units += 1
+                    pages = []
+        if pages:
+            self._write_unit(units, pages)
+            units += 1
+        return units
+
+    def _write_unit(self, unit: int, pages: List[Dict]):
+        _write_atomic(os.path.join(self._dir('pending'), f'unit_{unit:06d}.json'),
+                      json.dumps({'unit': unit, 'pages': pages}))
+
+    def claim(self, worker_id: str) -> Optional[Tuple[str, Dict]]:
+        """
+        Lease the next pending unit.
+
+        Returns:
+            Tuple of (lease path, unit), or None if nothing is pending
+        """
+        for name in sorted(os.listdir(self._dir('pending'))):
+            pending = os.path.join(self._dir('pending'), name)
+            lease = os.path.join(self._dir('leased'),
+                                 f'{name[:-len(".json")]}@{worker_id}@{int(time.time())}.json')
+            try:
+                # Touch first: rename keeps the mtime, which would look like an expired lease
+                os.utime(pending)
+                os.rename(pending, lease)
+            except FileNotFoundError:
+                continue  # Another worker was faster
+            with open(lease, 'r', encoding='utf-8') as f:
+                return lease, json.load(f)
+        return None
+
+    def heartbeat(self, lease: str):
+        """Renew a lease; raises LeaseLost if it was reclaimed."""
+        try:
+            os.utime(lease)
+        except FileNotFoundError:
+            raise LeaseLost(lease) from None
+
+    def complete(self, lease: str, unit: Dict, results: List[Dict], stats: Dict):
+        """
+        Store a unit's results and mark it done.
+
+        Results and stats are written before the lease is moved, so a unit
+        in ``done`` always has both. Raises LeaseLost if the lease was
+        reclaimed in the meantime.
+        """
+        name = f"unit_{unit['unit']:06d}"
+        _write_atomic(os.path.join(self._dir('results'), f'{name}.jsonl'),
+                      ''.join(json.dumps(result, ensure_ascii=False) + '\n' for result in results))
+        _write_atomic(os.path.join(self._dir('stats'), f'{name}.json'), json.dumps(stats))
+        try:
+            os.rename(lease, os.path.join(self._dir('done'), f'{name}.json'))
+        except FileNotFoundError:
+            raise LeaseLost(lease) from None
+
+    def reclaim_expired(self) -> int:
+        """Move expired leases back to pending; returns the number reclaimed."""
+        reclaimed = 0
+        now = time.time()
+        for name in os.listdir(self._dir('leased')):
+            lease = os.path.join(self._dir('leased'), name)
+            try:
+                if now - os.path.getmtime(lease) < self.lease_timeout:
+                    continue
+                os.rename(lease, os.path.join(self._dir('pending'), f"{name.split('@', 1)[0]}.json"))
+            except FileNotFoundError:
+                continue  # Completed or reclaimed concurrently
+            reclaimed += 1
+        return reclaimed
+
+    def counts(self) -> Dict[str, int]:
+        return {state: len(os.listdir(self._dir(state))) for state in UNIT_STATES}
+
+    def iter_stats(self) -> Iterator[Dict]:
+        for name in sorted(os.listdir(self._dir('stats'))):
+            with open(os.path.join(self._dir('stats'), name), 'r', encoding='utf-8') as f:
+                yield json.load(f)
+
+
+def _write_atomic(path: str, content: str):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+
+class _Heartbeat(threading.Thread):
+    """Touches a lease periodically until stopped or the lease is lost."""
+
+    def __init__(self, manifest: Manifest, lease: str, interval: float):
+        super().__init__(daemon=True)
+        self.manifest = manifest
+        self.lease = lease
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.lost = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.manifest.heartbeat(self.lease)
+            except LeaseLost:
+                self.lost.set()
+                return
+
+
+def run_worker(manifest: Manifest, process_page: Callable[[Dict], Dict], worker_id: str,
+               heartbeat_interval: Optional[float] = None, idle_wait: float = 5.0,
+               metrics: Metrics = DISABLED) -> int:
+    """
+    Claim and process units until none are pending or leased.
+
+    Args:
+        manifest: Shared manifest
+        process_page: Called with ``{'id', 'title'}`` for every page
+        worker_id: Unique worker name (host and pid)
+        heartbeat_interval: Seconds between heartbeats (default: a third of
+            the lease timeout)
+        idle_wait: Seconds to wait for other workers' leases to finish or
+            expire when nothing is pending
+        metrics: Instrumentation shared with ``process_page``; its values
+            are stored with each unit's stats and reset between units
+
+    Returns:
+        Number of units completed by this worker
+    """
+    heartbeat_interval = heartbeat_interval or manifest.lease_timeout / 3
+    completed = 0
+    while True:
+        manifest.reclaim_expired()
+        claimed = manifest.claim(worker_id)
+        if claimed is None:
+            if manifest.counts()['leased'] == 0:
+                return completed
+            time.sleep(idle_wait)
+            continue
+
+        lease, unit = claimed
+        heartbeat = _Heartbeat(manifest, lease, heartbeat_interval)
+        heartbeat.start()
+        start = time.time()
+        results = []
+        errors = 0
+        metrics.reset()
+        try:
+            for page in unit['pages']:
+                if heartbeat.lost.is_set():
+                    raise LeaseLost(lease)
+                try:
+                    results.append(dict(process_page(page), id=page['id']))
+                except Exception as e:
+                    errors += 1
+                    results.append({'id': page['id'], 'title': page['title'], 'error': str(e)})
+            stats = {
+                'unit': unit['unit'],
+                'worker': worker_id,
+                'node': socket.gethostname(),
+                'start': start,
+                'end': time.time(),
+                'pages': len(unit['pages']),
+                'errors': errors,
+                'entities': sum(result.get('entities_found', 0) for result in results),
+                'relationships': sum(result.get('relationships_found', 0) for result in results)
+            }
+            if metrics.enabled:
+                stats['metrics'] = metrics.snapshot()
+            manifest.complete(lease, unit, results, stats)
+            completed += 1
+        except LeaseLost:
+            print(f"{worker_id}: lease on unit {unit['unit']} expired, dropping it")
+        finally:
+            heartbeat.stopped.set()
+            heartbeat.join()
+
+
+def report(manifest: Manifest, straggler_factor: float = 2.0, metrics_file: Optional[str] = None) -> Dict:
+    """
+    Aggregate throughput and find stragglers.
+
+    Args:
+        manifest: Shared manifest
+        straggler_factor: Units slower than this multiple of the median
+            seconds per page are reported as stragglers
+        metrics_file: Write the stage metrics merged over all units here
+            (JSON, or Prometheus text for a .prom file)
+
+    Returns:
+        Report dictionary (also printed)
+    """
+    stats = list(manifest.iter_stats())
+    counts = manifest.counts()
+    summary = {'units': counts, 'pages': 0, 'pages_per_sec': 0.0, 'workers': {}, 'stragglers': [],
+               'stale_leases': []}
+    if stats:
+        wall = max(s['end'] for s in stats) - min(s['start'] for s in stats)
+        summary['pages'] = sum(s['pages'] for s in stats)
+        summary['errors'] = sum(s['errors'] for s in stats)
+        summary['pages_per_sec'] = summary['pages'] / max(wall, 1e-9)
+
+        for s in stats:
+            worker = summary['workers'].setdefault(s['worker'], {'node': s['node'], 'units': 0, 'pages': 0,
+                                                                 'busy_sec': 0.0})
+            worker['units'] += 1
+            worker['pages'] += s['pages']
+            worker['busy_sec'] += s['end'] - s['start']
+        for worker in summary['workers'].values():
+            worker['pages_per_sec'] = worker['pages'] / max(worker['busy_sec'], 1e-9)
+
+        per_page = {s['unit']: (s['end'] - s['start']) / max(s['pages'], 1) for s in stats}
+        median = statistics.median(per_page.values())
+        summary['stragglers'] = sorted(
+            ({'unit': s['unit'], 'worker': s['worker'], 'sec_per_page': per_page[s['unit']]}
+             for s in stats if per_page[s['unit']] > straggler_factor * median),
+            key=lambda s: -s['sec_per_page']
+        )
+
+    # Leases still held but already older than the median unit duration
+    leased_dir = os.path.join(manifest.path, 'leased')
+    durations = [s['end'] - s['start'] for s in stats]
+    threshold = straggler_factor * statistics.median(durations) if durations else manifest.lease_timeout
+    now = time.time()
+    for name in sorted(os.listdir(leased_dir)):
+        unit, worker, claimed = name[:-len('.json')].split('@')
+        claimed_for = now - int(claimed)
+        if claimed_for > threshold:
+            summary['stale_leases'].append({'unit': unit, 'worker': worker, 'seconds': claimed_for})
+
+    print(f"Units: {counts['done']} done, {counts['leased']} leased, {counts['pending']} pending")
+    print(f"Pages: {summary['pages']} at {summary['pages_per_sec']:.1f} pages/s overall")
+    for name, worker in sorted(summary['workers'].items()):
+        print(f"  {name} ({worker['node']}): {worker['units']} units, {worker['pages_per_sec']:.1f} pages/s")
+    for straggler in summary['stragglers']:
+        print(f"  Straggler: unit {straggler['unit']} on {straggler['worker']} "
+              f"({straggler['sec_per_page']:.3f}s/page)")
+    for lease in summary['stale_leases']:
+        print(f"  Slow lease: {lease['unit']} on {lease['worker']} for {lease['seconds']:.0f}s")
+
+    metrics = Metrics()
+    for s in stats:
+        metrics.merge(s.get('metrics'))
+    if metrics.stages:
+        metrics.print_report()
+        summary['metrics'] = metrics.report()
+        if metrics_file:
+            metrics.write(metrics_file)
+    return summary
+
+
+# A page processor and the callable that releases what it holds
+Processor = Tuple[Callable[[Dict], Dict], Callable[[], None]]
+
+
+def _pipeline_processor(config: Dict, metrics: Metrics = DISABLED) -> Processor:
+    from pipeline import WikipediaKGPipeline
+
+    pipeline = WikipediaKGPipeline(config, metrics)
+    return (lambda page: pipeline.process_article(page['title'])), pipeline.close
+
+
+def _fetch_processor(config: Dict, metrics: Metrics = DISABLED) -> Processor:
+    """Only fetches articles; exercises the driver without models or a database."""
+    from data_processing.wiki_parser import WikipediaParser
+
+    parser = WikipediaParser.from_config(config)
+
+    def process(page):
+        with metrics.stage('parse'):
+            article = parser.get_article(page['title'])
+        if article is None:
+            raise KeyError(f"Article {page['title']} not found")
+        metrics.count('bytes', len(article['text'].encode('utf-8')))
+        return {'title': page['title'], 'characters': len(article['text'])}
+    return process, parser.close
+
+
+PROCESSORS = {'pipeline': _pipeline_processor, 'fetch': _fetch_processor}
+
+
+def _load_config(env: str, processed_dir: Optional[str]) -> Dict:
+    from config import load_config
+
+    try:
+        config = load_config(env)
+    except FileNotFoundError:
+        if processed_dir is None:
+            raise
+        config = {}
+    if processed_dir is not None:
+        config.setdefault('wikipedia', {})['processed_dir'] = processed_dir
+    return config
+
+
+def _worker_main(manifest_path: str, lease_timeout: float, processor: str, env: str,
+                 processed_dir: Optional[str], worker_id: str, cores: Optional[List[int]] = None,
+                 instrument: bool = False, profile_dir: Optional[str] = None):
+    if cores:
+        # Before the models load, so torch sizes its thread pools to this worker's cores
+        configure_inference_threads(cores)
+    manifest = Manifest(manifest_path, lease_timeout)
+    metrics = Metrics(instrument, os.path.join(profile_dir, worker_id) if profile_dir else None)
+    process_page, close = PROCESSORS[processor](_load_config(env, processed_dir), metrics)
+    try:
+        completed = run_worker(manifest, process_page, worker_id, metrics=metrics)
+    finally:
+        # Drains the spool, writes aggregated edges, commits the near-duplicate index and stops writers
+        close()
+    metrics.write_profiles()
+    print(f"{worker_id}: completed {completed} units")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run KG extraction over the corpus on several nodes")
+    parser.add_argument('command', choices=('init', 'work', 'report'))
+    parser.add_argument('--manifest', required=True, help="Manifest directory on the shared filesystem")
+    parser.add_argument('--page-index', help="page_index.jsonl to split (init)")
+    parser.add_argument('--unit-size', type=int, default=100, help="Pages per work unit (init)")
+    parser.add_argument('--lease-timeout', type=float, default=300.0, help="Seconds until a silent lease expires")
+    parser.add_argument('--processor', choices=sorted(PROCESSORS), default='pipeline',
+                        help="What to run for every page (work)")
+    parser.add_argument('--env', default='development', help="Configuration environment (work)")
+    parser.add_argument('--processed-dir', help="Override wikipedia.processed_dir from the configuration (work)")
+    parser.add_argument('--local-workers', type=int, default=1,
+                        help="Worker processes on this node; several stand in for nodes when testing")
+    parser.add_argument('--parse-cores', type=int, default=0,
+                        help="Cores left to a process_all_pages run on this node (its --parse-cores); "
+                             "local workers share the rest (work)")
+    parser.add_argument('--metrics', help="Record stage metrics (work) and write them merged to this file "
+                                          "(.json, or .prom for Prometheus) after work or report")
+    parser.add_argument('--profile', help="Directory for per-worker, per-stage cProfile and allocation dumps (work)")
+    args = parser.parse_args()
+
+    manifest = Manifest(args.manifest, args.lease_timeout)
+    if args.command == 'init':
+        if not args.page_index:
+            parser.error("init needs --page-index")
+        print(f"Created {manifest.create(args.page_index, args.unit_size)} units")
+    elif args.command == 'work':
+        host = socket.gethostname()
+        # Disjoint core groups so local workers' torch threads don't oversubscribe the node
+        core_groups = partition_cores(available_cores(), args.local_workers, reserve=args.parse_cores)
+        processes = [mp.Process(target=_worker_main,
+                                args=(args.manifest, args.lease_timeout, args.processor, args.env,
+                                      args.processed_dir, f'{host}-{os.getpid()}-{i}', core_groups[i],
+                                      bool(args.metrics), args.profile))
+                     for i in range(args.local_workers)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        failed = [process for process in processes if process.exitcode != 0]
+        for process in failed:
+            print(f"Worker {process.name} (pid {process.pid}) exited with code {process.exitcode}",
+                  file=sys.stderr)
+        report(manifest, metrics_file=args.metrics)
+        if failed:
+            # Their leases expire and are reclaimed by the next run
+            sys.exit(1)
+    else:
+        report(manifest, metrics_file=args.metrics)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+import argparse
+import fcntl
+import json
+import mmap
+import os
+import shutil
+import tempfile
+import time
+from array import array
+
+import numpy as np
+
+INDEX_FILES = ('ids', 'shards', 'offsets', 'lengths')
+
+
+def _scan_line_offsets(shard_path):
+    """Return {page id: (offset, length)} for every line of a shard."""
+    positions = {}
+    offset = 0
+    with open(shard_path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                positions[str(json.loads(line)['id'])] = (offset, len(line))
+            offset += len(line)
+    return positions
+
+
+def compile_index(processed_dir, index_dir):
+    """
+    Compile ``page_index.jsonl`` into ID-sorted arrays for random access.
+
+    Index entries written before ``process_chunk`` recorded byte positions
+    are located by scanning their shard once. The arrays are written to a
+    temporary directory next to ``index_dir`` and swapped into place once
+    complete, ``files.json`` last, so a reader never maps a partly written
+    file. Concurrent builders must be serialized by the caller (see
+    ``ArticleStore``).
+
+    Args:
+        processed_dir: Directory written by ``process_all_pages``
+        index_dir: Output directory
+    """
+    start = time.time()
+    ids, shards, offsets, lengths = array('q'), array('i'), array('q'), array('q')
+    shard_names = {}
+    scanned = {}
+    with open(os.path.join(processed_dir, 'page_index.jsonl'), 'r', encoding='utf-8') as f:
+        for line in f:
+            page = json.loads(line)
+            shard = shard_names.setdefault(page['file'], len(shard_names))
+            if 'offset' in page:
+                offset, length = page['offset'], page['length']
+            else:
+                if page['file'] not in scanned:
+                    scanned[page['file']] = _scan_line_offsets(os.path.join(processed_dir, page['file']))
+                offset, length = scanned[page['file']][str(page['id'])]
+            ids.append(int(page['id']))
+            shards.append(shard)
+            offsets.append(offset)
+            lengths.append(length)
+
+    ids = np.frombuffer(ids, dtype=np.int64)
+    order = np.argsort(ids, kind='stable')
+    index_dir = os.path.abspath(index_dir)
+    tmp_dir = tempfile.mkdtemp(prefix=os.path.basename(index_dir) + '.', dir=os.path.dirname(index_dir))
+    try:
+        np.save(os.path.join(tmp_dir, 'ids.npy'), ids[order])
+        np.save(os.path.join(tmp_dir, 'shards.npy'), np.frombuffer(shards, dtype=np.int32)[order])
+        np.save(os.path.join(tmp_dir, 'offsets.npy'), np.frombuffer(offsets, dtype=np.int64)[order])
+        np.save(os.path.join(tmp_dir, 'lengths.npy'), np.frombuffer(lengths, dtype=np.int64)[order])
+        with open(os.path.join(tmp_dir, 'files.json'), 'w', encoding='utf-8') as f:
+            json.dump(sorted(shard_names, key=shard_names.get), f)
+        # A directory cannot be replaced while it has entries: move the old index aside first
+        old_dir = None
+        if os.path.exists(index_dir):
+            old_dir = tmp_dir + '.old'
+            os.replace(index_dir, old_dir)
+        os.replace(tmp_dir, index_dir)
+        if old_dir:
+            shutil.rmtree(old_dir, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    print(f"Compiled article index for {len(ids)} pages in {time.time() - start:.1f}s")
+
+
+class ArticleStore:
+    """
+    Random access to the pages written by ``process_all_pages``.
+
+    The index is a set of ID-sorted, memory-mapped arrays holding the shard,
+    byte offset and length of every page, so a lookup is a binary search
+    followed by one slice of the memory-mapped shard.
+
+    Opening a store holds a shared lock on ``<index_dir>.lock`` while the
+    index is checked and mapped. A stale index is rebuilt under an
+    exclusive lock, so concurrent openers build it once and wait for it to
+    be published instead of reading it half-written.
+    """
+
+    def __init__(self, processed_dir, title_resolver=None, index_dir=None):
+        """
+        Args:
+            processed_dir: Directory written by ``process_all_pages``
+            title_resolver: Optional callable mapping a title to a page ID
+                (e.g. ``TitleLookup.id_of``); without it titles are matched
+                exactly against ``page_index.jsonl``
+            index_dir: Compiled index directory (default:
+                ``<processed_dir>/article_index``), rebuilt when stale
+        """
+        self.processed_dir = processed_dir
+        self.title_resolver = title_resolver
+        index_dir = os.path.abspath(index_dir or os.path.join(processed_dir, 'article_index'))
+        marker = os.path.join(index_dir, 'files.json')
+        source = os.path.join(processed_dir, 'page_index.jsonl')
+
+        def stale():
+            return not os.path.exists(marker) or os.path.getmtime(marker) < os.path.getmtime(source)
+
+        with open(index_dir + '.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_SH)
+            if stale():
+                # Converting the lock releases it first: recheck once exclusive
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                if stale():
+                    compile_index(processed_dir, index_dir)
+                fcntl.flock(lock, fcntl.LOCK_SH)
+            # Mapped files stay valid even if a later rebuild replaces them
+            for name in INDEX_FILES:
+                setattr(self, name, np.load(os.path.join(index_dir, f'{name}.npy'), mmap_mode='r'))
+            with open(marker, 'r', encoding='utf-8') as f:
+                self.files = json.load(f)
+        self._maps = {}
+        self._titles = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, page_id):
+        return self._position(int(page_id)) is not None
+
+    def _position(self, page_id):
+        i = int(np.searchsorted(self.ids, page_id))
+        return i if i < len(self.ids) and self.ids[i] == page_id else None
+
+    def _shard(self, shard):
+        if shard not in self._maps:
+            with open(os.path.join(self.processed_dir, self.files[shard]), 'rb') as f:
+                self._maps[shard] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._maps[shard]
+
+    def get_raw(self, page_id):
+        """Return the JSON line of a page as bytes, or None if it is unknown."""
+        position = self._position(int(page_id))
+        if position is None:
+            return None
+        offset = int(self.offsets[position])
+        return self._shard(int(self.shards[position]))[offset:offset + int(self.lengths[position])]
+
+    def get(self, page_id):
+        """Return a processed page by ID, or None if it is unknown."""
+        raw = self.get_raw(page_id)
+        return json.loads(raw) if raw is not None else None
+
+    def id_of(self, title):
+        """Return the page ID for a title, or None if it is unknown."""
+        if self.title_resolver is not None:
+            return self.title_resolver(title)
+        if self._titles is None:
+            self._titles = {}
+            with open(os.path.join(self.processed_dir, 'page_index.jsonl'), 'r', encoding='utf-8') as f:
+                for line in f:
+                    page = json.loads(line)
+                    self._titles[page['title']] = int(page['id'])
+        return self._titles.get(title)
+
+    def get_by_title(self, title):
+        """Return a processed page by title, or None if it is unknown."""
+        page_id = self.id_of(title)
+        return self.get(page_id) if page_id is not None else None
+
+    def close(self):
+        """Unmap all open shards."""
+        for mm in self._maps.values():
+            mm.close()
+        self._maps = {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch processed pages by ID or title")
+    parser.add_argument("processed_dir", help="Directory written by process_all_pages")
+    parser.add_argument("--id", nargs='*', default=[], help="Page IDs to fetch")
+    parser.add_argument("--title", nargs='*', default=[], help="Page titles to fetch")
+
+    args = parser.parse_args()
+    store = ArticleStore(args.processed_dir)
+    for page_id in args.id:
+        print(json.dumps(store.get(page_id), ensure_ascii=False))
+    for title in args.title:
+        print(json.dumps(store.get_by_title(title), ensure_ascii=False))
+    store.close()
+
+if __name__ == '__main__':
+    main()
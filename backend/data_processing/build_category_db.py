@@ -0,0 +1,198 @@
+import argparse
+import gzip
+import os
+import re
+import sqlite3
+import sys
+import time
+
+# Regex patterns for MySQL dump statements
+createTableRE = re.compile(r'CREATE TABLE `(\w+)`')
+columnRE = re.compile(r'\s*`(\w+)`\s')
+insertRE = re.compile(r'INSERT INTO `(\w+)` VALUES ')
+tupleRE = re.compile(r"\(((?:'(?:[^'\\]|\\.)*'|[^'()])*)\)")
+fieldRE = re.compile(r"'((?:[^'\\]|\\.)*)'|([^,]+)")
+escapeRE = re.compile(r'\\(.)')
+
+MYSQL_ESCAPES = {'0': '\0', 'b': '\b', 'n': '\n', 'r': '\r', 't': '\t', 'Z': '\x1a'}
+
+# Columns kept from each dump, in table order
+TABLES = {
+    'page': {
+        'columns': ('page_id', 'page_namespace', 'page_title', 'page_is_redirect'),
+        'schema': '''create table page (
+            page_id integer primary key,
+            page_namespace integer not null,
+            page_title text not null,
+            page_is_redirect integer not null default 0
+        )''',
+    },
+    'categorylinks': {
+        'columns': ('cl_from', 'cl_to', 'cl_type'),
+        'schema': '''create table categorylinks (
+            cl_from integer not null,
+            cl_to text not null,
+            cl_type text
+        )''',
+    },
+}
+
+# Created after loading; (cl_to, cl_from) covers the traversal query
+INDEXES = (
+    'create index categorylinks_to_from on categorylinks (cl_to, cl_from)',
+    'create index categorylinks_from on categorylinks (cl_from)',
+    'create index page_namespace_title on page (page_namespace, page_title)',
+)
+
+FAST_LOAD_PRAGMAS = (
+    'pragma page_size = 65536',
+    'pragma journal_mode = off',
+    'pragma synchronous = off',
+    'pragma locking_mode = exclusive',
+    'pragma temp_store = memory',
+    'pragma cache_size = -1048576',
+)
+
+def unescape_mysql(value):
+    """Undo MySQL string escaping."""
+    if '\\' not in value:
+        return value
+    return escapeRE.sub(lambda m: MYSQL_ESCAPES.get(m.group(1), m.group(1)), value)
+
+def parse_values(values):
+    """Parse the tuples of one INSERT statement into lists of field values."""
+    for row in tupleRE.finditer(values):
+        fields = []
+        for quoted, bare in fieldRE.findall(row.group(1)):
+            if bare:
+                bare = bare.strip()
+                fields.append(None if bare == 'NULL' else bare)
+            else:
+                fields.append(unescape_mysql(quoted))
+        yield fields
+
+def iter_dump_rows(dump_file, table, columns):
+    """
+    Stream rows of one table from a (gzipped) MySQL dump.
+
+    Column positions are taken from the dump's CREATE TABLE statement, so
+    schema changes between dump versions are handled.
+
+    Yields:
+        Tuples with the requested columns
+    """
+    opener = gzip.open if dump_file.endswith('.gz') else open
+    positions = None
+    dump_columns = []
+    in_create = False
+
+    with opener(dump_file, 'rt', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            if in_create:
+                match = columnRE.match(line)
+                if match:
+                    dump_columns.append(match.group(1))
+                elif line.startswith(')'):
+                    in_create = False
+                    missing = [column for column in columns if column not in dump_columns]
+                    if missing:
+                        raise ValueError(f"{dump_file}: table {table} has no column(s) {missing}")
+                    positions = [dump_columns.index(column) for column in columns]
+                continue
+
+            match = createTableRE.match(line)
+            if match and match.group(1) == table:
+                in_create = True
+                continue
+
+            match = insertRE.match(line)
+            if match and match.group(1) == table:
+                if positions is None:
+                    raise ValueError(f"{dump_file}: INSERT before CREATE TABLE for {table}")
+                for fields in parse_values(line[match.end():]):
+                    yield tuple(fields[i] for i in positions)
+
+def load_table(con, dump_file, table, batch_size=100000, namespaces=None):
+    """
+    Bulk-insert one table from its dump in a single transaction.
+
+    Args:
+        con: Open SQLite connection
+        dump_file: Path to the ``.sql`` or ``.sql.gz`` dump
+        table: "page" or "categorylinks"
+        batch_size: Rows per executemany call
+        namespaces: Optional set of namespaces to keep (page table only)
+
+    Returns:
+        Number of rows inserted
+    """
+    columns = TABLES[table]['columns']
+    insert = f"insert or ignore into {table} ({', '.join(columns)}) values ({', '.join('?' * len(columns))})"
+    start = time.time()
+    total = 0
+    batch = []
+
+    con.execute('begin')
+    for row in iter_dump_rows(dump_file, table, columns):
+        if namespaces is not None and table == 'page' and int(row[1]) not in namespaces:
+            continue
+        batch.append(row)
+        if len(batch) >= batch_size:
+            con.executemany(insert, batch)
+            total += len(batch)
+            batch = []
+            elapsed = time.time() - start
+            print(f"\r{table}: {total} rows ({total / elapsed:.0f} rows/s)", end='', file=sys.stderr)
+    if batch:
+        con.executemany(insert, batch)
+        total += len(batch)
+    con.execute('commit')
+
+    elapsed = time.time() - start
+    print(f"\r{table}: {total} rows in {elapsed:.1f}s ({total / max(elapsed, 1e-9):.0f} rows/s)", file=sys.stderr)
+    return total
+
+def build_category_db(page_dump, categorylinks_dump, db_path, namespaces=None):
+    """
+    Build the SQLite database used by build_category_hierarchy from SQL dumps.
+
+    Args:
+        page_dump: Path to ``page.sql.gz``
+        categorylinks_dump: Path to ``categorylinks.sql.gz``
+        db_path: Output database, replaced if it exists
+        namespaces: Optional set of page namespaces to keep
+    """
+    if os.path.exists(db_path):
+        os.remove(db_path)
+
+    con = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        for pragma in FAST_LOAD_PRAGMAS:
+            con.execute(pragma)
+        for table in TABLES.values():
+            con.execute(table['schema'])
+
+        load_table(con, page_dump, 'page', namespaces=namespaces)
+        load_table(con, categorylinks_dump, 'categorylinks')
+
+        for index in INDEXES:
+            start = time.time()
+            con.execute(index)
+            print(f"{index.split(' on ')[0]}: {time.time() - start:.1f}s", file=sys.stderr)
+        con.execute('analyze')
+    finally:
+        con.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a SQLite category database from Wikipedia SQL dumps")
+    parser.add_argument("page_dump", help="page.sql.gz dump file")
+    parser.add_argument("categorylinks_dump", help="categorylinks.sql.gz dump file")
+    parser.add_argument("db", help="Output SQLite database")
+    parser.add_argument("--namespaces", help="Comma-separated page namespaces to keep (default: all)")
+
+    args = parser.parse_args()
+    namespaces = {int(ns) for ns in args.namespaces.split(',')} if args.namespaces else None
+    build_category_db(args.page_dump, args.categorylinks_dump, args.db, namespaces)
+
+if __name__ == '__main__':
+    main()
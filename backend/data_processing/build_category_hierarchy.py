@@ -1,11 +1,10 @@
 import argparse
 import html
-import sys
-import sqlite3
-import re
 import os.path
 from pathlib import Path
 
+from category_graph import CategoryGraph, resolve_roots
+
 def escape_dot(s):
     return s.replace('"', '\\"')
 
@@ -20,79 +19,118 @@ def ns_to_txt(ns):
     else:
         return str(ns)
 
-parser = argparse.ArgumentParser()
-parser.add_argument('-d', '--depth', type=int)
-parser.add_argument('db')
-parser.add_argument('titles', nargs='+')
-args = parser.parse_args()
-out_dot = True
-out_txt = True
-out_html = True
-outdir = 'out'
+class TxtWriter:
+    """Indented plain-text listing of the tree."""
 
-con = sqlite3.connect(args.db)
-cur = con.cursor()
-todo = list(map(lambda title: (14, title, 0), args.titles.copy()))
-main_title = args.titles[0]
-main_title_human = main_title.replace('_', ' ') + ' - Wikipedia CatTree'
-basename = os.path.join(outdir, main_title)
-visited = set()
-Path(outdir).mkdir(parents=True, exist_ok=True)
-if out_txt:
-    out_txt_f = open(f'{basename}.txt', 'w')
-if out_dot:
-    out_dot_f = open(f'{basename}.dot', 'w')
-    out_dot_f.write('digraph {\n')
-if out_html:
-    out_html_f = open(f'{basename}.html', 'w')
-    out_html_f.write(f'''
+    extension = 'txt'
 
+    def __init__(self, f, main_title_human):
+        self.f = f
 
+    def visit(self, path, depth, parent_path):
+        self.f.write('{}{} {}\n'.format(' ' * depth, depth, path))
 
+    def close(self):
+        pass
 
+class DotWriter:
+    """Graphviz digraph of the visited tree edges."""
 
+    extension = 'dot'
 
+    def __init__(self, f, main_title_human):
+        self.f = f
+        self.f.write('digraph {\n')
 
-{main_title_human}
+    def visit(self, path, depth, parent_path):
+        if parent_path is not None:
+            self.f.write('"{}"->"{}";\n'.format(escape_dot(parent_path), escape_dot(path)))
 
-''')
-last_depth = 0
-while len(todo):
-    namespace, title, depth = todo.pop()
-    depth_delta = depth - last_depth
-    if depth_delta <= 0:
-        repeat_close = -depth_delta + 1
-    else:
-        repeat_close = 0
-    last_depth = depth
-    path_last = ns_to_txt(namespace) + title
-    if out_txt:
-        out_txt_f.write('{}{} {}\n'.format(' ' * depth, depth, path_last))
-    if out_html:
-        out_html_f.write('\n' * repeat_close)
-        out_html_f.write(f'
-{html.escape(path_last.replace("_", " "))}
-\n')
-    visited.add((namespace, title))
-    print(len(visited), file=sys.stderr)
-    if namespace == 14:
-        for child_namespace, child_title in cur.execute('''
-select page_namespace, page_title from categorylinks
-inner join page on cl_from = page_id and cl_to = ?
-order by page_namespace asc, page_title desc
-''', (title,)).fetchall():
-            if not (child_namespace, child_title) in visited and not (args.depth is not None and depth == args.depth):
-                if out_dot:
-                    out_dot_f.write('"{}{}"->"{}{}";\n'.format(ns_to_txt(namespace), escape_dot(title), ns_to_txt(child_namespace), escape_dot(child_title)))
-                todo.append((child_namespace, child_title, depth + 1))
-if out_txt:
-    out_txt_f.close()
-if out_dot:
-    out_dot_f.write('}\n')
-    out_dot_f.close()
-if out_html:
-    out_html_f.write('\n' * last_depth)
-    out_html_f.write('''
-
-''')
-    out_html_f.close
\ No newline at end of file
+    def close(self):
+        self.f.write('}\n')
+
+class HtmlWriter:
+    """Nested HTML list of the tree."""
+
+    extension = 'html'
+
+    def __init__(self, f, main_title_human):
+        self.f = f
+        self.depth = -1
+        self.f.write(f'<!doctype html>\n<html lang="en">\n<head>\n<meta charset="utf-8">\n'
+                     f'<title>{html.escape(main_title_human)}</title>\n</head>\n<body>\n')
+
+    def visit(self, path, depth, parent_path):
+        if depth > self.depth:
+            self.f.write('<ul>\n' * (depth - self.depth))
+        else:
+            self.f.write('</li>\n' + '</ul></li>\n' * (self.depth - depth))
+        self.depth = depth
+        self.f.write(f'<li>{html.escape(path.replace("_", " "))}')
+
+    def close(self):
+        if self.depth >= 0:
+            self.f.write('</li>\n' + '</ul></li>\n' * self.depth + '</ul>\n')
+        self.f.write('</body>\n</html>\n')
+
+OUTPUT_WRITERS = {writer.extension: writer for writer in (TxtWriter, DotWriter, HtmlWriter)}
+
+def write_hierarchy(graph, titles, outdir='out', formats=('txt', 'dot', 'html'), depth=None, order='dfs'):
+    """
+    Traverse the categories below ``titles`` and write the tree in each format.
+
+    Args:
+        graph: Loaded CategoryGraph
+        titles: Root category titles; the first one names the output files
+        outdir: Output directory
+        formats: Extensions of the OUTPUT_WRITERS to use
+        depth: Optional maximum depth below the roots
+        order: "dfs" or "bfs"
+
+    Returns:
+        Number of visited nodes
+    """
+    main_title = titles[0]
+    main_title_human = main_title.replace('_', ' ') + ' - Wikipedia CatTree'
+    basename = os.path.join(outdir, main_title)
+    Path(outdir).mkdir(parents=True, exist_ok=True)
+
+    files = [open(f'{basename}.{fmt}', 'w', encoding='utf-8') for fmt in formats]
+    writers = [OUTPUT_WRITERS[fmt](f, main_title_human) for fmt, f in zip(formats, files)]
+    visited = 0
+    try:
+        for node, node_depth, parent in graph.traverse(resolve_roots(graph, titles), depth, order):
+            path = ns_to_txt(graph.namespace(node)) + graph.title(node)
+            parent_path = None
+            if parent is not None:
+                parent_path = ns_to_txt(graph.namespace(parent)) + graph.title(parent)
+            for writer in writers:
+                writer.visit(path, node_depth, parent_path)
+            visited += 1
+        for writer in writers:
+            writer.close()
+    finally:
+        for f in files:
+            f.close()
+    return visited
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the Wikipedia category tree below the given categories")
+    parser.add_argument('-d', '--depth', type=int)
+    parser.add_argument('--outdir', default='out', help="Output directory")
+    parser.add_argument('--formats', default='txt,dot,html',
+                        help=f"Comma-separated output formats ({', '.join(OUTPUT_WRITERS)})")
+    parser.add_argument('--order', choices=('dfs', 'bfs'), default='dfs', help="Traversal order")
+    parser.add_argument('--cache', help="Directory for the cached graph arrays (default: <db>.catgraph)")
+    parser.add_argument('--rebuild-cache', action='store_true', help="Rebuild the cached graph from the database")
+    parser.add_argument('db')
+    parser.add_argument('titles', nargs='+')
+    args = parser.parse_args()
+
+    graph = CategoryGraph.load_or_build(args.db, args.cache, args.rebuild_cache)
+    formats = [fmt for fmt in args.formats.split(',') if fmt]
+    visited = write_hierarchy(graph, args.titles, args.outdir, formats, args.depth, args.order)
+    print(f"Visited {visited} pages")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+import fcntl
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from collections import deque
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+CATEGORY_NAMESPACE = 14
+CACHE_FILES = ('namespaces.npy', 'page_ids.npy', 'title_offsets.npy', 'titles.blob',
+               'indptr.npy', 'children.npy', 'category_order.npy')
+
+
+class CategoryGraph:
+    """
+    In-memory category graph with compact CSR adjacency.
+
+    Every page or category is a node with a dense integer id. Node ids are
+    assigned in ``page_namespace ASC, page_title DESC`` order, so the children
+    of a category (``children[indptr[n]:indptr[n + 1]]``, sorted by id) come
+    out in the same order as the original per-category SQL query.
+    """
+
+    def __init__(self, namespaces, page_ids, title_offsets, titles, indptr, children, category_order):
+        self.namespaces = namespaces
+        self.page_ids = page_ids
+        self.title_offsets = title_offsets
+        self.titles = titles
+        self.indptr = indptr
+        self.children = children
+        self.category_order = category_order
+        self._num_pages = None
+
+    def __len__(self):
+        return len(self.namespaces)
+
+    @property
+    def num_edges(self):
+        return len(self.children)
+
+    def title(self, node):
+        """Return the title of a node."""
+        return bytes(self.titles[self.title_offsets[node]:self.title_offsets[node + 1]]).decode('utf-8')
+
+    def namespace(self, node):
+        """Return the namespace number of a node."""
+        return int(self.namespaces[node])
+
+    def children_of(self, node):
+        """Return the child node ids of a category."""
+        return self.children[self.indptr[node]:self.indptr[node + 1]]
+
+    def find_category(self, title):
+        """Return the node id of a category title, or None if it is unknown."""
+        lo, hi = 0, len(self.category_order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            current = self.title(self.category_order[mid])
+            if current == title:
+                return int(self.category_order[mid])
+            if current < title:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def find_page(self, namespace, title):
+        """Return the node id of a page by namespace and title, or None."""
+        # Nodes with a page row are ordered by namespace ascending, title descending
+        if self._num_pages is None:
+            self._num_pages = int(np.count_nonzero(self.page_ids >= 0))
+        lo, hi = 0, self._num_pages
+        while lo < hi:
+            mid = (lo + hi) // 2
+            current_ns, current = self.namespace(mid), self.title(mid)
+            if current_ns == namespace and current == title:
+                return mid
+            if current_ns < namespace or (current_ns == namespace and current > title):
+                lo = mid + 1
+            else:
+                hi = mid
+        if namespace == CATEGORY_NAMESPACE:
+            return self.find_category(title)
+        return None
+
+    def traverse(self, roots, max_depth=None, order='dfs') -> Iterator[Tuple[int, int, Optional[int]]]:
+        """
+        Walk the category tree below ``roots``.
+
+        Each node is visited once, so cycles terminate. With ``order='dfs'``
+        the walk uses the same stack discipline as the original hierarchy
+        script; ``order='bfs'`` visits level by level.
+
+        Args:
+            roots: Node ids to start from
+            max_depth: Optional maximum depth below the roots
+            order: "dfs" or "bfs"
+
+        Yields:
+            ``(node, depth, parent)`` tuples, with ``parent`` None for roots
+        """
+        visited = np.zeros(len(self), dtype=bool)
+        pending = deque((root, 0, None) for root in roots)
+        pop = pending.pop if order == 'dfs' else pending.popleft
+
+        while pending:
+            node, depth, parent = pop()
+            if visited[node]:
+                continue
+            visited[node] = True
+            yield node, depth, parent
+
+            if self.namespaces[node] != CATEGORY_NAMESPACE:
+                continue
+            if max_depth is not None and depth >= max_depth:
+                continue
+            for child in self.children_of(node):
+                if not visited[child]:
+                    pending.append((int(child), depth + 1, node))
+
+    @classmethod
+    def from_sqlite(cls, db_path):
+        """
+        Bulk-load the graph from a database with ``page`` and ``categorylinks`` tables.
+
+        Args:
+            db_path: Path to the SQLite database
+
+        Returns:
+            CategoryGraph
+        """
+        con = sqlite3.connect(db_path)
+        try:
+            rows = con.execute('''
+                select page_id, page_namespace, page_title from page
+                where page_namespace = ? or exists (select 1 from categorylinks where cl_from = page_id)
+                order by page_namespace asc, page_title desc
+            ''', (CATEGORY_NAMESPACE,)).fetchall()
+            page_ids = np.array([row[0] for row in rows], dtype=np.int64)
+            namespaces = [row[1] for row in rows]
+            titles = [row[2] for row in rows]
+            del rows
+
+            category_nodes = {
+                title: node for node, (ns, title) in enumerate(zip(namespaces, titles))
+                if ns == CATEGORY_NAMESPACE
+            }
+            page_order = np.argsort(page_ids)
+            sorted_page_ids = page_ids[page_order]
+
+            parents, children = [], []
+            cursor = con.execute('select cl_from, cl_to from categorylinks')
+            while True:
+                batch = cursor.fetchmany(100000)
+                if not batch:
+                    break
+                child_pages = np.array([row[0] for row in batch], dtype=np.int64)
+                positions = np.searchsorted(sorted_page_ids, child_pages)
+                positions[positions == len(sorted_page_ids)] = 0
+                known = sorted_page_ids[positions] == child_pages
+                batch_parents = []
+                for (_, cl_to), is_known in zip(batch, known):
+                    if not is_known:
+                        continue
+                    parent = category_nodes.get(cl_to)
+                    if parent is None:
+                        # Category without a page of its own
+                        parent = category_nodes[cl_to] = len(titles)
+                        titles.append(cl_to)
+                        namespaces.append(CATEGORY_NAMESPACE)
+                    batch_parents.append(parent)
+                parents.append(np.array(batch_parents, dtype=np.int64))
+                children.append(page_order[positions[known]].astype(np.int32))
+        finally:
+            con.close()
+
+        num_nodes = len(titles)
+        page_ids = np.concatenate((page_ids, np.full(num_nodes - len(page_ids), -1, dtype=np.int64)))
+        parents = np.concatenate(parents) if parents else np.zeros(0, dtype=np.int64)
+        children = np.concatenate(children) if children else np.zeros(0, dtype=np.int32)
+        order = np.lexsort((children, parents))
+        indptr = np.concatenate(([0], np.cumsum(np.bincount(parents, minlength=num_nodes))))
+
+        encoded = [title.encode('utf-8') for title in titles]
+        title_offsets = np.concatenate(([0], np.cumsum([len(title) for title in encoded]))).astype(np.int64)
+        category_order = np.array(
+            sorted(category_nodes.values(), key=lambda node: titles[node]), dtype=np.int32
+        )
+        return cls(np.array(namespaces, dtype=np.int32), page_ids, title_offsets,
+                   np.frombuffer(b''.join(encoded), dtype=np.uint8), indptr.astype(np.int64),
+                   children[order], category_order)
+
+    def save(self, cache_dir):
+        """
+        Write the graph arrays to a cache directory.
+
+        The arrays are written to a temporary directory next to
+        ``cache_dir`` and swapped into place once complete, so a reader
+        never maps a partly written file.
+        """
+        cache_dir = os.path.abspath(cache_dir)
+        tmp_dir = tempfile.mkdtemp(prefix=os.path.basename(cache_dir) + '.', dir=os.path.dirname(cache_dir))
+        try:
+            for name in CACHE_FILES:
+                path = os.path.join(tmp_dir, name)
+                value = getattr(self, os.path.splitext(name)[0])
+                if name.endswith('.blob'):
+                    with open(path, 'wb') as f:
+                        f.write(value.tobytes())
+                else:
+                    np.save(path, value)
+            # A directory cannot be replaced while it has entries: move the old cache aside first
+            old_dir = None
+            if os.path.exists(cache_dir):
+                old_dir = tmp_dir + '.old'
+                os.replace(cache_dir, old_dir)
+            os.replace(tmp_dir, cache_dir)
+            if old_dir:
+                shutil.rmtree(old_dir, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+    @classmethod
+    def load(cls, cache_dir):
+        """Memory-map a graph previously written with ``save``."""
+        arrays = {}
+        for name in CACHE_FILES:
+            path = os.path.join(cache_dir, name)
+            key = os.path.splitext(name)[0]
+            if name.endswith('.blob'):
+                arrays[key] = np.memmap(path, dtype=np.uint8, mode='r') if os.path.getsize(path) \
+                    else np.zeros(0, dtype=np.uint8)
+            else:
+                arrays[key] = np.load(path, mmap_mode='r')
+        return cls(**arrays)
+
+    @classmethod
+    def load_or_build(cls, db_path, cache_dir=None, rebuild=False):
+        """
+        Load the graph from its cache, building and caching it if needed.
+
+        The cache is rebuilt when it is missing, older than the database or
+        ``rebuild`` is set. Staleness is checked under a shared lock on
+        ``<cache_dir>.lock`` and the cache rebuilt under an exclusive one,
+        so processes starting together build it once.
+
+        Args:
+            db_path: Path to the SQLite database
+            cache_dir: Cache directory, defaults to ``<db_path>.catgraph``
+            rebuild: Force a rebuild from the database
+
+        Returns:
+            CategoryGraph
+        """
+        cache_dir = os.path.abspath(cache_dir or f"{db_path}.catgraph")
+        marker = os.path.join(cache_dir, CACHE_FILES[-1])
+
+        def stale():
+            return not os.path.exists(marker) or os.path.getmtime(marker) < os.path.getmtime(db_path)
+
+        with open(cache_dir + '.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_SH)
+            if not rebuild and not stale():
+                return cls.load(cache_dir)
+
+            # Converting the lock releases it first: recheck once exclusive
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if not rebuild and not stale():
+                return cls.load(cache_dir)
+            start = time.time()
+            graph = cls.from_sqlite(db_path)
+            graph.save(cache_dir)
+            print(f"Built category graph with {len(graph)} nodes and {graph.num_edges} edges "
+                  f"in {time.time() - start:.1f}s, cached to {cache_dir}")
+            return graph
+
+
+def resolve_roots(graph: CategoryGraph, titles: List[str]) -> List[int]:
+    """Map category titles to node ids, warning about unknown titles."""
+    roots = []
+    for title in titles:
+        node = graph.find_category(title)
+        if node is None:
+            print(f"Warning: category not found: {title}")
+        else:
+            roots.append(node)
+    return roots
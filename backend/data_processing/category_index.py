@@ -0,0 +1,350 @@
+import argparse
+import json
+import os
+import time
+from collections import deque
+
+import numpy as np
+
+from category_graph import CACHE_FILES, CATEGORY_NAMESPACE, CategoryGraph
+
+INDEX_FILES = ('post', 'by_post', 'depth', 'dag_mask', 'interval_indptr', 'interval_lo',
+               'interval_hi', 'parent_indptr', 'parents')
+
+
+def source_stamp(paths):
+    """Modification time and size of the files an index is built from."""
+    stamp = {}
+    for path in paths:
+        stat = os.stat(path)
+        stamp[os.path.abspath(path)] = [stat.st_mtime_ns, stat.st_size]
+    return stamp
+
+
+def _merge_intervals(lo, hi):
+    """Merge overlapping or adjacent closed intervals."""
+    order = np.argsort(lo, kind='stable')
+    lo, hi = lo[order], hi[order]
+    reach = np.maximum.accumulate(hi)
+    starts = np.flatnonzero(np.concatenate(([True], lo[1:] > reach[:-1] + 1)))
+    return lo[starts], np.maximum.reduceat(hi, starts)
+
+
+def _csr_edges(indptr, nodes):
+    """Return the CSR edge positions of all out-edges of ``nodes``."""
+    starts = indptr[nodes]
+    counts = indptr[nodes + 1] - starts
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    return np.repeat(starts - offsets, counts) + np.arange(counts.sum())
+
+
+class CategoryIndex:
+    """
+    Reachability index over the category graph.
+
+    Cycles are broken by dropping DFS back edges. Every node gets a post-order
+    number, and every category stores a compressed list of post-order
+    intervals covering all of its descendants (its spanning-tree interval
+    plus whatever it reaches through non-tree edges). Membership queries
+    are then a binary search in that list. Non-category pages are leaves and
+    need no list of their own.
+    """
+
+    def __init__(self, graph, post, by_post, depth, dag_mask, interval_indptr, interval_lo,
+                 interval_hi, parent_indptr, parents):
+        self.graph = graph
+        self.post = post
+        self.by_post = by_post
+        self.depth = depth
+        self.dag_mask = dag_mask
+        self.interval_indptr = interval_indptr
+        self.interval_lo = interval_lo
+        self.interval_hi = interval_hi
+        self.parent_indptr = parent_indptr
+        self.parents = parents
+
+    @classmethod
+    def build(cls, graph):
+        """
+        Build the index for a CategoryGraph.
+
+        Args:
+            graph: Loaded CategoryGraph
+
+        Returns:
+            CategoryIndex
+        """
+        num_nodes = len(graph)
+        indptr, children = graph.indptr, np.asarray(graph.children)
+        is_category = np.asarray(graph.namespaces) == CATEGORY_NAMESPACE
+        post = np.full(num_nodes, -1, dtype=np.int64)
+        low = np.zeros(num_nodes, dtype=np.int64)
+        dag_mask = np.ones(len(children), dtype=bool)
+        state = np.zeros(num_nodes, dtype=np.int8)  # 0 new, 1 on stack, 2 done
+        next_post = 0
+
+        # Depth-first search from the roots first, then from whatever is left (pure cycles)
+        in_degree = np.bincount(children, minlength=num_nodes)
+        start_nodes = np.concatenate((np.flatnonzero(in_degree == 0), np.arange(num_nodes)))
+        for start in start_nodes:
+            if state[start]:
+                continue
+            state[start] = 1
+            low[start] = next_post
+            stack = [(int(start), int(indptr[start]))]
+            while stack:
+                node, edge = stack[-1]
+                if edge < indptr[node + 1]:
+                    stack[-1] = (node, edge + 1)
+                    child = int(children[edge])
+                    if state[child] == 0:
+                        state[child] = 1
+                        low[child] = next_post
+                        stack.append((child, int(indptr[child])))
+                    elif state[child] == 1:
+                        dag_mask[edge] = False
+                else:
+                    state[node] = 2
+                    post[node] = next_post
+                    next_post += 1
+                    stack.pop()
+
+        by_post = np.argsort(post).astype(np.int32)
+
+        # Interval lists, children before parents (increasing post order)
+        intervals = {}
+        for node in by_post:
+            if not is_category[node]:
+                continue
+            edges = np.arange(indptr[node], indptr[node + 1])
+            kids = children[edges[dag_mask[edges]]]
+            los, his = [np.array([low[node]])], [np.array([post[node]])]
+            for kid in kids[is_category[kids]]:
+                kid_lo, kid_hi = intervals[kid]
+                los.append(kid_lo)
+                his.append(kid_hi)
+            leaves = kids[~is_category[kids]]
+            los.append(post[leaves])
+            his.append(post[leaves])
+            intervals[node] = _merge_intervals(np.concatenate(los), np.concatenate(his))
+
+        counts = np.zeros(num_nodes, dtype=np.int64)
+        for node, (node_lo, _) in intervals.items():
+            counts[node] = len(node_lo)
+        interval_indptr = np.concatenate(([0], np.cumsum(counts)))
+        interval_lo = np.zeros(interval_indptr[-1], dtype=np.int64)
+        interval_hi = np.zeros(interval_indptr[-1], dtype=np.int64)
+        for node, (node_lo, node_hi) in intervals.items():
+            interval_lo[interval_indptr[node]:interval_indptr[node + 1]] = node_lo
+            interval_hi[interval_indptr[node]:interval_indptr[node + 1]] = node_hi
+        del intervals
+
+        # Parent adjacency and minimum depth from the roots over DAG edges
+        edge_parents = np.repeat(np.arange(num_nodes), np.diff(indptr))[dag_mask]
+        edge_children = children[dag_mask]
+        order = np.argsort(edge_children, kind='stable')
+        parents = edge_parents[order].astype(np.int32)
+        parent_indptr = np.concatenate(([0], np.cumsum(np.bincount(edge_children, minlength=num_nodes))))
+        depth = cls._min_depths(indptr, children, dag_mask, parent_indptr)
+
+        return cls(graph, post, by_post, depth, dag_mask, interval_indptr, interval_lo,
+                   interval_hi, parent_indptr, parents)
+
+    @staticmethod
+    def _min_depths(indptr, children, dag_mask, parent_indptr):
+        num_nodes = len(indptr) - 1
+        depth = np.full(num_nodes, -1, dtype=np.int32)
+        frontier = np.flatnonzero(np.diff(parent_indptr) == 0)
+        level = 0
+        while len(frontier):
+            depth[frontier] = level
+            edges = _csr_edges(indptr, frontier)
+            nxt = np.unique(children[edges[dag_mask[edges]]])
+            frontier = nxt[depth[nxt] == -1]
+            level += 1
+        return depth
+
+    def reaches(self, ancestor, node):
+        """Return True if ``node`` is ``ancestor`` or one of its descendants."""
+        if ancestor == node:
+            return True
+        start, end = self.interval_indptr[ancestor], self.interval_indptr[ancestor + 1]
+        if start == end:
+            return False
+        target = self.post[node]
+        i = int(np.searchsorted(self.interval_lo[start:end], target, side='right')) - 1
+        return i >= 0 and target <= self.interval_hi[start + i]
+
+    def is_descendant(self, node, ancestor, max_depth=None):
+        """
+        Check whether ``node`` lies under ``ancestor``.
+
+        Args:
+            node: Node id of the page or category
+            ancestor: Node id of the category
+            max_depth: Optional maximum number of edges between the two
+
+        Returns:
+            True if ``node`` is reachable from ``ancestor`` (within ``max_depth``)
+        """
+        if not self.reaches(ancestor, node):
+            return False
+        if max_depth is None or node == ancestor:
+            return True
+
+        # Bounded BFS that only follows children that can still reach the node
+        frontier, seen = [ancestor], {ancestor}
+        for _ in range(max_depth):
+            next_frontier = []
+            for current in frontier:
+                for child in self._dag_children(current):
+                    if child == node:
+                        return True
+                    if child not in seen and self.reaches(child, node):
+                        seen.add(child)
+                        next_frontier.append(child)
+            frontier = next_frontier
+        return False
+
+    def subtree_members(self, ancestor, namespace=0):
+        """
+        Return every node under ``ancestor`` in the given namespace.
+
+        Args:
+            ancestor: Node id of the category
+            namespace: Namespace to keep, or None for all nodes
+
+        Returns:
+            Array of node ids
+        """
+        start, end = self.interval_indptr[ancestor], self.interval_indptr[ancestor + 1]
+        members = np.concatenate([self.by_post[lo:hi + 1] for lo, hi in
+                                  zip(self.interval_lo[start:end], self.interval_hi[start:end])]
+                                 or [np.zeros(0, dtype=np.int32)])
+        if namespace is not None:
+            members = members[np.asarray(self.graph.namespaces)[members] == namespace]
+        return members
+
+    def ancestors(self, node):
+        """Return the set of categories ``node`` lies under."""
+        seen, queue = set(), deque([node])
+        while queue:
+            current = queue.popleft()
+            for parent in self.parents[self.parent_indptr[current]:self.parent_indptr[current + 1]]:
+                parent = int(parent)
+                if parent not in seen:
+                    seen.add(parent)
+                    queue.append(parent)
+        return seen
+
+    def lowest_common_category(self, first, second):
+        """
+        Return the deepest category containing both nodes, or None.
+
+        Depth is the minimum distance from a root category; ties are broken
+        by node id.
+        """
+        common = [c for c in self.ancestors(first) | ({first} if self._is_category(first) else set())
+                  if self.reaches(c, second)]
+        if not common:
+            return None
+        return max(common, key=lambda c: (self.depth[c], -c))
+
+    def _is_category(self, node):
+        return self.graph.namespaces[node] == CATEGORY_NAMESPACE
+
+    def _dag_children(self, node):
+        start, end = self.graph.indptr[node], self.graph.indptr[node + 1]
+        return [int(c) for c in self.graph.children[start:end][self.dag_mask[start:end]]]
+
+    def save(self, index_dir, source=None):
+        """
+        Write the index arrays to a directory.
+
+        Args:
+            index_dir: Output directory
+            source: ``source_stamp`` of the inputs, written last to
+                ``source.json`` so an interrupted save reads as stale
+        """
+        os.makedirs(index_dir, exist_ok=True)
+        source_file = os.path.join(index_dir, 'source.json')
+        if os.path.exists(source_file):
+            os.remove(source_file)
+        for name in INDEX_FILES:
+            np.save(os.path.join(index_dir, f'{name}.npy'), getattr(self, name))
+        with open(source_file, 'w', encoding='utf-8') as f:
+            json.dump(source or {}, f)
+
+    @staticmethod
+    def stored_source(index_dir):
+        """Return the ``source_stamp`` an index was saved with, or None."""
+        try:
+            with open(os.path.join(index_dir, 'source.json'), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    @classmethod
+    def load_or_build(cls, graph, index_dir, source, rebuild=False):
+        """
+        Load an index, rebuilding it if its inputs changed since it was saved.
+
+        Args:
+            graph: CategoryGraph the index is built over
+            index_dir: Index directory
+            source: ``source_stamp`` of the files ``graph`` was loaded from
+            rebuild: Force a rebuild
+
+        Returns:
+            CategoryIndex
+        """
+        if not rebuild and cls.stored_source(index_dir) == source:
+            return cls.load(graph, index_dir)
+        start = time.time()
+        index = cls.build(graph)
+        index.save(index_dir, source)
+        print(f"Built index with {len(index.interval_lo)} intervals in {time.time() - start:.1f}s")
+        return index
+
+    @classmethod
+    def load(cls, graph, index_dir):
+        """Memory-map an index previously written with ``save``."""
+        arrays = {name: np.load(os.path.join(index_dir, f'{name}.npy'), mmap_mode='r') for name in INDEX_FILES}
+        return cls(graph, **arrays)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the category reachability index")
+    parser.add_argument('db', help="SQLite database with page and categorylinks tables")
+    parser.add_argument('--cache', help="Directory for the cached graph arrays (default: <db>.catgraph)")
+    parser.add_argument('--index', help="Index directory (default: <db>.catindex)")
+    parser.add_argument('--rebuild', action='store_true', help="Rebuild the index")
+    parser.add_argument('--descendant', nargs=2, metavar=('PAGE', 'CATEGORY'),
+                        help="Check whether an article is under a category")
+    parser.add_argument('--depth', type=int, help="Maximum depth for --descendant")
+    parser.add_argument('--members', metavar='CATEGORY', help="Count articles under a category")
+    parser.add_argument('--lca', nargs=2, metavar=('PAGE', 'PAGE'), help="Lowest common category of two articles")
+    args = parser.parse_args()
+
+    graph = CategoryGraph.load_or_build(args.db, args.cache)
+    # Node ids come from the graph cache, which is rebuilt whenever the database changes
+    cache_dir = args.cache or f"{args.db}.catgraph"
+    source = source_stamp([args.db, os.path.join(cache_dir, CACHE_FILES[-1])])
+    index = CategoryIndex.load_or_build(graph, args.index or f"{args.db}.catindex", source, args.rebuild)
+
+    if args.descendant:
+        page, category = graph.find_page(0, args.descendant[0]), graph.find_category(args.descendant[1])
+        if page is None or category is None:
+            print("Unknown page or category")
+        else:
+            print(index.is_descendant(page, category, args.depth))
+    if args.members:
+        category = graph.find_category(args.members)
+        print(len(index.subtree_members(category)) if category is not None else "Unknown category")
+    if args.lca:
+        first, second = graph.find_page(0, args.lca[0]), graph.find_page(0, args.lca[1])
+        lca = index.lowest_common_category(first, second) if first is not None and second is not None else None
+        print(graph.title(lca) if lca is not None else "No common category")
+
+if __name__ == '__main__':
+    main()
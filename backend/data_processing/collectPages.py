@@ -8,6 +8,7 @@ from tqdm import tqdm  # For progress bar
 
 # Regex pattern for XML tags
 tagRE = re.compile(r'(.*?)<(/?\w+)[^>]*>(?:([^<]*)(<.*?>)?)?')
+redirectRE = re.compile(r'<redirect title="([^"]*)"')
 
 def count_pages(input_file):
     """Count total number of pages in the XML dump for progress bar."""
@@ -24,7 +25,7 @@ def count_pages(input_file):
 
 def collect_pages(input_file):
     """
-    Extract all page IDs and titles from Wikipedia dump.
+    Extract all page IDs, titles and redirect targets from Wikipedia dump.
     Stores results in JSONL format for efficient processing.
     """
     # Create output filename based on input filename
@@ -49,7 +50,7 @@ def collect_pages(input_file):
     # Open output file in write mode
     output_stream = open(output_file, 'w', encoding='utf-8', buffering=buffer_size)
     
-    current_page = {"id": None, "title": None, "namespace": None}
+    current_page = {"id": None, "title": None, "namespace": None, "redirect": None}
     in_page = False
     total_pages = count_pages(input_file)
     
@@ -57,7 +58,7 @@ def collect_pages(input_file):
         with tqdm(total=total_pages, desc="Processing pages") as pbar:
             for line in input_stream:
                 if '<page>' in line:
-                    current_page = {"id": None, "title": None, "namespace": None}
+                    current_page = {"id": None, "title": None, "namespace": None, "redirect": None}
                     in_page = True
                     continue
                     
@@ -77,6 +78,11 @@ def collect_pages(input_file):
                         if match and match.group(2) == 'ns':
                             current_page["namespace"] = match.group(3)
                     
+                    elif '<redirect' in line:
+                        match = redirectRE.search(line)
+                        if match:
+                            current_page["redirect"] = match.group(1)
+                    
                     elif '</page>' in line:
                         if current_page["id"] and current_page["title"]:
                             # Write to JSONL file
@@ -0,0 +1,218 @@
+import argparse
+import bz2
+import json
+import multiprocessing as mp
+import os
+import re
+import time
+import traceback
+
+_decoder = json.JSONDecoder()
+_scan_string = json.decoder.scanstring
+_whitespace = re.compile(r'[ \t\n\r]*')
+_string = re.compile(r'"(?:[^"\\]|\\.)*"', re.S)
+
+# Worker -> reader messages
+_BATCH, _DONE, _ERROR = 0, 1, 2
+
+
+def project_fields(line, fields):
+    """
+    Decode only the given top-level fields of a JSON object.
+
+    Keys are scanned in document order and decoding stops as soon as all
+    requested fields were found, so large fields after them (``text``,
+    ``sections``) are never touched. Unwanted strings before them are
+    skipped with a regex instead of being unescaped.
+
+    Args:
+        line: One JSON object
+        fields: Set of field names to keep
+
+    Returns:
+        Dict with the requested fields that are present
+    """
+    result = {}
+    remaining = len(fields)
+    pos = _whitespace.match(line, 0).end()
+    if line[pos:pos + 1] != '{':
+        raise ValueError(f"Expected a JSON object at position {pos}")
+    pos = _whitespace.match(line, pos + 1).end()
+    if line[pos:pos + 1] == '}':
+        return result
+
+    while True:
+        key, pos = _scan_string(line, pos + 1)
+        pos = _whitespace.match(line, pos).end()
+        pos = _whitespace.match(line, pos + 1).end()  # ':'
+        if key in fields:
+            result[key], pos = _decoder.raw_decode(line, pos)
+            remaining -= 1
+            if not remaining:
+                return result
+        elif line[pos] == '"':
+            pos = _string.match(line, pos).end()
+        else:
+            _, pos = _decoder.raw_decode(line, pos)
+        pos = _whitespace.match(line, pos).end()
+        if line[pos] == '}':
+            return result
+        pos = _whitespace.match(line, pos + 1).end()  # ','
+
+
+def find_corpus_files(path):
+    """
+    List the corpus files under a directory in a stable order.
+
+    Both WikiExtractor output (``AA/wiki_00``, optionally ``.bz2``) and
+    ``process_all_pages`` shards (``wiki_pages_NNNN.jsonl``) are picked up.
+    """
+    if os.path.isfile(path):
+        return [path]
+    files = []
+    for root, _, names in os.walk(path):
+        files.extend(os.path.join(root, name) for name in names if name.startswith('wiki_'))
+    return sorted(files)
+
+
+def read_file(file_path, fields=None):
+    """Yield the records of one corpus file, optionally projected to ``fields``."""
+    opener = bz2.open if file_path.endswith('.bz2') else open
+    with opener(file_path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            yield project_fields(line, fields) if fields else json.loads(line)
+
+
+def _read_worker(tasks, results, fields, func, batch_size):
+    try:
+        batch = []
+        for file_path in iter(tasks.get, None):
+            for record in read_file(file_path, fields):
+                if func is not None:
+                    record = func(record)
+                    if record is None:
+                        continue
+                batch.append(record)
+                if len(batch) >= batch_size:
+                    results.put((_BATCH, batch))
+                    batch = []
+        if batch:
+            results.put((_BATCH, batch))
+        results.put((_DONE, None))
+    except Exception:
+        results.put((_ERROR, traceback.format_exc()))
+
+
+class CorpusReader:
+    """
+    Streaming reader over extracted Wikipedia articles.
+
+    Files are split deterministically between nodes (every ``num_shards``-th
+    file starting at ``shard_index`` of the sorted file list) and then
+    between local worker processes. Workers decode records, apply the
+    optional per-record function and hand batches back through a bounded
+    queue, so read-ahead never exceeds ``prefetch`` batches.
+
+    With more than one worker, records come out in no particular order.
+    """
+
+    def __init__(self, path, fields=None, shard_index=0, num_shards=1, workers=1,
+                 prefetch=16, batch_size=256):
+        """
+        Args:
+            path: Corpus directory or a single file
+            fields: Optional iterable of top-level fields to decode
+            shard_index: Index of this node's shard
+            num_shards: Total number of shards
+            workers: Number of reader processes (1 reads in-process)
+            prefetch: Maximum number of batches read ahead
+            batch_size: Records per batch sent from a worker
+        """
+        if not 0 <= shard_index < num_shards:
+            raise ValueError(f"shard_index must be in [0, {num_shards}), got {shard_index}")
+        self.path = path
+        self.fields = frozenset(fields) if fields else None
+        self.shard_index = shard_index
+        self.num_shards = num_shards
+        self.workers = max(1, workers)
+        self.prefetch = prefetch
+        self.batch_size = batch_size
+
+    @property
+    def files(self):
+        """The files read by this shard."""
+        return find_corpus_files(self.path)[self.shard_index::self.num_shards]
+
+    def __iter__(self):
+        return self.map(None)
+
+    def map(self, func):
+        """
+        Yield ``func(record)`` for every record, computed in the workers.
+
+        Records for which ``func`` returns None are dropped. ``func`` must be
+        picklable (a module-level function) when ``workers > 1``.
+        """
+        files = self.files
+        workers = min(self.workers, len(files))
+        if workers <= 1:
+            for file_path in files:
+                for record in read_file(file_path, self.fields):
+                    if func is not None:
+                        record = func(record)
+                        if record is None:
+                            continue
+                    yield record
+            return
+
+        tasks = mp.Queue()
+        results = mp.Queue(maxsize=self.prefetch)
+        for file_path in files:
+            tasks.put(file_path)
+        for _ in range(workers):
+            tasks.put(None)
+
+        processes = [mp.Process(target=_read_worker, daemon=True,
+                                args=(tasks, results, self.fields, func, self.batch_size))
+                     for _ in range(workers)]
+        for process in processes:
+            process.start()
+
+        try:
+            running = workers
+            while running:
+                kind, payload = results.get()
+                if kind == _BATCH:
+                    yield from payload
+                elif kind == _DONE:
+                    running -= 1
+                else:
+                    raise RuntimeError(f"Corpus reader worker failed:\n{payload}")
+        finally:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+                process.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read an extracted Wikipedia corpus and report throughput")
+    parser.add_argument("path", help="WikiExtractor output or process_all_pages directory")
+    parser.add_argument("--fields", help="Comma-separated fields to decode (default: all)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Reader processes")
+    parser.add_argument("--shard-index", type=int, default=0, help="Index of this node's shard")
+    parser.add_argument("--num-shards", type=int, default=1, help="Total number of shards")
+
+    args = parser.parse_args()
+    fields = args.fields.split(',') if args.fields else None
+    reader = CorpusReader(args.path, fields, args.shard_index, args.num_shards, args.workers)
+    start = time.time()
+    count = sum(1 for _ in reader)
+    elapsed = time.time() - start
+    print(f"Read {count} records from {len(reader.files)} files in {elapsed:.1f}s "
+          f"({count / max(elapsed, 1e-9):.0f} records/s)")
+
+if __name__ == '__main__':
+    main()
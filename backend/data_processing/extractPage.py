@@ -6,7 +6,10 @@ import bz2
 import json
 import html
 import mmap
-from multiprocessing import Pool, cpu_count
+from multiprocessing import Pool
+
+from title_lookup import TitleLookup
+from resource_governor import available_cores
 
 # Regex patterns
 tagRE = re.compile(r'(.*?)<(/?\w+)[^>]*>(?:([^<]*)(<.*?>)?)?')
@@ -156,6 +159,140 @@ def clean_section_text(section_data):
     
     return cleaned_sections
 
+_encode = json.JSONEncoder(ensure_ascii=False).encode
+
+class Section:
+    """
+    One section or subsection of a page.
+
+    Lines are appended while parsing and replaced by the cleaned text in
+    place, so no cleaned copy of the section is ever built. Serializes to
+    the same JSON as ``clean_section_text`` output.
+    """
+
+    __slots__ = ('title', 'level', 'content', 'links', 'references', 'external_urls', 'subsections', 'cleaned')
+
+    def __init__(self, title, level, has_subsections=True):
+        self.title = title
+        self.level = level
+        self.content = []
+        self.links = []
+        self.references = []
+        self.external_urls = []
+        self.subsections = [] if has_subsections else None
+        self.cleaned = False
+
+    def add_line(self, line):
+        self.content.append(line)
+        if '[[' in line:
+            self.links.extend(extract_wiki_links(line))
+        if '<ref' in line:
+            self.references.extend(extract_references(line))
+        if "http" in line:
+            self.external_urls.extend(urlRE.findall(line))
+
+    def clean(self):
+        """Clean the text and deduplicate the lists in place (once)."""
+        if not self.cleaned:
+            self.title = clean_text(self.title)
+            self.content = clean_text('\n'.join(self.content))
+            self.links = list(dict.fromkeys(self.links))
+            self.references = list(dict.fromkeys(self.references))
+            self.external_urls = list(dict.fromkeys(self.external_urls))
+            for subsection in self.subsections or ():
+                subsection.clean()
+            self.cleaned = True
+        return self
+
+    def to_dict(self):
+        self.clean()
+        data = {
+            "title": self.title,
+            "level": self.level,
+            "content": self.content,
+            "links": self.links,
+            "references": self.references,
+            "external_urls": self.external_urls
+        }
+        if self.subsections is not None:
+            data["subsections"] = [subsection.to_dict() for subsection in self.subsections]
+        return data
+
+    def to_json(self):
+        self.clean()
+        subsections = ''
+        if self.subsections is not None:
+            subsections = ', "subsections": [' + ', '.join(s.to_json() for s in self.subsections) + ']'
+        return (f'{{"title": {_encode(self.title)}, "level": {self.level}, '
+                f'"content": {_encode(self.content)}, "links": {_encode(self.links)}, '
+                f'"references": {_encode(self.references)}, '
+                f'"external_urls": {_encode(self.external_urls)}{subsections}}}')
+
+class Page:
+    """A processed page, serialized straight to a ``wiki_pages_*.jsonl`` line."""
+
+    __slots__ = ('id', 'title', 'namespace', 'sections')
+
+    def __init__(self, id=None, title=None, namespace=None, sections=None):
+        self.id = id
+        self.title = title
+        self.namespace = namespace
+        self.sections = sections if sections is not None else []
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "title": self.title,
+            "namespace": self.namespace,
+            "sections": [section.to_dict() for section in self.sections]
+        }
+
+    def to_json(self):
+        sections = ', '.join(section.to_json() for section in self.sections)
+        return (f'{{"id": {_encode(self.id)}, "title": {_encode(self.title)}, '
+                f'"namespace": {_encode(self.namespace)}, "sections": [{sections}]}}')
+
+def parse_sections(lines):
+    """
+    Split page lines into Section records (same structure as ``extract_sections``).
+
+    Args:
+        lines: Iterable of lines, with or without trailing newlines
+
+    Returns:
+        List of uncleaned Section records; cleaning happens on serialization
+    """
+    sections = []
+    current_section = Section("Introduction", 0)
+    current_subsection = None
+
+    for line in lines:
+        line = line.rstrip('\n')
+        match = sectionRE.match(line) if line.startswith('==') else None
+        if match:
+            level = len(match.group(1))
+            title = match.group(2).strip()
+
+            if level == 2:  # Main section
+                if current_section.content or current_section.subsections:
+                    sections.append(current_section)
+                current_section = Section(title, level)
+                current_subsection = None
+            elif level > 2:  # Subsection
+                if current_subsection is not None and current_subsection.content:
+                    current_section.subsections.append(current_subsection)
+                current_subsection = Section(title, level, has_subsections=False)
+        elif line.strip():
+            (current_subsection if current_subsection is not None else current_section).add_line(line)
+
+    # Add final sections
+    if current_subsection is not None and current_subsection.content:
+        current_section.subsections.append(current_subsection)
+    if current_section.content or current_section.subsections:
+        sections.append(current_section)
+
+    return sections
+
 def find_page_position(input_file, page_id):
     """Find the starting position of a page in the file."""
     with open(input_file, 'rb') as f:
@@ -223,12 +360,9 @@ def process_data(input_file, page_ids, parallel=False):
     # Check JSONL index if available
     jsonl_file = f"{os.path.splitext(input_file)[0]}_pages.jsonl"
     if os.path.exists(jsonl_file):
-        valid_ids = set()
-        with open(jsonl_file, 'r', encoding='utf-8') as f:
-            for line in f:
-                data = json.loads(line)
-                if data['id'] in page_ids:
-                    valid_ids.add(data['id'])
+        lookup = TitleLookup.open(jsonl_file)
+        valid_ids = {page_id for page_id in page_ids
+                     if page_id.isdigit() and lookup.title_of(int(page_id)) is not None}
         
         invalid_ids = set(page_ids) - valid_ids
         if invalid_ids:
@@ -241,7 +375,7 @@ def process_data(input_file, page_ids, parallel=False):
     
     if parallel and len(page_ids) > 1:
         # Use multiprocessing for multiple pages
-        with Pool(cpu_count() - 1) as pool:
+        with Pool(max(1, len(available_cores()) - 1)) as pool:
             args = [(input_file, page_id) for page_id in page_ids]
             results = pool.starmap(process_page, args)
             processed = [r for r in results if r is not None]
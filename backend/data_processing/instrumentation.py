@@ -0,0 +1,244 @@
+import bisect
+import cProfile
+import json
+import os
+import time
+import tracemalloc
+
+# Latency histogram bucket upper bounds in seconds: 10us .. ~170s, doubling
+BUCKETS = tuple(1e-5 * 2 ** i for i in range(25))
+
+
+class _NullStage:
+    """Stage context used when instrumentation is disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    """Times one execution of a stage; profiles it if profiling is on."""
+
+    __slots__ = ('metrics', 'name', 'start', 'outer_profiler', 'outer_peak')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        metrics = self.metrics
+        if metrics.profile_dir is not None:
+            # cProfile allows one active profiler: pause the enclosing stage's
+            self.outer_profiler = metrics._active_profiler
+            if self.outer_profiler is not None:
+                self.outer_profiler.disable()
+            profiler = metrics._profilers.setdefault(self.name, cProfile.Profile())
+            metrics._active_profiler = profiler
+            # reset_peak discards the enclosing stage's peak: keep it to restore on exit
+            self.outer_peak = max(tracemalloc.get_traced_memory()[1], metrics._carried_peak)
+            metrics._carried_peak = 0
+            tracemalloc.reset_peak()
+            profiler.enable()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        metrics = self.metrics
+        if metrics.profile_dir is not None:
+            metrics._active_profiler.disable()
+            metrics._active_profiler = self.outer_profiler
+            peak = max(tracemalloc.get_traced_memory()[1], metrics._carried_peak)
+            metrics._carried_peak = max(self.outer_peak, peak)
+            # Snapshots are expensive: only retake one when the peak grows by a quarter
+            if peak > 1.25 * metrics._alloc_peaks.get(self.name, (0, None))[0]:
+                metrics._alloc_peaks[self.name] = (peak, tracemalloc.take_snapshot())
+            if self.outer_profiler is not None:
+                self.outer_profiler.enable()
+        metrics.observe(self.name, elapsed)
+        return False
+
+
+class Metrics:
+    """
+    Per-stage timers, counters and latency histograms.
+
+    Use ``with metrics.stage('ner'):`` around a stage and ``metrics.count``
+    for processed volumes. Histograms use fixed buckets, so snapshots taken
+    in worker processes merge exactly in the parent. A disabled instance
+    returns a shared no-op context and ignores counts.
+
+    With ``profile_dir`` set, every stage is run under its own cProfile
+    profiler (an enclosing stage is paused meanwhile, so time is attributed
+    to the innermost stage) and a tracemalloc snapshot is kept from the
+    stage call with the largest allocation peak; ``write_profiles`` dumps
+    both.
+    """
+
+    def __init__(self, enabled=True, profile_dir=None):
+        """
+        Args:
+            enabled: Record anything at all
+            profile_dir: Directory for per-stage cProfile and allocation dumps
+        """
+        self.enabled = enabled or profile_dir is not None
+        self.profile_dir = profile_dir
+        self.stages = {}
+        self.counters = {}
+        self._profilers = {}
+        self._alloc_peaks = {}
+        self._active_profiler = None
+        # Allocation peak of the enclosing stage before the current inner one reset it
+        self._carried_peak = 0
+        if profile_dir is not None and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stage(self, name):
+        """Context manager timing one execution of a stage."""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def observe(self, name, seconds):
+        """Record one stage latency."""
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = {'count': 0, 'sum': 0.0, 'max': 0.0, 'buckets': [0] * (len(BUCKETS) + 1)}
+        stage['count'] += 1
+        stage['sum'] += seconds
+        if seconds > stage['max']:
+            stage['max'] = seconds
+        stage['buckets'][bisect.bisect_left(BUCKETS, seconds)] += 1
+
+    def count(self, name, value=1):
+        """Add to a counter, e.g. bytes or tokens processed."""
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def cache(self, name, hit):
+        """Record a cache lookup; hit rates appear in the report."""
+        if self.enabled:
+            key = f"cache_{name}_{'hits' if hit else 'misses'}"
+            self.counters[key] = self.counters.get(key, 0) + 1
+
+    def snapshot(self):
+        """Picklable copy of the recorded values, for sending to another process."""
+        return {
+            'stages': {name: dict(stage, buckets=list(stage['buckets'])) for name, stage in self.stages.items()},
+            'counters': dict(self.counters)
+        }
+
+    def merge(self, snapshot):
+        """Add a snapshot from another Metrics instance (e.g. a worker process)."""
+        if not snapshot:
+            return
+        for name, other in snapshot['stages'].items():
+            stage = self.stages.get(name)
+            if stage is None:
+                self.stages[name] = dict(other, buckets=list(other['buckets']))
+                continue
+            stage['count'] += other['count']
+            stage['sum'] += other['sum']
+            stage['max'] = max(stage['max'], other['max'])
+            stage['buckets'] = [a + b for a, b in zip(stage['buckets'], other['buckets'])]
+        for name, value in snapshot['counters'].items():
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def reset(self):
+        """Drop the recorded values (profiles are kept)."""
+        self.stages = {}
+        self.counters = {}
+
+    def report(self):
+        """
+        Summarize the recorded values.
+
+        Returns:
+            Dictionary with per-stage count, total, mean, max and estimated
+            p50/p90/p99 seconds, the counters, and cache hit rates
+        """
+        stages = {}
+        for name, stage in self.stages.items():
+            stages[name] = {
+                'count': stage['count'],
+                'total_sec': stage['sum'],
+                'mean_sec': stage['sum'] / max(stage['count'], 1),
+                'max_sec': stage['max'],
+                'p50_sec': _quantile(stage, 0.5),
+                'p90_sec': _quantile(stage, 0.9),
+                'p99_sec': _quantile(stage, 0.99)
+            }
+        hit_rates = {}
+        for key, hits in self.counters.items():
+            if key.startswith('cache_') and key.endswith('_hits'):
+                name = key[len('cache_'):-len('_hits')]
+                misses = self.counters.get(f'cache_{name}_misses', 0)
+                hit_rates[name] = hits / max(hits + misses, 1)
+        return {'stages': stages, 'counters': dict(self.counters), 'cache_hit_rates': hit_rates}
+
+    def to_prometheus(self, prefix='synapse'):
+        """Render the recorded values in the Prometheus text exposition format."""
+        lines = [f'# TYPE {prefix}_stage_seconds histogram']
+        for name, stage in sorted(self.stages.items()):
+            cumulative = 0
+            for bound, count in zip(BUCKETS, stage['buckets']):
+                cumulative += count
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="{bound:.6g}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {stage["count"]}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {stage["sum"]:.9f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {stage["count"]}')
+        for name, value in sorted(self.counters.items()):
+            lines.append(f'# TYPE {prefix}_{name}_total counter')
+            lines.append(f'{prefix}_{name}_total {value}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """Write the report as Prometheus text if ``path`` ends in .prom, JSON otherwise."""
+        with open(path, 'w', encoding='utf-8') as f:
+            if path.endswith('.prom'):
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.report(), f, indent=2)
+
+    def write_profiles(self):
+        """Dump ``<stage>.prof`` (cProfile) and ``<stage>.tracemalloc`` files into ``profile_dir``."""
+        if self.profile_dir is None:
+            return
+        os.makedirs(self.profile_dir, exist_ok=True)
+        for name, profiler in self._profilers.items():
+            profiler.dump_stats(os.path.join(self.profile_dir, f'{name}.prof'))
+        for name, (peak, snapshot) in self._alloc_peaks.items():
+            snapshot.dump(os.path.join(self.profile_dir, f'{name}.tracemalloc'))
+
+    def print_report(self):
+        """Print a per-stage table and the counters."""
+        report = self.report()
+        total = sum(stage['total_sec'] for stage in report['stages'].values()) or 1.0
+        for name, stage in sorted(report['stages'].items(), key=lambda item: -item[1]['total_sec']):
+            print(f"{name:>14}: {stage['count']:>8} calls, {stage['total_sec']:9.2f}s "
+                  f"({100 * stage['total_sec'] / total:4.1f}%), p50 {1000 * stage['p50_sec']:.2f} ms, "
+                  f"p99 {1000 * stage['p99_sec']:.2f} ms")
+        for name, value in sorted(report['counters'].items()):
+            print(f"{name:>14}: {value}")
+        for name, rate in sorted(report['cache_hit_rates'].items()):
+            print(f"{name:>14}: {100 * rate:.1f}% cache hits")
+
+
+def _quantile(stage, q):
+    """Estimate a quantile from histogram buckets (upper bound of the bucket reached)."""
+    target = q * stage['count']
+    cumulative = 0
+    for bound, count in zip(BUCKETS, stage['buckets']):
+        cumulative += count
+        if cumulative >= target and count:
+            return min(bound, stage['max'])
+    return stage['max']
+
+
+DISABLED = Metrics(enabled=False)
@@ -0,0 +1,148 @@
+import argparse
+import os
+import time
+from array import array
+
+import numpy as np
+from tqdm import tqdm
+
+from corpus_reader import CorpusReader
+from title_lookup import NOT_REDIRECT, TitleLookup
+
+GRAPH_FILES = ('ids', 'indptr', 'indices')
+
+def iter_page_links(page):
+    """Yield every link target in a processed page, including subsections."""
+    for section in page['sections']:
+        yield from section['links']
+        for subsection in section['subsections']:
+            yield from subsection['links']
+
+def build_link_graph(processed_dir, pages_file, output_dir):
+    """
+    Resolve the links in ``process_all_pages`` shards into a CSR link graph.
+
+    Node ``i`` is the article with page ID ``ids[i]``; its outgoing links are
+    ``indices[indptr[i]:indptr[i + 1]]``. Duplicate and self links are dropped.
+
+    Args:
+        processed_dir: Directory with ``wiki_pages_*.jsonl`` shards
+        pages_file: ``*_pages.jsonl`` written by ``collect_pages``, or its
+            compiled title lookup directory
+        output_dir: Directory for the ``.npy`` arrays
+    """
+    lookup = TitleLookup.open(pages_file)
+    ids = np.asarray(lookup.ids)[(np.asarray(lookup.namespaces) == 0) &
+                                 (np.asarray(lookup.redirect_targets) == NOT_REDIRECT)]
+    node_of = {int(page_id): node for node, page_id in enumerate(ids)}
+
+    sources = array('i')
+    targets = array('i')
+    resolved = unresolved = 0
+    reader = CorpusReader(processed_dir, fields=('id', 'sections'))
+    for page in tqdm(reader, desc="Resolving links"):
+        source = node_of.get(int(page['id']))
+        if source is None:
+            continue
+        page_targets = set()
+        for link in iter_page_links(page):
+            target = node_of.get(lookup.id_of(link))
+            if target is None:
+                unresolved += 1
+                continue
+            resolved += 1
+            if target != source:
+                page_targets.add(target)
+        sources.extend([source] * len(page_targets))
+        targets.extend(sorted(page_targets))
+
+    sources = np.frombuffer(sources, dtype=np.int32)
+    targets = np.frombuffer(targets, dtype=np.int32)
+    order = np.argsort(sources, kind='stable')
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(sources, minlength=len(ids))))).astype(np.int64)
+
+    os.makedirs(output_dir, exist_ok=True)
+    np.save(os.path.join(output_dir, 'ids.npy'), ids)
+    np.save(os.path.join(output_dir, 'indptr.npy'), indptr)
+    np.save(os.path.join(output_dir, 'indices.npy'), targets[order])
+    print(f"Link graph: {len(ids)} pages, {len(targets)} links "
+          f"({resolved} resolved, {unresolved} unresolved link occurrences)")
+
+def load_link_graph(graph_dir):
+    """Memory-map the arrays written by ``build_link_graph``."""
+    return {name: np.load(os.path.join(graph_dir, f'{name}.npy'), mmap_mode='r') for name in GRAPH_FILES}
+
+def pagerank(indptr, indices, damping=0.85, tol=1e-6, max_iter=100, chunk_edges=1 << 24):
+    """
+    Compute PageRank over a CSR graph with vectorized sparse iterations.
+
+    Edges are processed in chunks of ``chunk_edges`` so the working set stays
+    bounded; dangling nodes spread their rank uniformly.
+
+    Args:
+        indptr: CSR row pointer over source nodes
+        indices: Target node of every edge
+        damping: Damping factor
+        tol: L1 convergence threshold
+        max_iter: Maximum number of iterations, at least 1
+
+    Returns:
+        Array of PageRank scores summing to 1
+    """
+    if max_iter < 1:
+        raise ValueError(f"max_iter must be at least 1, not {max_iter}")
+    num_nodes = len(indptr) - 1
+    out_degree = np.diff(indptr)
+    inv_out = np.zeros(num_nodes)
+    np.divide(1.0, out_degree, out=inv_out, where=out_degree > 0)
+    dangling = out_degree == 0
+    rank = np.full(num_nodes, 1.0 / num_nodes)
+
+    for iteration in range(max_iter):
+        contribution = rank * inv_out
+        incoming = np.zeros(num_nodes)
+        for start in range(0, len(indices), chunk_edges):
+            end = min(start + chunk_edges, len(indices))
+            first = np.searchsorted(indptr, start, side='right') - 1
+            last = np.searchsorted(indptr, end, side='left')
+            rows = np.repeat(np.arange(first, last), np.diff(np.clip(indptr[first:last + 1], start, end)))
+            incoming += np.bincount(indices[start:end], weights=contribution[rows], minlength=num_nodes)
+        new_rank = (1.0 - damping) / num_nodes + damping * (incoming + rank[dangling].sum() / num_nodes)
+        error = np.abs(new_rank - rank).sum()
+        rank = new_rank
+        if error < tol:
+            break
+    print(f"PageRank converged after {iteration + 1} iterations (L1 change {error:.2e})")
+    return rank
+
+def compute_scores(graph_dir, damping=0.85):
+    """Compute PageRank and in/out degree and save them next to the graph."""
+    graph = load_link_graph(graph_dir)
+    start = time.time()
+    rank = pagerank(graph['indptr'], graph['indices'], damping)
+    print(f"PageRank computed in {time.time() - start:.1f}s")
+    np.save(os.path.join(graph_dir, 'pagerank.npy'), rank)
+    np.save(os.path.join(graph_dir, 'out_degree.npy'), np.diff(graph['indptr']).astype(np.int32))
+    np.save(os.path.join(graph_dir, 'in_degree.npy'),
+            np.bincount(graph['indices'], minlength=len(graph['ids'])).astype(np.int32))
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the article link graph and compute PageRank")
+    parser.add_argument("processed_dir", help="Directory with process_all_pages output")
+    parser.add_argument("pages_file", help="*_pages.jsonl written by collect_pages, or its compiled lookup")
+    parser.add_argument("--output-dir", default="link_graph", help="Output directory for the arrays")
+    parser.add_argument("--damping", type=float, default=0.85, help="PageRank damping factor")
+    parser.add_argument("--top", type=int, default=0, help="Print the top N pages by PageRank")
+
+    args = parser.parse_args()
+    build_link_graph(args.processed_dir, args.pages_file, args.output_dir)
+    compute_scores(args.output_dir, args.damping)
+
+    if args.top:
+        ids = np.load(os.path.join(args.output_dir, 'ids.npy'))
+        rank = np.load(os.path.join(args.output_dir, 'pagerank.npy'))
+        for node in np.argsort(rank)[::-1][:args.top]:
+            print(f"{ids[node]}\t{rank[node]:.6g}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,411 @@
+import argparse
+import bisect
+import hashlib
+import json
+import re
+import sqlite3
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from data_processing.text_preprocessor import sectionEndRE
+
+wordRE = re.compile(r'\w+')
+
+# Mersenne prime of the universal hash family ((a * x + b) mod P)
+MERSENNE_PRIME = (1 << 61) - 1
+
+SCHEMA = (
+    'create table if not exists meta (key text primary key, value text not null)',
+    'create table if not exists sections (id integer primary key, digest blob not null unique, '
+    'signature blob, results text not null)',
+    'create table if not exists bands (key integer not null, section integer not null)',
+    'create index if not exists bands_key on bands (key)',
+)
+
+
+def section_spans(text: str) -> List[Tuple[int, int]]:
+    """
+    Character spans of the sections of a cleaned article text.
+
+    ``WikipediaParser.get_article`` joins the cleaned sections and
+    subsections with blank lines, and ``TextPreprocessor`` never packs a
+    segment across one, so every segment lies inside exactly one span.
+    """
+    spans = []
+    start = 0
+    for match in sectionEndRE.finditer(text):
+        if text[start:match.start()].strip():
+            spans.append((start, match.start()))
+        start = match.end()
+    if text[start:].strip():
+        spans.append((start, len(text)))
+    return spans
+
+
+def choose_bands(num_perm: int, threshold: float, recall: float = 0.95) -> Tuple[int, int]:
+    """
+    Pick the LSH banding for a similarity threshold.
+
+    Two signatures of similarity ``s`` collide in some band with
+    probability ``1 - (1 - s^rows)^bands``. The most rows per band (the
+    fewest false candidates) are used for which a pair exactly at
+    ``threshold`` still becomes a candidate with at least ``recall``
+    probability; candidates are verified against the full signature, so
+    recall is preferred over precision.
+
+    Args:
+        num_perm: MinHash signature length
+        threshold: Similarity the recall target applies to
+        recall: Minimum candidate probability at ``threshold``
+
+    Returns:
+        Tuple of (bands, rows)
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        if 1 - (1 - threshold ** rows) ** bands >= recall:
+            best = (bands, rows)
+    return best
+
+
+class MinHasher:
+    """MinHash signatures over the word shingles of a text."""
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        """
+        Args:
+            num_perm: Number of hash functions (signature length)
+            shingle_size: Words per shingle
+            seed: Seed of the hash functions; signatures only compare under the same seed
+        """
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        # Below 2^31 so a * x + b cannot overflow 64 bits for 32-bit shingle hashes
+        self.a = rng.randint(1, 1 << 31, num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, 1 << 31, num_perm, dtype=np.uint64)
+
+    def shingles(self, text: str) -> np.ndarray:
+        """Distinct CRC32 hashes of the lowercased word shingles."""
+        words = wordRE.findall(text.lower())
+        k = min(self.shingle_size, len(words))
+        hashes = {zlib.crc32(' '.join(words[i:i + k]).encode('utf-8')) for i in range(len(words) - k + 1)} \
+            if words else set()
+        return np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+
+    def signature(self, shingles: np.ndarray) -> np.ndarray:
+        """Minimum of every hash function over the shingles, as uint32."""
+        hashed = (shingles[:, None] * self.a + self.b) % np.uint64(MERSENNE_PRIME)
+        return (hashed & np.uint64(0xFFFFFFFF)).min(axis=0).astype(np.uint32)
+
+
+class NearDuplicateIndex:
+    """
+    Persistent MinHash/LSH index of processed sections and their extraction results.
+
+    Each section stored with ``add`` keeps its exact digest, its MinHash
+    signature, one LSH key per band and the entities (offsets relative to
+    the section) and relationships extracted from it. ``find`` returns the
+    results of an identical section, or of the most similar indexed
+    section whose estimated Jaccard similarity reaches ``threshold``, with
+    entity offsets remapped into the new text.
+
+    The index is a SQLite database in WAL mode, so the worker processes of
+    one machine can share it. A write transaction holds the database's
+    only write lock, so ``ArticleReuse.commit`` commits once per article;
+    other additions are committed every ``commit_every`` sections and on
+    ``close``.
+    """
+
+    def __init__(self, path: str, threshold: float = 0.9, num_perm: int = 128, shingle_size: int = 5,
+                 min_shingles: int = 20, seed: int = 1, commit_every: int = 100, recall: float = 0.95):
+        """
+        Args:
+            path: SQLite database file (``:memory:`` for a throwaway index)
+            threshold: Minimum estimated Jaccard similarity of a near-duplicate
+            num_perm: MinHash signature length
+            shingle_size: Words per shingle
+            min_shingles: Shorter sections are only matched exactly; MinHash
+                estimates are too coarse for them
+            seed: Seed of the hash functions
+            commit_every: Sections added between commits
+            recall: Probability that a section exactly at ``threshold`` is
+                found as a candidate (see ``choose_bands``)
+        """
+        self.threshold = threshold
+        self.min_shingles = min_shingles
+        self.commit_every = commit_every
+        self.hasher = MinHasher(num_perm, shingle_size, seed)
+        self.bands, self.rows = choose_bands(num_perm, threshold, recall)
+
+        self.con = sqlite3.connect(path, timeout=60)
+        self.con.execute('pragma journal_mode=wal')
+        self.con.execute('pragma synchronous=normal')
+        for statement in SCHEMA:
+            self.con.execute(statement)
+        self._check_meta({'num_perm': num_perm, 'shingle_size': shingle_size, 'seed': seed, 'rows': self.rows})
+        self.con.commit()
+        self._pending = 0
+        self.stats = {'sections': 0, 'exact': 0, 'near': 0, 'characters': 0, 'characters_reused': 0}
+
+    def _check_meta(self, params: Dict) -> None:
+        """Record the hashing parameters, or refuse an index built with different ones."""
+        stored = dict(self.con.execute('select key, value from meta'))
+        if not stored:
+            self.con.executemany('insert into meta values (?, ?)',
+                                 [(key, json.dumps(value)) for key, value in params.items()])
+            return
+        stored = {key: json.loads(value) for key, value in stored.items()}
+        if stored != params:
+            raise ValueError(f"Near-duplicate index was built with {stored}, not {params}")
+
+    def __len__(self) -> int:
+        return self.con.execute('select count(*) from sections').fetchone()[0]
+
+    def _band_keys(self, signature: np.ndarray) -> List[int]:
+        keys = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            digest = hashlib.blake2b(band.to_bytes(2, 'little') + rows, digest_size=8).digest()
+            keys.append(int.from_bytes(digest, 'little', signed=True))
+        return keys
+
+    def prepare(self, text: str) -> Tuple[bytes, Optional[np.ndarray]]:
+        """Digest and signature of a section (None for sections too short to sketch)."""
+        digest = hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+        shingles = self.hasher.shingles(text)
+        signature = self.hasher.signature(shingles) if len(shingles) >= max(self.min_shingles, 1) else None
+        return digest, signature
+
+    def find(self, text: str, prepared: Optional[Tuple] = None) -> Optional[Dict]:
+        """
+        Look up the extraction results of a section seen before.
+
+        Args:
+            text: Cleaned section text
+            prepared: Digest and signature of ``text`` if already computed
+
+        Returns:
+            None if no indexed section is similar enough, otherwise a dict
+            with ``entities`` (offsets relative to ``text``),
+            ``relationships``, ``similarity`` and ``exact``
+        """
+        self.stats['sections'] += 1
+        self.stats['characters'] += len(text)
+        digest, signature = prepared or self.prepare(text)
+        row = self.con.execute('select results from sections where digest = ?', (digest,)).fetchone()
+        if row:
+            self.stats['exact'] += 1
+            self.stats['characters_reused'] += len(text)
+            return dict(json.loads(row[0]), similarity=1.0, exact=True)
+        if signature is None:
+            return None
+
+        keys = self._band_keys(signature)
+        candidates = self.con.execute(
+            f"select s.signature, s.results from sections s where s.id in "
+            f"(select section from bands where key in ({','.join('?' * len(keys))}))", keys
+        ).fetchall()
+        best, best_similarity = None, self.threshold
+        for blob, results in candidates:
+            similarity = float(np.mean(np.frombuffer(blob, dtype=np.uint32) == signature))
+            if similarity >= best_similarity:
+                best, best_similarity = results, similarity
+        if best is None:
+            return None
+
+        results = json.loads(best)
+        entities = remap_entities(results['source_length'], results['entities'], text)
+        kept = {(entity['text'], entity['type']) for entity in entities}
+        relationships = [rel for rel in results['relationships']
+                         if (rel['source'], rel['source_type']) in kept
+                         and (rel['target'], rel['target_type']) in kept]
+        self.stats['near'] += 1
+        self.stats['characters_reused'] += len(text)
+        return {'entities': entities, 'relationships': relationships,
+                'similarity': best_similarity, 'exact': False}
+
+    def add(self, text: str, entities: List[Dict], relationships: List[Dict],
+            prepared: Optional[Tuple] = None) -> None:
+        """
+        Index a processed section with its extraction results.
+
+        Args:
+            text: Cleaned section text
+            entities: Entities found in it, offsets relative to ``text``
+            relationships: Relationships extracted between them
+            prepared: Digest and signature of ``text`` if already computed
+        """
+        digest, signature = prepared or self.prepare(text)
+        results = json.dumps({'source_length': len(text), 'entities': entities, 'relationships': relationships},
+                             ensure_ascii=False)
+        cursor = self.con.execute(
+            'insert or ignore into sections (digest, signature, results) values (?, ?, ?)',
+            (digest, signature.tobytes() if signature is not None else None, results)
+        )
+        if cursor.rowcount and signature is not None:
+            self.con.executemany('insert into bands values (?, ?)',
+                                 [(key, cursor.lastrowid) for key in self._band_keys(signature)])
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self.commit()
+
+    def article(self, text: str, segments: List[Dict]) -> 'ArticleReuse':
+        """Match the sections of a cleaned article; see ``ArticleReuse``."""
+        return ArticleReuse(self, text, segments)
+
+    def commit(self) -> None:
+        self.con.commit()
+        self._pending = 0
+
+    def report(self) -> None:
+        """Print how much text was matched to already processed sections."""
+        stats = self.stats
+        reused = stats['exact'] + stats['near']
+        print(f"Near-duplicate sections: {reused}/{stats['sections']} reused "
+              f"({stats['exact']} exact, {stats['near']} near), "
+              f"{100 * stats['characters_reused'] / max(stats['characters'], 1):.1f}% of the text skipped")
+
+    def close(self) -> None:
+        self.commit()
+        self.con.close()
+
+
+def remap_entities(source_length: int, entities: List[Dict], text: str) -> List[Dict]:
+    """
+    Move entities of an indexed section to their position in a near-duplicate.
+
+    An entity is kept where its text still is at the same offset, otherwise
+    it goes to the occurrence of its text closest to the proportionally
+    scaled offset. Entities whose text no longer occurs are dropped.
+    """
+    scale = len(text) / max(source_length, 1)
+    remapped = []
+    for entity in entities:
+        surface = entity['text']
+        start = entity['start']
+        if text[start:start + len(surface)] != surface:
+            expected = int(start * scale)
+            occurrences = [match.start() for match in re.finditer(re.escape(surface), text)]
+            if not occurrences:
+                continue
+            start = min(occurrences, key=lambda position: abs(position - expected))
+        remapped.append(dict(entity, start=start, end=start + len(surface)))
+    return remapped
+
+
+class ArticleReuse:
+    """
+    Splits an article into sections to process and sections to reuse.
+
+    ``segments`` holds only the segments of sections without a match. Report
+    the results of each processed segment with ``record``, then ``commit``
+    indexes the new sections; ``entities`` and ``relationships`` hold the
+    reused results with offsets into the article.
+    """
+
+    def __init__(self, index: NearDuplicateIndex, text: str, segments: List[Dict]):
+        self.index = index
+        self.text = text
+        self.spans = section_spans(text)
+        self._starts = [start for start, _ in self.spans]
+        self.entities: List[Dict] = []
+        self.relationships: List[Dict] = []
+        self.matches: List[Optional[Dict]] = []
+        self._prepared = []
+        for start, end in self.spans:
+            self._prepared.append(index.prepare(text[start:end]))
+            match = index.find(text[start:end], self._prepared[-1])
+            self.matches.append(match)
+            if match:
+                self.entities.extend(dict(entity, start=entity['start'] + start, end=entity['end'] + start)
+                                     for entity in match['entities'])
+                self.relationships.extend(match['relationships'])
+
+        self.segments = []
+        self.skipped_segments = 0
+        self.skipped_tokens = 0
+        for segment in segments:
+            if self.matches[self._section(segment)]:
+                self.skipped_segments += 1
+                self.skipped_tokens += len(segment['input_ids'])
+            else:
+                self.segments.append(segment)
+        self._new = {i: ([], []) for i, match in enumerate(self.matches) if not match}
+
+    def _section(self, segment: Dict) -> int:
+        return max(bisect.bisect_right(self._starts, segment['start']) - 1, 0)
+
+    @property
+    def reused_sections(self) -> int:
+        return sum(1 for match in self.matches if match)
+
+    def record(self, segment: Dict, entities: List[Dict], relationships: List[Dict]) -> None:
+        """
+        Collect the results of a processed segment for its section.
+
+        Args:
+            segment: Segment from ``segments``
+            entities: Its entities, offsets into the article
+            relationships: Relationships extracted from it
+        """
+        section = self._section(segment)
+        start = self.spans[section][0]
+        section_entities, section_relationships = self._new[section]
+        section_entities.extend(dict(entity, start=entity['start'] - start, end=entity['end'] - start)
+                                for entity in entities)
+        section_relationships.extend(relationships)
+
+    def commit(self) -> None:
+        """Add the sections processed for this article to the index and commit them."""
+        for section, (entities, relationships) in self._new.items():
+            start, end = self.spans[section]
+            self.index.add(self.text[start:end], entities, relationships, self._prepared[section])
+        # Release the write lock other workers sharing the index wait for
+        self.index.commit()
+
+
+def main():
+    from data_processing.corpus_reader import CorpusReader
+
+    parser = argparse.ArgumentParser(
+        description="Estimate how much text near-duplicate detection skips on processed pages")
+    parser.add_argument('processed_dir', help="Directory written by process_all_pages")
+    parser.add_argument('--threshold', type=float, default=0.9, help="Minimum estimated Jaccard similarity")
+    parser.add_argument('--num-perm', type=int, default=128, help="MinHash signature length")
+    parser.add_argument('--shingle-size', type=int, default=5, help="Words per shingle")
+    parser.add_argument('--min-shingles', type=int, default=20, help="Shorter sections are only matched exactly")
+    parser.add_argument('--recall', type=float, default=0.95,
+                        help="Candidate probability of a section exactly at the threshold")
+    parser.add_argument('--index', default=':memory:',
+                        help="Index file to build (results are left empty; do not reuse it for the pipeline)")
+    parser.add_argument('--limit', type=int, help="Stop after this many pages")
+    args = parser.parse_args()
+
+    index = NearDuplicateIndex(args.index, args.threshold, args.num_perm, args.shingle_size,
+                               args.min_shingles, commit_every=10000, recall=args.recall)
+    print(f"LSH: {index.bands} bands of {index.rows} rows")
+    start = time.time()
+    pages = 0
+    for page in CorpusReader(args.processed_dir, fields=['sections']):
+        # The same blocks WikipediaParser.get_article joins into the article text
+        for section in page.get('sections', []):
+            for block in [section['content']] + [subsection['content'] for subsection in section['subsections']]:
+                block = block.strip()
+                if block:
+                    prepared = index.prepare(block)
+                    if index.find(block, prepared) is None:
+                        index.add(block, [], [], prepared)
+        pages += 1
+        if args.limit and pages >= args.limit:
+            break
+    index.report()
+    print(f"{pages} pages, {len(index)} distinct sections indexed in {time.time() - start:.1f}s")
+    index.close()
+
+if __name__ == '__main__':
+    main()
@@ -4,66 +4,93 @@ import re
 import argparse
 import bz2
 import json
+import hashlib
 from tqdm import tqdm
-from multiprocessing import Pool, cpu_count
+from multiprocessing import Event, Pool
 import math
 import mmap  # For efficient file reading
 
-# Import the processing functions from extractPage.py
-from extractPage import extract_sections, clean_section_text
+# Import the page records from extractPage.py
+from extractPage import Page, parse_sections
+from resource_governor import ResourceGovernor, available_cores, read_meminfo, reserved_cores
+from instrumentation import Metrics
 
 # Regex patterns
 tagRE = re.compile(r'(.*?)<(/?\w+)[^>]*>(?:([^<]*)(<.*?>)?)?')
 
-def process_page_content(page_content):
-    """Process a single page's content and return structured data."""
+# Set in every worker by _init_worker; tells workers to stop once the page target is reached
+_stop_event = None
+
+def _init_worker(stop_event):
+    global _stop_event
+    _stop_event = stop_event
+
+def in_sample(page_id, fraction):
+    """Deterministically select a fraction of pages by a hash of their ID."""
+    digest = hashlib.blake2b(str(page_id).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') < fraction * 2 ** 64
+
+def process_page_content(page_content, sample_fraction=None):
+    """Process a single page's content and return a Page record (None if skipped)."""
+    page = Page()
     try:
-        # Extract basic metadata
-        page_data = {
-            "id": None,
-            "title": None,
-            "namespace": None,
-            "sections": []
-        }
-        
         # Parse the content for metadata
         for line in page_content:
-            if '<id>' in line and page_data["id"] is None:
+            if '<id>' in line and page.id is None:
                 match = tagRE.search(line)
                 if match and match.group(2) == 'id':
-                    page_data["id"] = match.group(3)
+                    page.id = match.group(3)
             elif '<title>' in line:
                 match = tagRE.search(line)
                 if match and match.group(2) == 'title':
-                    page_data["title"] = match.group(3)
+                    page.title = match.group(3)
             elif '<ns>' in line:
                 match = tagRE.search(line)
                 if match and match.group(2) == 'ns':
-                    page_data["namespace"] = match.group(3)
+                    page.namespace = match.group(3)
         
-        # Only process main namespace articles
-        if page_data["namespace"] == "0":
-            # Process sections
-            raw_sections = extract_sections(''.join(page_content))
-            page_data["sections"] = clean_section_text(raw_sections)
-            return page_data
+        # Only process main namespace articles (in the sample, if sampling)
+        if sample_fraction is not None and not in_sample(page.id, sample_fraction):
+            return None
+        if page.namespace == "0":
+            # Sections are cleaned lazily when the page is serialized
+            page.sections = parse_sections(page_content)
+            return page
         
         return None
         
     except Exception as e:
-        print(f"Error processing page {page_data.get('id', 'unknown')}: {e}")
+        print(f"Error processing page {page.id or 'unknown'}: {e}")
+        return None
+
+def serialize_page(page):
+    """Clean and serialize a Page into one JSONL line (None on error)."""
+    try:
+        return (page.to_json() + '\n').encode('utf-8')
+    except Exception as e:
+        print(f"Error processing page {page.id or 'unknown'}: {e}")
         return None
 
 def process_chunk(args):
-    """Process a chunk of the XML file."""
-    input_file, start_pos, chunk_size, output_dir, chunk_num, max_pages = args
+    """
+    Process a chunk of the XML file.
+
+    A chunk owns the pages whose ``<page>`` line starts inside it: it skips
+    the partial line at its start and finishes the page open at its end.
+    """
+    (input_file, start_pos, chunk_size, output_dir, chunk_num, max_pages, instrument, profile_dir,
+     sample_fraction) = args
+    metrics = Metrics(instrument, os.path.join(profile_dir, f"chunk_{chunk_num:04d}") if profile_dir else None)
     
     try:
         # Use memory mapping for efficient reading
         with open(input_file, 'r', encoding='utf-8', errors='ignore') as f:
             # Memory map the input file for faster reading
             mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
-            mm.seek(start_pos)
+            if start_pos:
+                # The line ending here (or running into the chunk) belongs to the previous chunk
+                mm.seek(start_pos - 1)
+                mm.readline()
             
             output_file = os.path.join(output_dir, f"wiki_pages_{chunk_num:04d}.jsonl")
             current_page = []
@@ -71,10 +98,11 @@ def process_chunk(args):
             processed_pages = []
             local_count = 0
             
-            with open(output_file, 'w', encoding='utf-8', buffering=8192) as out_f:  # Adjusted buffer size
+            # Binary mode so tell() gives the byte offset of every line
+            with open(output_file, 'wb', buffering=8192) as out_f:  # Adjusted buffer size
                 bytes_read = 0
                 
-                while bytes_read < chunk_size:
+                while bytes_read < chunk_size or in_page:
                     if max_pages and (local_count >= max_pages):
                         break
                     
@@ -86,18 +114,26 @@ def process_chunk(args):
                     bytes_read = mm.tell() - start_pos
                     
                     if '<page>' in line:
+                        if _stop_event is not None and _stop_event.is_set():
+                            break
                         current_page = [line]
                         in_page = True
                     elif in_page:
                         current_page.append(line)
                         if '</page>' in line:
-                            page_data = process_page_content(current_page)
-                            if page_data:
-                                out_f.write(json.dumps(page_data, ensure_ascii=False) + '\n')
+                            with metrics.stage('parse'):
+                                page = process_page_content(current_page, sample_fraction)
+                            with metrics.stage('clean'):
+                                record = serialize_page(page) if page else None
+                            if record:
+                                offset = out_f.tell()
+                                out_f.write(record)
                                 processed_pages.append({
-                                    "id": page_data["id"],
-                                    "title": page_data["title"],
-                                    "file": f"wiki_pages_{chunk_num:04d}.jsonl"
+                                    "id": page.id,
+                                    "title": page.title,
+                                    "file": f"wiki_pages_{chunk_num:04d}.jsonl",
+                                    "offset": offset,
+                                    "length": len(record)
                                 })
                                 local_count += 1
                                 # Flush periodically to avoid memory buildup
@@ -107,53 +143,120 @@ def process_chunk(args):
                             in_page = False
             
             mm.close()
-        return chunk_num, processed_pages, local_count
+        metrics.count('bytes_in', bytes_read)
+        metrics.count('bytes_out', sum(page["length"] for page in processed_pages))
+        metrics.count('pages', local_count)
+        metrics.write_profiles()
+        return chunk_num, processed_pages, local_count, metrics.snapshot()
         
     except Exception as e:
         print(f"Error processing chunk {chunk_num}: {e}")
-        return None
+        return chunk_num, [], 0, metrics.snapshot()
 
-def process_all_pages(input_file, output_dir="processed_pages", chunk_size_mb=100, max_pages=None):
-    """Process all pages in the Wikipedia dump file."""
+def process_all_pages(input_file, output_dir="processed_pages", chunk_size_mb=100, max_pages=None,
+                      memory_limit=None, max_workers=None, metrics_file=None, profile_dir=None,
+                      sample_fraction=None, parse_cores=None):
+    """
+    Process all pages in the Wikipedia dump file.
+
+    The pool is sized from the usable cores; the resource governor then
+    limits how many chunks are processed at once so that the measured
+    worker memory stays under ``memory_limit`` (bytes, default: memory
+    available at start). With ``parse_cores`` the run is pinned to the
+    first that many usable cores, the ones ``corpus_driver work
+    --parse-cores`` leaves free of inference workers.
+
+    With ``metrics_file`` the workers' stage timings and volumes are merged
+    and written as JSON (or Prometheus text for a .prom file);
+    ``profile_dir`` additionally collects cProfile and tracemalloc dumps
+    per chunk and stage.
+
+    Runs are deterministic: ``sample_fraction`` keeps the pages whose ID
+    hashes into that fraction, and ``max_pages`` keeps exactly the first
+    that many selected pages in dump order. The index is written in chunk
+    order; once the chunks before a point hold ``max_pages`` pages, all
+    workers are signalled to stop and later output is removed.
+    """
     os.makedirs(output_dir, exist_ok=True)
     
-    # Get optimal chunk size based on system memory
-    available_memory = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')  # Total RAM
-    chunk_size = min(chunk_size_mb * 1024 * 1024, available_memory // (4 * cpu_count()))
+    if parse_cores and hasattr(os, 'sched_setaffinity'):
+        # Pool workers inherit the affinity
+        os.sched_setaffinity(0, reserved_cores(available_cores(), parse_cores))
+    
+    # Leave one core for the main process, which writes the index
+    num_processes = max_workers or max(1, len(available_cores()) - 1)
+    available_memory, _ = read_meminfo()
+    memory_limit = min(memory_limit or available_memory, available_memory)
+    governor = ResourceGovernor(memory_limit=memory_limit, max_workers=num_processes)
+    
+    # Start with chunks small enough for every worker to hold one; the governor adjusts from there
+    chunk_size = min(chunk_size_mb * 1024 * 1024, memory_limit // (4 * num_processes))
     
     file_size = os.path.getsize(input_file)
     num_chunks = math.ceil(file_size / chunk_size)
     
-    # Optimize number of processes based on CPU cores and memory
-    num_processes = min(cpu_count() - 1, max(1, available_memory // (2 * 1024 * 1024 * 1024)))  # Leave 2GB per process
-    
-    chunk_args = [(input_file, i * chunk_size, chunk_size, output_dir, i, max_pages) 
-                 for i in range(num_chunks)]
+    instrument = bool(metrics_file or profile_dir)
+    metrics = Metrics(instrument)
+    chunk_args = ((input_file, i * chunk_size, chunk_size, output_dir, i, max_pages, instrument, profile_dir,
+                   sample_fraction)
+                  for i in range(num_chunks))
     
+    stop_event = Event()
     index_file = os.path.join(output_dir, "page_index.jsonl")
     with open(index_file, 'w', encoding='utf-8', buffering=8192) as index_stream:
         total_processed = 0
+        finished = {}  # Results of chunks that completed ahead of an earlier chunk
+        next_chunk = 0
+        last_chunk = None  # Chunk holding the last page once max_pages is reached
         
-        with Pool(num_processes) as pool:
+        with Pool(num_processes, initializer=_init_worker, initargs=(stop_event,)) as pool:
             with tqdm(total=max_pages if max_pages else None, desc="Processing pages") as pbar:
-                for result in pool.imap_unordered(process_chunk, chunk_args):
-                    if result:
-                        chunk_num, processed_pages, count = result
-                        for page in processed_pages:
-                            if not max_pages or total_processed < max_pages:
-                                index_stream.write(json.dumps(page, ensure_ascii=False) + '\n')
-                                total_processed += 1
-                                pbar.update(1)
-                        
-                        # Flush index periodically
-                        if total_processed % 100 == 0:
-                            index_stream.flush()
+                for chunk_num, processed_pages, count, snapshot in governor.imap_unordered(pool, process_chunk,
+                                                                                           chunk_args):
+                    metrics.merge(snapshot)
+                    finished[chunk_num] = processed_pages
+                    
+                    # Index chunks in order so the selected pages never depend on timing
+                    while next_chunk in finished and last_chunk is None:
+                        for page in finished.pop(next_chunk):
+                            index_stream.write(json.dumps(page, ensure_ascii=False) + '\n')
+                            total_processed += 1
+                            pbar.update(1)
+                            if max_pages and total_processed >= max_pages:
+                                last_chunk = (next_chunk, page)
+                                break
+                        next_chunk += 1
+                    index_stream.flush()
                     
-                    if max_pages and total_processed >= max_pages:
+                    if last_chunk is not None:
+                        stop_event.set()
                         break
+            
+            # Let running workers see the stop signal and close their files
+            pool.close()
+            pool.join()
+        
+        if last_chunk is not None:
+            discard_after(output_dir, *last_chunk, num_chunks)
         
         print(f"\nProcessed {total_processed} pages")
         print(f"Index written to {index_file}")
+        governor.report()
+        if instrument:
+            metrics.print_report()
+        if metrics_file:
+            metrics.write(metrics_file)
+            print(f"Metrics written to {metrics_file}")
+
+def discard_after(output_dir, chunk_num, last_page, num_chunks):
+    """Remove output past the last page kept: the rest of its shard and all later shards."""
+    shard = os.path.join(output_dir, f"wiki_pages_{chunk_num:04d}.jsonl")
+    with open(shard, 'r+b') as f:
+        f.truncate(last_page["offset"] + last_page["length"])
+    for later in range(chunk_num + 1, num_chunks):
+        path = os.path.join(output_dir, f"wiki_pages_{later:04d}.jsonl")
+        if os.path.exists(path):
+            os.remove(path)
 
 def main():
     parser = argparse.ArgumentParser(description="Process all pages from Wikipedia dump")
@@ -162,10 +265,23 @@ def main():
                        help="Output directory for JSONL files")
     parser.add_argument("--chunk-size", type=int, default=2048,
                        help="Size of each output file in MB")
-    parser.add_argument("--max-pages", type=int, help="Maximum number of pages to process (optional)")
+    parser.add_argument("--max-pages", type=int,
+                       help="Process exactly the first N (sampled) pages in dump order, then stop all workers")
+    parser.add_argument("--sample-fraction", type=float,
+                       help="Keep only this fraction of pages, selected by a hash of the page ID")
+    parser.add_argument("--memory-limit", type=float,
+                       help="Memory ceiling in GB for all workers (default: available memory)")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: usable cores minus one)")
+    parser.add_argument("--parse-cores", type=int,
+                       help="Run on the first N usable cores, leaving the rest to inference workers")
+    parser.add_argument("--metrics", help="Write stage metrics to this file (.json, or .prom for Prometheus)")
+    parser.add_argument("--profile", help="Directory for per-stage cProfile and allocation dumps")
     
     args = parser.parse_args()
-    process_all_pages(args.input, args.output_dir, args.chunk_size, args.max_pages)
+    memory_limit = int(args.memory_limit * 1024 ** 3) if args.memory_limit else None
+    process_all_pages(args.input, args.output_dir, args.chunk_size, args.max_pages,
+                      memory_limit, args.workers, args.metrics, args.profile, args.sample_fraction,
+                      args.parse_cores)
 
 if __name__ == '__main__':
     main() 
\ No newline at end of file
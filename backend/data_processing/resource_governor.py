@@ -0,0 +1,277 @@
+import multiprocessing as mp
+import os
+import queue
+import sys
+import time
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+
+def read_meminfo():
+    """
+    Return (available, total) system memory in bytes.
+
+    Uses MemAvailable from /proc/meminfo, which accounts for reclaimable
+    page cache; falls back to free physical pages elsewhere.
+    """
+    try:
+        values = {}
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                key, value = line.split(':', 1)
+                values[key] = int(value.split()[0]) * 1024
+        return values['MemAvailable'], values['MemTotal']
+    except (OSError, KeyError, ValueError):
+        total = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+        available = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_AVPHYS_PAGES')
+        return available, total
+
+
+def process_rss(pid):
+    """Resident set size of a process in bytes (0 if it is gone or unknown)."""
+    try:
+        with open(f'/proc/{pid}/statm', 'r') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def process_cpu_seconds(pid):
+    """User plus system CPU time of a process in seconds (0 if unknown)."""
+    try:
+        with open(f'/proc/{pid}/stat', 'r') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+    except (OSError, IndexError, ValueError):
+        return 0.0
+
+
+def available_cores():
+    """Cores this process may run on."""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def reserved_cores(cores, reserve):
+    """
+    Cores left out by ``partition_cores(cores, ..., reserve)``.
+
+    ``process_all_pages`` pins its parsing pool to these while inference
+    workers on the same node share the rest.
+    """
+    return list(cores)[:reserve] or list(cores)
+
+
+def partition_cores(cores, groups, reserve=0):
+    """
+    Split cores into contiguous, disjoint groups.
+
+    Args:
+        cores: Core IDs to split
+        groups: Number of groups
+        reserve: Cores left out at the start for parsing workers (see
+            ``reserved_cores``)
+
+    Returns:
+        List of ``groups`` core lists; every group gets at least one core,
+        sharing cores only when there are fewer cores than groups
+    """
+    cores = list(cores)[reserve:] or list(cores)
+    if groups <= 0:
+        return []
+    size, extra = divmod(len(cores), groups)
+    if size == 0:
+        return [[cores[i % len(cores)]] for i in range(groups)]
+    result, start = [], 0
+    for i in range(groups):
+        end = start + size + (1 if i < extra else 0)
+        result.append(cores[start:end])
+        start = end
+    return result
+
+
+def configure_inference_threads(cores):
+    """
+    Pin the current process to ``cores`` and size torch's thread pools to match.
+
+    Call before loading models. Environment variables are set as well so
+    that OpenMP/MKL pools created later pick up the same limit.
+    """
+    threads = str(len(cores))
+    for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[var] = threads
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cores)
+    if 'torch' in sys.modules or _torch_available():
+        import torch
+        torch.set_num_threads(len(cores))
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass  # Already set, or parallel work has started
+
+
+def _torch_available():
+    try:
+        import importlib.util
+        return importlib.util.find_spec('torch') is not None
+    except (ImportError, ValueError):
+        return False
+
+
+class ResourceGovernor:
+    """
+    Throttles a worker pool against a memory ceiling.
+
+    The pool keeps its processes, but the number of tasks in flight is
+    adjusted after every sample: per-task memory is estimated from the
+    peak RSS growth of the workers, and no more tasks are started than
+    fit in the remaining budget. Until a task has been measured, the limit
+    grows by one task per sample. If available memory falls below the low
+    watermark, submission stops until tasks finish.
+
+    The workers are looked up among this process's live children on every
+    sample, so processes a pool replaces (e.g. under ``maxtasksperchild``)
+    are followed. A first sample is taken when tasks are first submitted
+    and a final one when ``imap_unordered`` ends, so even runs shorter than
+    ``sample_interval`` are measured.
+    """
+
+    def __init__(self, memory_limit=None, max_workers=None, min_workers=1, headroom=0.1,
+                 low_watermark=512 * 1024 * 1024, sample_interval=1.0):
+        """
+        Args:
+            memory_limit: Memory ceiling in bytes for the main process and its
+                workers (default: currently available memory)
+            max_workers: Upper bound on tasks in flight (default: usable cores)
+            min_workers: Tasks always allowed in flight
+            headroom: Fraction of the budget kept free
+            low_watermark: Stop submitting when MemAvailable falls below this
+            sample_interval: Seconds between measurements
+        """
+        available, _ = read_meminfo()
+        self.memory_limit = memory_limit or available
+        self.max_workers = max_workers or len(available_cores())
+        self.min_workers = min(min_workers, self.max_workers)
+        self.headroom = headroom
+        self.low_watermark = low_watermark
+        self.sample_interval = sample_interval
+
+        self.allowed = self.min_workers
+        self.worker_baseline = None
+        self.task_rss = 0
+        self.peak_rss = 0
+        self.throttled = 0
+        self._last_sample = None
+        self._last_cpu_time = None
+        self._last_cpu = {}
+        self.cpu_utilization = 0.0
+
+    def attach(self):
+        """Record the baseline of the current worker processes (e.g. of a freshly started Pool)."""
+        pids = self._worker_pids()
+        self.worker_baseline = max((process_rss(pid) for pid in pids), default=0)
+        self._last_cpu_time = time.monotonic()
+        self._last_cpu = {pid: process_cpu_seconds(pid) for pid in pids}
+        self._last_sample = None
+
+    def _worker_pids(self):
+        return [process.pid for process in mp.active_children()]
+
+    def sample(self, in_flight, force=False):
+        """
+        Measure memory and CPU and update the number of tasks allowed in flight.
+
+        Args:
+            in_flight: Tasks currently running
+            force: Measure even if ``sample_interval`` has not passed
+
+        Returns:
+            Allowed number of tasks in flight
+        """
+        now = time.monotonic()
+        if not force and self._last_sample is not None and now - self._last_sample < self.sample_interval:
+            return self.allowed
+        self._last_sample = now
+
+        pids = self._worker_pids()
+        worker_rss = [process_rss(pid) for pid in pids]
+        total_rss = process_rss(os.getpid()) + sum(worker_rss)
+        self.peak_rss = max(self.peak_rss, total_rss)
+        if worker_rss and self.worker_baseline is not None:
+            self.task_rss = max(self.task_rss, max(worker_rss) - self.worker_baseline)
+
+        if self._last_cpu_time is not None:
+            cpu = {pid: process_cpu_seconds(pid) for pid in pids}
+            elapsed = now - self._last_cpu_time
+            if elapsed > 0 and cpu:
+                # Processes started since the last sample are charged from zero
+                used = sum(seconds - self._last_cpu.get(pid, 0.0) for pid, seconds in cpu.items())
+                self.cpu_utilization = used / elapsed / len(cpu)
+                self._last_cpu_time = now
+                self._last_cpu = cpu
+
+        available, _ = read_meminfo()
+        allowed = self.max_workers
+        if self.task_rss == 0:
+            allowed = min(allowed, self.allowed + 1)
+        else:
+            # Budget for task memory: running tasks are charged their estimated peak,
+            # not what they have allocated so far
+            task_usage = sum(max(0, rss - self.worker_baseline) for rss in worker_rss)
+            budget = min(self.memory_limit * (1 - self.headroom) - (total_rss - task_usage),
+                         available - self.low_watermark + task_usage)
+            allowed = min(allowed, int(budget // self.task_rss))
+        if available < self.low_watermark:
+            allowed = min(allowed, in_flight - 1)
+        allowed = max(self.min_workers, allowed)
+        if allowed < self.allowed:
+            self.throttled += 1
+        self.allowed = allowed
+        return allowed
+
+    def imap_unordered(self, pool, func, iterable):
+        """
+        Like ``pool.imap_unordered``, but never runs more tasks than the governor allows.
+
+        Yields:
+            Task results in completion order
+        """
+        self.attach()
+        results = queue.Queue()
+        tasks = iter(iterable)
+        in_flight = 0
+        exhausted = False
+
+        try:
+            while True:
+                while not exhausted and in_flight < self.sample(in_flight):
+                    try:
+                        args = next(tasks)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    pool.apply_async(func, (args,), callback=results.put, error_callback=results.put)
+                    in_flight += 1
+                if in_flight == 0:
+                    return
+                try:
+                    result = results.get(timeout=self.sample_interval)
+                except queue.Empty:
+                    continue
+                in_flight -= 1
+                if isinstance(result, BaseException):
+                    raise result
+                yield result
+        finally:
+            # Also when the caller stops early: the report should cover the whole run
+            self.sample(in_flight, force=True)
+
+    def report(self):
+        """Print the memory and CPU measurements."""
+        mib = 1024 * 1024
+        print(f"Resource governor: peak RSS {self.peak_rss / mib:.0f} MiB of {self.memory_limit / mib:.0f} MiB, "
+              f"~{self.task_rss / mib:.0f} MiB per task, {self.allowed}/{self.max_workers} tasks allowed, "
+              f"throttled {self.throttled} times, worker CPU {100 * self.cpu_utilization:.0f}%")
@@ -0,0 +1,69 @@
+import multiprocessing as mp
+import os
+import sqlite3
+
+import pytest
+
+from build_category_db import TABLES
+from category_graph import CATEGORY_NAMESPACE, CategoryGraph
+
+PAGES = [(1, CATEGORY_NAMESPACE, 'Mathematicians'), (2, CATEGORY_NAMESPACE, 'English_mathematicians'),
+         (3, 0, 'Ada_Lovelace'), (4, 0, 'Charles_Babbage')]
+LINKS = [(2, 'Mathematicians', 'subcat'), (3, 'English_mathematicians', 'page'),
+         (4, 'English_mathematicians', 'page')]
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'categories.db')
+    con = sqlite3.connect(path)
+    for table in TABLES.values():
+        con.execute(table['schema'])
+    con.executemany('insert into page (page_id, page_namespace, page_title) values (?, ?, ?)', PAGES)
+    con.executemany('insert into categorylinks values (?, ?, ?)', LINKS)
+    con.commit()
+    con.close()
+    return path
+
+
+def _titles(graph, root):
+    return [graph.title(node) for node, _, _ in graph.traverse([graph.find_category(root)])]
+
+
+def test_cache_is_built_once_and_reloaded(db_path, capsys):
+    graph = CategoryGraph.load_or_build(db_path)
+    cached = CategoryGraph.load_or_build(db_path)
+    assert capsys.readouterr().out.count('Built category graph') == 1
+    assert _titles(cached, 'Mathematicians') == _titles(graph, 'Mathematicians')
+    assert set(_titles(cached, 'Mathematicians')) == {'Mathematicians', 'English_mathematicians',
+                                                      'Ada_Lovelace', 'Charles_Babbage'}
+
+
+def test_cache_is_rebuilt_when_database_changes(db_path):
+    CategoryGraph.load_or_build(db_path)
+    con = sqlite3.connect(db_path)
+    con.execute("insert into page values (5, 0, 'Mary_Somerville', 0)")
+    con.execute("insert into categorylinks values (5, 'English_mathematicians', 'page')")
+    con.commit()
+    con.close()
+    cached = os.path.getmtime(os.path.join(f'{db_path}.catgraph', 'category_order.npy'))
+    os.utime(db_path, (cached + 10, cached + 10))
+    assert 'Mary_Somerville' in _titles(CategoryGraph.load_or_build(db_path), 'Mathematicians')
+
+
+def _load(db_path, results):
+    graph = CategoryGraph.load_or_build(db_path)
+    results.put(len(graph))
+
+
+def test_concurrent_loads_build_once(db_path, tmp_path, capfd):
+    context = mp.get_context('fork')
+    results = context.Queue()
+    processes = [context.Process(target=_load, args=(db_path, results)) for _ in range(6)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert [results.get(timeout=10) for _ in processes] == [len(PAGES)] * 6
+    assert capfd.readouterr().out.count('Built category graph') == 1
+    assert sorted(os.listdir(tmp_path)) == ['categories.db', 'categories.db.catgraph', 'categories.db.catgraph.lock']
@@ -0,0 +1,117 @@
+import os
+
+import numpy as np
+import pytest
+
+from category_graph import CATEGORY_NAMESPACE, CategoryGraph
+from category_index import CategoryIndex, source_stamp
+
+
+def _graph(namespaces, edges):
+    """CategoryGraph from node namespaces and (parent, child) edges."""
+    num_nodes = len(namespaces)
+    edges = sorted(set(edges))
+    indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    for parent, _ in edges:
+        indptr[parent + 1] += 1
+    titles = [f'Node {node}'.encode('utf-8') for node in range(num_nodes)]
+    categories = [node for node in range(num_nodes) if namespaces[node] == CATEGORY_NAMESPACE]
+    return CategoryGraph(
+        namespaces=np.asarray(namespaces, dtype=np.int32),
+        page_ids=np.arange(num_nodes, dtype=np.int64),
+        title_offsets=np.concatenate(([0], np.cumsum([len(t) for t in titles]))),
+        titles=np.frombuffer(b''.join(titles), dtype=np.uint8),
+        indptr=np.cumsum(indptr),
+        children=np.asarray([child for _, child in edges], dtype=np.int32),
+        category_order=np.asarray(sorted(categories, key=lambda n: titles[n]), dtype=np.int32)
+    )
+
+
+def _random_graph(rng, num_categories, num_pages, num_edges, cycles):
+    namespaces = [CATEGORY_NAMESPACE] * num_categories + [0] * num_pages
+    edges = []
+    for _ in range(num_edges):
+        parent = int(rng.integers(num_categories))
+        child = int(rng.integers(num_categories + num_pages))
+        # Without cycles, categories only point to higher-numbered nodes
+        if cycles or child > parent:
+            edges.append((parent, child))
+    return _graph(namespaces, [(p, c) for p, c in edges if p != c])
+
+
+def _descendants(index, node):
+    """Brute-force reachability over the edges the index keeps."""
+    graph = index.graph
+    seen, stack = {node}, [node]
+    while stack:
+        current = stack.pop()
+        for edge in range(graph.indptr[current], graph.indptr[current + 1]):
+            child = int(graph.children[edge])
+            if index.dag_mask[edge] and child not in seen:
+                seen.add(child)
+                stack.append(child)
+    return seen
+
+
+@pytest.mark.parametrize('seed,cycles', [(0, False), (1, False), (2, True), (3, True)])
+def test_reaches_matches_brute_force(seed, cycles):
+    rng = np.random.default_rng(seed)
+    index = CategoryIndex.build(_random_graph(rng, 40, 60, 250, cycles))
+    for ancestor in range(40):
+        expected = _descendants(index, ancestor)
+        assert {node for node in range(100) if index.reaches(ancestor, node)} == expected
+        assert set(index.subtree_members(ancestor, namespace=None).tolist()) == expected
+
+
+def test_acyclic_graph_keeps_every_edge():
+    index = CategoryIndex.build(_random_graph(np.random.default_rng(4), 30, 30, 150, cycles=False))
+    assert index.dag_mask.all()
+
+
+def test_cycle_is_broken_once():
+    # 0 -> 1 -> 2 -> 0, page 3 under 2
+    index = CategoryIndex.build(_graph([CATEGORY_NAMESPACE] * 3 + [0], [(0, 1), (1, 2), (2, 0), (2, 3)]))
+    assert (~index.dag_mask).sum() == 1
+    assert all(index.reaches(0, node) for node in range(4))
+    assert index.reaches(1, 3) and not index.reaches(3, 1)
+
+
+def test_depth_limited_descendants_and_lca():
+    # 0 -> 1 -> 2 -> page 4; 0 -> 3 -> page 5
+    index = CategoryIndex.build(_graph([CATEGORY_NAMESPACE] * 4 + [0, 0],
+                                       [(0, 1), (1, 2), (2, 4), (0, 3), (3, 5)]))
+    assert index.is_descendant(4, 0)
+    assert not index.is_descendant(4, 0, max_depth=2)
+    assert index.is_descendant(4, 0, max_depth=3)
+    assert not index.is_descendant(5, 1)
+    assert index.lowest_common_category(4, 5) == 0
+    assert index.ancestors(4) == {0, 1, 2}
+    assert index.subtree_members(1).tolist() == [4]
+
+
+def test_save_and_load(tmp_path):
+    graph = _random_graph(np.random.default_rng(5), 20, 20, 80, cycles=True)
+    index = CategoryIndex.build(graph)
+    index.save(str(tmp_path))
+    loaded = CategoryIndex.load(graph, str(tmp_path))
+    assert all(loaded.reaches(a, n) == index.reaches(a, n) for a in range(20) for n in range(40))
+
+
+def test_index_is_rebuilt_when_its_source_changes(tmp_path, capsys):
+    source_file = tmp_path / 'categories.db'
+    source_file.write_bytes(b'v1')
+    index_dir = str(tmp_path / 'index')
+    graph = _random_graph(np.random.default_rng(6), 20, 20, 80, cycles=False)
+
+    CategoryIndex.load_or_build(graph, index_dir, source_stamp([source_file]))
+    CategoryIndex.load_or_build(graph, index_dir, source_stamp([source_file]))
+    assert capsys.readouterr().out.count('Built index') == 1
+
+    # A new graph from a changed source must not be served the old intervals
+    changed = _random_graph(np.random.default_rng(7), 20, 20, 80, cycles=False)
+    source_file.write_bytes(b'version 2')
+    os.utime(source_file, ns=(1, 1))
+    index = CategoryIndex.load_or_build(changed, index_dir, source_stamp([source_file]))
+    assert capsys.readouterr().out.count('Built index') == 1
+    assert all(index.reaches(a, n) == (n in _descendants(index, a)) for a in range(20) for n in range(40))
+    assert CategoryIndex.stored_source(index_dir) == source_stamp([source_file])
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from link_graph import pagerank
+
+
+def _csr(num_nodes, edges):
+    sources = np.asarray([s for s, _ in edges], dtype=np.int64)
+    targets = np.asarray([t for _, t in edges], dtype=np.int32)
+    order = np.argsort(sources, kind='stable')
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(sources, minlength=num_nodes)))).astype(np.int64)
+    return indptr, targets[order]
+
+
+def _dense_pagerank(num_nodes, edges, damping):
+    """Stationary distribution of the Google matrix, solved directly."""
+    transition = np.zeros((num_nodes, num_nodes))
+    for source, target in edges:
+        transition[target, source] += 1
+    out_degree = transition.sum(axis=0)
+    transition[:, out_degree == 0] = 1.0  # Dangling nodes link everywhere
+    transition /= transition.sum(axis=0)
+    google = damping * transition + (1 - damping) / num_nodes
+    values, vectors = np.linalg.eig(google)
+    vector = np.real(vectors[:, np.argmin(np.abs(values - 1))])
+    return vector / vector.sum()
+
+
+def _random_edges(rng, num_nodes, num_edges):
+    return [(int(s), int(t)) for s, t in rng.integers(num_nodes, size=(num_edges, 2))]
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_matches_dense_solution(seed):
+    rng = np.random.default_rng(seed)
+    edges = _random_edges(rng, 30, 80)  # Leaves some nodes dangling, includes duplicate edges
+    rank = pagerank(*_csr(30, edges), tol=1e-12, max_iter=500)
+    np.testing.assert_allclose(rank, _dense_pagerank(30, edges, 0.85), atol=1e-9)
+    assert rank.sum() == pytest.approx(1.0)
+
+
+def test_chunking_does_not_change_result():
+    edges = _random_edges(np.random.default_rng(3), 50, 300)
+    indptr, indices = _csr(50, edges)
+    np.testing.assert_allclose(pagerank(indptr, indices, chunk_edges=7), pagerank(indptr, indices), atol=1e-12)
+
+
+def test_symmetric_cycle_is_uniform_and_hub_ranks_highest():
+    cycle = [(i, (i + 1) % 5) for i in range(5)]
+    np.testing.assert_allclose(pagerank(*_csr(5, cycle)), np.full(5, 0.2))
+
+    star = [(i, 0) for i in range(1, 6)]
+    rank = pagerank(*_csr(6, star))
+    assert rank.argmax() == 0
+    np.testing.assert_allclose(rank[1:], rank[1])
+
+
+def test_graph_without_edges_is_uniform():
+    np.testing.assert_allclose(pagerank(np.zeros(5, dtype=np.int64), np.zeros(0, dtype=np.int32)), np.full(4, 0.25))
+
+
+@pytest.mark.parametrize('max_iter', [0, -1])
+def test_max_iter_must_be_positive(max_iter):
+    with pytest.raises(ValueError):
+        pagerank(*_csr(3, [(0, 1)]), max_iter=max_iter)
+    assert pagerank(*_csr(3, [(0, 1)]), max_iter=1).sum() == pytest.approx(1.0)
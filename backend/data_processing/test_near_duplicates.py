@@ -0,0 +1,138 @@
+import random
+
+import pytest
+
+from data_processing.near_duplicates import (
+    MinHasher, NearDuplicateIndex, choose_bands, remap_entities, section_spans
+)
+
+WORDS = ('engine mathematician notes algorithm design computer analytical machine number '
+         'sequence card punched loom weaving theory poetical science letter translation').split()
+
+
+def _text(seed, words=120):
+    rng = random.Random(seed)
+    return ' '.join(rng.choice(WORDS) for _ in range(words)) + '.'
+
+
+def _edit(text, seed, changes):
+    """Replace ``changes`` random words."""
+    rng = random.Random(seed)
+    words = text.split(' ')
+    for position in rng.sample(range(len(words)), changes):
+        words[position] = 'Zanzibar'
+    return ' '.join(words)
+
+
+def _entity(text, surface, type_='MISC', occurrence=0):
+    start = -1
+    for _ in range(occurrence + 1):
+        start = text.index(surface, start + 1)
+    return {'text': surface, 'type': type_, 'start': start, 'end': start + len(surface)}
+
+
+def test_remap_keeps_entities_that_did_not_move():
+    text = 'Ada Lovelace met Charles Babbage in London.'
+    entities = [_entity(text, 'Ada Lovelace'), _entity(text, 'London')]
+    assert remap_entities(len(text), entities, text) == entities
+
+
+def test_remap_moves_entities_to_nearest_scaled_occurrence():
+    source = 'Paris is big. ' + 'filler ' * 20 + 'Paris again.'
+    target = 'Oh, Paris is big. ' + 'filler ' * 20 + 'Paris again.'
+    first, second = _entity(source, 'Paris'), _entity(source, 'Paris', occurrence=1)
+    remapped = remap_entities(len(source), [first, second], target)
+    assert [target[e['start']:e['end']] for e in remapped] == ['Paris', 'Paris']
+    assert [e['start'] for e in remapped] == [_entity(target, 'Paris')['start'],
+                                              _entity(target, 'Paris', occurrence=1)['start']]
+
+
+def test_remap_drops_entities_whose_text_is_gone():
+    source = 'Ada Lovelace met Charles Babbage.'
+    remapped = remap_entities(len(source), [_entity(source, 'Charles Babbage'), _entity(source, 'Ada')],
+                              'Ada Lovelace met a friend.')
+    assert [e['text'] for e in remapped] == ['Ada']
+
+
+@pytest.mark.parametrize('threshold', [0.7, 0.8, 0.9, 0.95])
+def test_banding_reaches_target_recall(threshold):
+    bands, rows = choose_bands(128, threshold)
+    assert bands * rows <= 128
+    assert 1 - (1 - threshold ** rows) ** bands >= 0.95
+    # One more row per band would miss the target
+    more = rows + 1
+    assert 1 - (1 - threshold ** more) ** (128 // more) < 0.95
+
+
+def test_minhash_estimates_jaccard():
+    hasher = MinHasher(num_perm=256, shingle_size=3)
+    first, second = _text(1), _edit(_text(1), 2, 10)
+    a, b = set(hasher.shingles(first).tolist()), set(hasher.shingles(second).tolist())
+    jaccard = len(a & b) / len(a | b)
+    estimate = (hasher.signature(hasher.shingles(first)) == hasher.signature(hasher.shingles(second))).mean()
+    assert estimate == pytest.approx(jaccard, abs=0.1)
+
+
+def test_section_spans_split_on_blank_lines():
+    text = 'First section.\n\nSecond\nsection.\n \nThird.'
+    assert [text[s:e] for s, e in section_spans(text)] == ['First section.', 'Second\nsection.', 'Third.']
+
+
+@pytest.fixture
+def index():
+    index = NearDuplicateIndex(':memory:', threshold=0.8, shingle_size=3, min_shingles=5)
+    yield index
+    index.close()
+
+
+def test_find_exact_near_and_unrelated_sections(index):
+    text = _text(1)
+    entities = [_entity(text, 'analytical'), _entity(text, 'engine')]
+    relationships = [{'source': 'analytical', 'source_type': 'MISC', 'target': 'engine', 'target_type': 'MISC',
+                      'score': 0.9}]
+    index.add(text, entities, relationships)
+
+    exact = index.find(text)
+    assert exact['exact'] and exact['entities'] == entities and exact['relationships'] == relationships
+
+    near_text = _edit(text, 3, 2)
+    near = index.find(near_text)
+    assert near is not None and not near['exact'] and near['similarity'] >= 0.8
+    for entity in near['entities']:
+        assert near_text[entity['start']:entity['end']] == entity['text']
+
+    assert index.find(_text(99)) is None
+    assert index.stats['exact'] == 1 and index.stats['near'] == 1
+
+
+def test_short_sections_only_match_exactly(index):
+    index.add('Ada Lovelace.', [], [])
+    assert index.find('Ada Lovelace.')['exact']
+    assert index.find('Ada Lovelace!') is None
+
+
+def test_index_refuses_different_parameters(tmp_path):
+    path = str(tmp_path / 'sections.db')
+    NearDuplicateIndex(path, shingle_size=3).close()
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(path, shingle_size=4)
+
+
+def test_article_reuse_skips_matched_sections(index):
+    first, second = _text(1), _text(2)
+    index.add(first, [_entity(first, 'engine')], [])
+    article = second + '\n\n' + _edit(first, 4, 1)
+    offset = len(second) + 2
+    segments = [{'start': 0, 'input_ids': [0] * 30}, {'start': offset, 'input_ids': [0] * 40}]
+
+    reuse = index.article(article, segments)
+    assert reuse.segments == segments[:1]
+    assert (reuse.skipped_segments, reuse.skipped_tokens, reuse.reused_sections) == (1, 40, 1)
+    [entity] = reuse.entities
+    assert entity['start'] >= offset and article[entity['start']:entity['end']] == 'engine'
+
+    # The processed section is indexed with offsets relative to the section
+    reuse.record(segments[0], [_entity(article, 'number')], [])
+    reuse.commit()
+    assert not index.con.in_transaction
+    assert index.find(second)['entities'] == [_entity(second, 'number')]
@@ -0,0 +1,90 @@
+import pytest
+from tokenizers import Tokenizer, models, pre_tokenizers, processors, trainers
+from transformers import PreTrainedTokenizerFast
+
+from data_processing.text_preprocessor import TextPreprocessor
+
+ARTICLE = (
+    "Ada Lovelace was an English mathematician. She worked on the Analytical Engine! "
+    "Her notes describe an algorithm.\n\n"
+    "Charles Babbage designed the engine. He never finished it.\n\n"
+    "Legacy: the language Ada is named after her."
+)
+
+
+@pytest.fixture(scope='module')
+def tokenizer():
+    """Small local WordPiece tokenizer with [CLS]/[SEP] around single sequences."""
+    special = ['[PAD]', '[UNK]', '[CLS]', '[SEP]']
+    model = Tokenizer(models.WordPiece(unk_token='[UNK]'))
+    model.pre_tokenizer = pre_tokenizers.BertPreTokenizer()
+    model.train_from_iterator([ARTICLE], trainers.WordPieceTrainer(vocab_size=200, special_tokens=special))
+    model.post_processor = processors.TemplateProcessing(
+        single='[CLS] $A [SEP]', special_tokens=[('[CLS]', 2), ('[SEP]', 3)]
+    )
+    return PreTrainedTokenizerFast(tokenizer_object=model, unk_token='[UNK]', pad_token='[PAD]',
+                                   cls_token='[CLS]', sep_token='[SEP]')
+
+
+def _check_segment(segment, text, tokenizer, max_tokens):
+    assert segment['text'] == text[segment['start']:segment['end']]
+    assert len(segment['input_ids']) == len(segment['offsets']) <= max_tokens
+    assert segment['input_ids'][0] == tokenizer.cls_token_id
+    assert segment['input_ids'][-1] == tokenizer.sep_token_id
+    assert segment['offsets'][0] is None and segment['offsets'][-1] is None
+    for token_id, (start, end) in zip(segment['input_ids'][1:-1], segment['offsets'][1:-1]):
+        assert segment['start'] <= start < end <= segment['end']
+        # Offsets point at the article text the token was produced from
+        assert tokenizer.convert_ids_to_tokens(token_id).lstrip('#') in text[start:end] \
+            or token_id == tokenizer.unk_token_id
+
+
+def test_special_tokens_are_detected(tokenizer):
+    preprocessor = TextPreprocessor(tokenizer, max_tokens=16)
+    assert preprocessor.prefix_ids == [tokenizer.cls_token_id]
+    assert preprocessor.suffix_ids == [tokenizer.sep_token_id]
+    assert preprocessor.token_budget == 14
+
+
+@pytest.mark.parametrize('max_tokens', [8, 12, 24, 512])
+def test_segments_cover_tokens_in_order(tokenizer, max_tokens):
+    preprocessor = TextPreprocessor(tokenizer, max_tokens=max_tokens)
+    text = preprocessor.clean_text(ARTICLE)
+    segments = preprocessor.split_into_segments(text)
+    for segment in segments:
+        _check_segment(segment, text, tokenizer, max_tokens)
+
+    # Every token of the article appears exactly once, in order
+    encoding = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+    assert [i for segment in segments for i in segment['input_ids'][1:-1]] == encoding['input_ids']
+    assert [o for segment in segments for o in segment['offsets'][1:-1]] == \
+        [tuple(o) for o in encoding['offset_mapping']]
+
+
+def test_segments_do_not_cross_sections(tokenizer):
+    preprocessor = TextPreprocessor(tokenizer, max_tokens=512)
+    text = preprocessor.clean_text(ARTICLE)
+    segments = preprocessor.split_into_segments(text)
+    assert [segment['text'] for segment in segments] == text.split('\n\n')
+
+
+def test_sentences_are_not_split_when_they_fit(tokenizer):
+    preprocessor = TextPreprocessor(tokenizer, max_tokens=24)
+    text = preprocessor.clean_text(ARTICLE)
+    sentences = preprocessor.split_sentences(text)
+    assert max(len(tokenizer(text[start:end], add_special_tokens=False)['input_ids'])
+               for start, end, _ in sentences) <= preprocessor.token_budget
+    for segment in preprocessor.split_into_segments(text):
+        # Segments end where a sentence does, up to the whitespace after it
+        assert any(segment['end'] <= end and not text[segment['end']:end].strip() for _, end, _ in sentences)
+
+
+def test_clean_text_keeps_section_breaks():
+    preprocessor = TextPreprocessor.__new__(TextPreprocessor)
+    assert preprocessor.clean_text("a\x07b  \t c \n\n  d\x00 ") == "ab c\n\nd"
+
+
+def test_budget_must_leave_room_for_text(tokenizer):
+    with pytest.raises(ValueError):
+        TextPreprocessor(tokenizer, max_tokens=2)
+    assert TextPreprocessor(tokenizer).split_into_segments("  \n ") == []
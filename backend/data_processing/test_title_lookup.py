@@ -0,0 +1,90 @@
+import json
+import multiprocessing as mp
+import os
+
+import pytest
+
+from title_lookup import TitleLookup, normalize_title
+
+PAGES = [
+    {'id': 10, 'title': 'AT&amp;T'},
+    {'id': 3, 'title': 'Ada Lovelace'},
+    {'id': 7, 'title': 'Lovelace', 'redirect': 'Ada Lovelace'},
+    {'id': 8, 'title': 'Countess Lovelace', 'redirect': 'Lovelace'},
+    {'id': 9, 'title': 'Countess of Lovelace', 'redirect': 'Countess Lovelace#Life'},
+    {'id': 20, 'title': 'Loop A', 'redirect': 'Loop B'},
+    {'id': 21, 'title': 'Loop B', 'redirect': 'Loop A'},
+    {'id': 22, 'title': 'Dangling', 'redirect': 'Nowhere'},
+    {'id': 30, 'title': 'Ada Lovelace', 'namespace': 14},
+]
+
+
+@pytest.fixture
+def lookup(tmp_path):
+    pages_file = tmp_path / 'wiki_pages.jsonl'
+    pages_file.write_text(''.join(json.dumps(page) + '\n' for page in PAGES), encoding='utf-8')
+    return TitleLookup.open(str(pages_file))
+
+
+def test_normalize_title():
+    assert normalize_title(' ada_lovelace#Early life') == 'Ada lovelace'
+    assert normalize_title(':AT&amp;T') == 'AT&T'
+
+
+def test_lookup_by_id(lookup):
+    assert len(lookup) == len(PAGES)
+    assert lookup.title_of(3) == 'Ada Lovelace'
+    assert lookup.title_of(10) == 'AT&T'
+    assert lookup.title_of(4) is None
+    assert lookup.namespace_of(30) == 14
+
+
+def test_lookup_by_title(lookup):
+    assert lookup.id_of('AT&T') == 10
+    assert lookup.id_of('AT&amp;T') == 10
+    assert lookup.id_of('unknown page') is None
+
+
+def test_redirect_chains_resolve_to_final_page(lookup):
+    assert lookup.id_of('lovelace') == 3
+    assert lookup.id_of('Countess_Lovelace') == 3
+    assert lookup.id_of('Countess of Lovelace') == 3
+    assert lookup.id_of('Lovelace', follow_redirects=False) == 7
+    assert lookup.resolve_id(9) == 3
+    assert lookup.resolve_id(3) == 3
+    assert lookup.is_redirect(8) and not lookup.is_redirect(3)
+
+
+def test_redirect_loops_and_dangling_redirects_are_broken(lookup):
+    assert lookup.id_of('Loop A') is None
+    assert lookup.resolve_id(21) is None
+    assert lookup.id_of('Dangling') is None
+    assert lookup.id_of('Dangling', follow_redirects=False) == 22
+
+
+def test_lookup_is_rebuilt_when_pages_change(tmp_path, lookup):
+    pages_file = tmp_path / 'wiki_pages.jsonl'
+    with open(pages_file, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'id': 40, 'title': 'Babbage'}) + '\n')
+    compiled = os.path.getmtime(tmp_path / 'wiki_pages.lookup' / 'titles.blob')
+    os.utime(pages_file, (compiled + 10, compiled + 10))
+    assert TitleLookup.open(str(pages_file)).id_of('Babbage') == 40
+
+
+def _open_and_resolve(pages_file, results):
+    results.put(TitleLookup.open(pages_file).id_of('Countess Lovelace'))
+
+
+def test_concurrent_opens_compile_once(tmp_path, capfd):
+    pages_file = tmp_path / 'wiki_pages.jsonl'
+    pages_file.write_text(''.join(json.dumps(page) + '\n' for page in PAGES), encoding='utf-8')
+    context = mp.get_context('fork')
+    results = context.Queue()
+    processes = [context.Process(target=_open_and_resolve, args=(str(pages_file), results)) for _ in range(6)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert [results.get(timeout=10) for _ in processes] == [3] * 6
+    assert capfd.readouterr().out.count('Compiled title lookup') == 1
+    assert sorted(os.listdir(tmp_path)) == ['wiki_pages.jsonl', 'wiki_pages.lookup', 'wiki_pages.lookup.lock']
@@ -0,0 +1,142 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+from transformers import AutoTokenizer
+
+# Sentence ends: terminal punctuation (plus closing quotes/brackets) followed by whitespace
+sentenceEndRE = re.compile(r'[.!?]+["\')\]]*\s+(?=\S)')
+# Section ends: blank lines between the sections of an article
+sectionEndRE = re.compile(r'\n\s*\n')
+controlRE = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]')
+spaceRE = re.compile(r'[ \t\r\f\v]+')
+
+
+class TextPreprocessor:
+    """
+    Splits article text into model-ready segments.
+
+    The article is tokenized once with the models' fast tokenizer. Sentences
+    are then packed into segments of at most ``max_tokens`` tokens (special
+    tokens included), never crossing a section boundary. Every segment keeps
+    its token IDs and per-token character offsets into the article, so the
+    models can run on it without tokenizing again and map their spans back.
+    """
+
+    def __init__(self, tokenizer=None, max_tokens: int = 512,
+                 model_name: str = "answerdotai/ModernBERT-base"):
+        """
+        Args:
+            tokenizer: Fast tokenizer shared with the models; loaded from
+                ``model_name`` if not given
+            max_tokens: Token budget per segment, special tokens included
+            model_name: Tokenizer to load when ``tokenizer`` is None
+        """
+        self.tokenizer = tokenizer if tokenizer is not None else AutoTokenizer.from_pretrained(model_name)
+        if not self.tokenizer.is_fast:
+            raise ValueError("TextPreprocessor needs a fast tokenizer for offset mapping")
+        self.max_tokens = max_tokens
+        self.prefix_ids, self.suffix_ids = self._special_token_template()
+        self.token_budget = max_tokens - len(self.prefix_ids) - len(self.suffix_ids)
+        if self.token_budget <= 0:
+            raise ValueError(f"max_tokens={max_tokens} leaves no room for text")
+
+    def _special_token_template(self) -> Tuple[List[int], List[int]]:
+        """Find the special tokens the tokenizer puts around a single sequence."""
+        with_special = self.tokenizer("a", add_special_tokens=True)['input_ids']
+        without = self.tokenizer("a", add_special_tokens=False)['input_ids']
+        for i in range(len(with_special) - len(without) + 1):
+            if with_special[i:i + len(without)] == without:
+                return with_special[:i], with_special[i + len(without):]
+        raise ValueError("Could not determine the tokenizer's special tokens")
+
+    def clean_text(self, text: str) -> str:
+        """
+        Normalize whitespace and drop control characters.
+
+        Line breaks are kept because blank lines mark section boundaries.
+        """
+        text = controlRE.sub('', text)
+        text = spaceRE.sub(' ', text)
+        return '\n'.join(line.strip() for line in text.split('\n')).strip()
+
+    def split_sentences(self, text: str) -> List[Tuple[int, int, bool]]:
+        """
+        Split text into sentences.
+
+        Returns:
+            List of (start, end, ends_section) character spans
+        """
+        breaks = {}
+        for match in sentenceEndRE.finditer(text):
+            breaks[match.end()] = breaks.get(match.end(), False)
+        for match in sectionEndRE.finditer(text):
+            breaks[match.end()] = True
+
+        spans = []
+        start = 0
+        for end in sorted(breaks):
+            if text[start:end].strip():
+                spans.append((start, end, breaks[end]))
+            start = end
+        if text[start:].strip():
+            spans.append((start, len(text), True))
+        return spans
+
+    def split_into_segments(self, text: str) -> List[Dict]:
+        """
+        Pack the sentences of an article into token-budgeted segments.
+
+        Args:
+            text: Cleaned article text
+
+        Returns:
+            List of segments, each a dict with ``text``, ``start`` and ``end``
+            (character span in ``text``), ``input_ids`` (special tokens
+            included) and ``offsets`` (article character span per token,
+            None for special tokens)
+        """
+        if not text.strip():
+            return []
+        encoding = self.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True,
+                                  return_attention_mask=False, verbose=False)
+        ids, offsets = encoding['input_ids'], encoding['offset_mapping']
+        if not ids:
+            return []
+
+        segments = []
+        token = 0
+        chunk_start = 0
+        for _, end, ends_section in self.split_sentences(text):
+            sentence_start = token
+            while token < len(ids) and offsets[token][0] < end:
+                token += 1
+            # Close the segment before a sentence that does not fit any more
+            if token - chunk_start > self.token_budget:
+                if sentence_start > chunk_start:
+                    segments.append(self._segment(text, ids, offsets, chunk_start, sentence_start))
+                    chunk_start = sentence_start
+                # Sentences longer than the budget are cut into full windows
+                while token - chunk_start > self.token_budget:
+                    segments.append(self._segment(text, ids, offsets, chunk_start,
+                                                  chunk_start + self.token_budget))
+                    chunk_start += self.token_budget
+            if ends_section and token > chunk_start:
+                segments.append(self._segment(text, ids, offsets, chunk_start, token))
+                chunk_start = token
+        if chunk_start < len(ids):
+            segments.append(self._segment(text, ids, offsets, chunk_start, len(ids)))
+        return segments
+
+    def _segment(self, text: str, ids: List[int], offsets: List[Tuple[int, int]],
+                 first: int, last: int) -> Dict:
+        start, end = offsets[first][0], offsets[last - 1][1]
+        token_offsets: List[Optional[Tuple[int, int]]] = (
+            [None] * len(self.prefix_ids) + [tuple(o) for o in offsets[first:last]] + [None] * len(self.suffix_ids)
+        )
+        return {
+            'text': text[start:end],
+            'start': start,
+            'end': end,
+            'input_ids': self.prefix_ids + ids[first:last] + self.suffix_ids,
+            'offsets': token_offsets
+        }
@@ -0,0 +1,251 @@
+import argparse
+import fcntl
+import hashlib
+import html
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from array import array
+
+import numpy as np
+
+LOOKUP_FILES = ('ids', 'namespaces', 'title_offsets', 'hashes', 'hash_order', 'redirect_targets')
+MAX_REDIRECT_HOPS = 5
+NOT_REDIRECT = -1
+BROKEN_REDIRECT = -2
+
+def normalize_title(title):
+    """Normalize a wiki link target or page title the way MediaWiki does."""
+    title = html.unescape(title).split('#', 1)[0]
+    title = re.sub(r'[_\s]+', ' ', title).strip().lstrip(':').strip()
+    return title[:1].upper() + title[1:]
+
+def title_hash(title):
+    """64-bit hash of an already normalized title."""
+    return int.from_bytes(hashlib.blake2b(title.encode('utf-8'), digest_size=8).digest(), 'little')
+
+def compile_lookup(pages_file, lookup_dir):
+    """
+    Compile ``collect_pages`` output into a memory-mappable lookup directory.
+
+    Pages are stored sorted by ID with their original titles in a blob.
+    Normalized titles are indexed by a sorted array of 64-bit hashes, and
+    every redirect page stores the page ID it finally resolves to. The
+    files are written to a temporary directory next to ``lookup_dir`` and
+    swapped into place once complete, so a reader never maps a partly
+    written array. Concurrent builders must be serialized by the caller
+    (see ``TitleLookup.open``).
+
+    Args:
+        pages_file: ``*_pages.jsonl`` written by ``collect_pages``
+        lookup_dir: Output directory
+    """
+    start = time.time()
+    ids, namespaces, hashes, redirect_hashes = array('q'), array('h'), array('Q'), array('Q')
+    offsets, blob = array('q', [0]), bytearray()
+    with open(pages_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            page = json.loads(line)
+            ids.append(int(page['id']))
+            namespaces.append(int(page.get('namespace') or 0))
+            hashes.append(title_hash(normalize_title(page['title'])))
+            redirect = page.get('redirect')
+            redirect_hashes.append(title_hash(normalize_title(redirect)) if redirect else 0)
+            blob += page['title'].encode('utf-8')
+            offsets.append(len(blob))
+
+    ids = np.frombuffer(ids, dtype=np.int64)
+    id_order = np.argsort(ids, kind='stable')
+    offsets = np.frombuffer(offsets, dtype=np.int64)
+    lengths = np.diff(offsets)[id_order]
+    title_offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+    titles = _reorder_blob(np.frombuffer(bytes(blob), dtype=np.uint8), offsets, id_order, title_offsets)
+
+    hashes = np.frombuffer(hashes, dtype=np.uint64)[id_order]
+    hash_order = np.argsort(hashes, kind='stable')
+    sorted_hashes = hashes[hash_order]
+    redirect_hashes = np.frombuffer(redirect_hashes, dtype=np.uint64)[id_order]
+
+    # Resolve redirect chains to final page positions
+    is_redirect = redirect_hashes != 0
+    positions = np.searchsorted(sorted_hashes, redirect_hashes)
+    positions[positions == len(sorted_hashes)] = 0
+    found = is_redirect & (sorted_hashes[positions] == redirect_hashes) if len(ids) else is_redirect
+    target = np.where(found, hash_order[positions], -1)
+    for _ in range(MAX_REDIRECT_HOPS):
+        chained = (target >= 0) & is_redirect[np.maximum(target, 0)]
+        if not chained.any():
+            break
+        target[chained] = target[target[chained]]
+    redirect_targets = np.full(len(ids), NOT_REDIRECT, dtype=np.int64)
+    redirect_targets[is_redirect] = BROKEN_REDIRECT
+    resolved = is_redirect & (target >= 0) & ~is_redirect[np.maximum(target, 0)]
+    redirect_targets[resolved] = ids[id_order][target[resolved]]
+
+    arrays = {
+        'ids': ids[id_order],
+        'namespaces': np.frombuffer(namespaces, dtype=np.int16)[id_order],
+        'title_offsets': title_offsets,
+        'hashes': sorted_hashes,
+        'hash_order': hash_order.astype(np.int64),
+        'redirect_targets': redirect_targets,
+    }
+    lookup_dir = os.path.abspath(lookup_dir)
+    tmp_dir = tempfile.mkdtemp(prefix=os.path.basename(lookup_dir) + '.', dir=os.path.dirname(lookup_dir))
+    try:
+        for name, values in arrays.items():
+            np.save(os.path.join(tmp_dir, f'{name}.npy'), values)
+        with open(os.path.join(tmp_dir, 'titles.blob'), 'wb') as f:
+            f.write(titles.tobytes())
+        # A directory cannot be replaced while it has entries: move the old lookup aside first
+        old_dir = None
+        if os.path.exists(lookup_dir):
+            old_dir = tmp_dir + '.old'
+            os.replace(lookup_dir, old_dir)
+        os.replace(tmp_dir, lookup_dir)
+        if old_dir:
+            shutil.rmtree(old_dir, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    print(f"Compiled title lookup for {len(ids)} pages ({int(is_redirect.sum())} redirects) "
+          f"in {time.time() - start:.1f}s")
+
+def _reorder_blob(blob, offsets, order, new_offsets, chunk=1 << 20):
+    """Reorder the variable-length entries of a blob, ``chunk`` entries at a time."""
+    if np.array_equal(order, np.arange(len(order))):
+        return blob
+    result = np.empty(len(blob), dtype=np.uint8)
+    for start in range(0, len(order), chunk):
+        rows = order[start:start + chunk]
+        lengths = offsets[rows + 1] - offsets[rows]
+        first = new_offsets[start]
+        positions = np.repeat(offsets[rows] - (new_offsets[start:start + len(rows)] - first), lengths)
+        positions += np.arange(lengths.sum())
+        result[first:first + lengths.sum()] = blob[positions]
+    return result
+
+class TitleLookup:
+    """
+    Memory-mapped title/ID lookup with redirect resolution.
+
+    Loading only maps the arrays; ID lookups are a binary search over the
+    sorted IDs and title lookups a binary search over the sorted title hashes.
+    """
+
+    def __init__(self, lookup_dir):
+        for name in LOOKUP_FILES:
+            setattr(self, name, np.load(os.path.join(lookup_dir, f'{name}.npy'), mmap_mode='r'))
+        path = os.path.join(lookup_dir, 'titles.blob')
+        self.titles = np.memmap(path, dtype=np.uint8, mode='r') if os.path.getsize(path) \
+            else np.zeros(0, dtype=np.uint8)
+
+    @classmethod
+    def open(cls, path):
+        """
+        Open a lookup directory, or a ``*_pages.jsonl`` file whose compiled
+        lookup is kept next to it and rebuilt when the file is newer.
+
+        Like ``ArticleStore``, a stale lookup is rebuilt under an exclusive
+        lock on ``<lookup_dir>.lock``, so processes opening it at the same
+        time build it once.
+        """
+        if os.path.isdir(path):
+            return cls(path)
+        lookup_dir = os.path.abspath(f"{os.path.splitext(path)[0]}.lookup")
+        marker = os.path.join(lookup_dir, 'titles.blob')
+
+        def stale():
+            return not os.path.exists(marker) or os.path.getmtime(marker) < os.path.getmtime(path)
+
+        with open(lookup_dir + '.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_SH)
+            if stale():
+                # Converting the lock releases it first: recheck once exclusive
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                if stale():
+                    compile_lookup(path, lookup_dir)
+                fcntl.flock(lock, fcntl.LOCK_SH)
+            # Mapped files stay valid even if a later rebuild replaces them
+            return cls(lookup_dir)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _position(self, page_id):
+        i = int(np.searchsorted(self.ids, page_id))
+        return i if i < len(self.ids) and self.ids[i] == page_id else None
+
+    def _title_at(self, position):
+        start, end = self.title_offsets[position], self.title_offsets[position + 1]
+        return bytes(self.titles[start:end]).decode('utf-8')
+
+    def title_of(self, page_id):
+        """Return the (XML-unescaped) title of a page ID, or None if it is unknown."""
+        position = self._position(page_id)
+        return html.unescape(self._title_at(position)) if position is not None else None
+
+    def namespace_of(self, page_id):
+        """Return the namespace of a page ID, or None if it is unknown."""
+        position = self._position(page_id)
+        return int(self.namespaces[position]) if position is not None else None
+
+    def id_of(self, title, follow_redirects=True):
+        """
+        Return the page ID for a title, or None if it is unknown.
+
+        Args:
+            title: Page title or link target in any common spelling
+            follow_redirects: If True, return the redirect's final target
+
+        Returns:
+            Page ID, or None (also for redirects whose target does not exist)
+        """
+        normalized = normalize_title(title)
+        key = np.uint64(title_hash(normalized))
+        i = int(np.searchsorted(self.hashes, key))
+        while i < len(self.hashes) and self.hashes[i] == key:
+            position = int(self.hash_order[i])
+            if normalize_title(self._title_at(position)) == normalized:
+                if not follow_redirects:
+                    return int(self.ids[position])
+                target = int(self.redirect_targets[position])
+                if target == NOT_REDIRECT:
+                    return int(self.ids[position])
+                return target if target != BROKEN_REDIRECT else None
+            i += 1
+        return None
+
+    def resolve_id(self, page_id):
+        """Return the page a (possibly redirect) page ID resolves to, or None."""
+        position = self._position(page_id)
+        if position is None:
+            return None
+        target = int(self.redirect_targets[position])
+        if target == NOT_REDIRECT:
+            return int(page_id)
+        return target if target != BROKEN_REDIRECT else None
+
+    def is_redirect(self, page_id):
+        """Return True if the page ID is a redirect."""
+        position = self._position(page_id)
+        return position is not None and self.redirect_targets[position] != NOT_REDIRECT
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile or query the title/ID lookup table")
+    parser.add_argument("pages_file", help="*_pages.jsonl written by collect_pages, or a compiled lookup directory")
+    parser.add_argument("--title", nargs='*', default=[], help="Titles to resolve")
+    parser.add_argument("--id", nargs='*', type=int, default=[], help="Page IDs to look up")
+
+    args = parser.parse_args()
+    lookup = TitleLookup.open(args.pages_file)
+    for title in args.title:
+        print(f"{title}\t{lookup.id_of(title)}")
+    for page_id in args.id:
+        print(f"{page_id}\t{lookup.title_of(page_id)}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+import os
+from typing import Dict, Optional
+
+from data_processing.article_store import ArticleStore
+from data_processing.title_lookup import TitleLookup
+
+
+class WikipediaParser:
+    """Fetches processed Wikipedia articles from the local article store."""
+
+    def __init__(self, processed_dir: str = "processed_pages", pages_file: Optional[str] = None):
+        """
+        Initialize the parser.
+
+        Args:
+            processed_dir: Directory written by ``process_all_pages``
+            pages_file: Optional ``*_pages.jsonl`` from ``collect_pages`` (or its
+                compiled lookup) used to normalize titles and follow redirects
+        """
+        self.title_lookup = TitleLookup.open(pages_file) if pages_file else None
+        self.store = ArticleStore(
+            processed_dir,
+            title_resolver=self.title_lookup.id_of if self.title_lookup else None
+        )
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'WikipediaParser':
+        """Create a parser from the ``wikipedia`` section of the configuration."""
+        wiki_config = config.get('wikipedia', {})
+        return cls(
+            processed_dir=wiki_config.get('processed_dir', os.path.join('data', 'processed')),
+            pages_file=wiki_config.get('pages_file')
+        )
+
+    def get_article(self, title: str) -> Optional[Dict]:
+        """
+        Fetch an article by title.
+
+        Args:
+            title: Article title
+
+        Returns:
+            Dictionary with id, title, text and sections, or None if not found.
+            Sections and subsections are separated by blank lines in the text.
+        """
+        page = self.store.get_by_title(title)
+        if page is None:
+            return None
+
+        blocks = []
+        for section in page['sections']:
+            blocks.append(section['content'])
+            blocks.extend(subsection['content'] for subsection in section['subsections'])
+
+        return {
+            'id': page['id'],
+            'title': page['title'],
+            'text': '\n\n'.join(block for block in blocks if block),
+            'sections': page['sections']
+        }
+
+    def close(self):
+        """Release the memory-mapped shards."""
+        self.store.close()
@@ -0,0 +1,320 @@
+import asyncio
+from typing import AsyncIterator, Awaitable, Dict, List, Optional, Tuple
+
+from neo4j import AsyncGraphDatabase
+
+from graph.backend import neighborhood_result
+from graph.kg_manager import (
+    CLEAR_QUERY, CONSTRAINT_QUERIES, GET_ENTITIES_QUERY, GET_ENTITY_QUERY,
+    _entity_query, _neighborhood_query, _relationship_record, _relationships_query,
+    _search_query, entity_batch_queries, relationship_batch_queries
+)
+
+class AsyncKnowledgeGraphManager:
+    """
+    Asyncio counterpart of ``KnowledgeGraphManager`` on the async Neo4j driver.
+
+    Methods mirror the synchronous manager and run the same Cypher, but are
+    coroutines: awaiting a query yields to the event loop instead of
+    blocking a thread. All calls share one driver and its connection pool,
+    and a semaphore caps the number of queries in flight so a burst of
+    ``gather``-ed reads queues here instead of timing out while waiting
+    for a pooled connection.
+    """
+
+    def __init__(self, uri: str, user: str, password: str,
+                 max_connection_pool_size: int = 100, fetch_size: int = 1000,
+                 max_concurrency: Optional[int] = None):
+        """
+        Initialize connection to Neo4j database.
+
+        Args:
+            uri: Neo4j database URI
+            user: Database username
+            password: Database password
+            max_connection_pool_size: Maximum number of pooled connections
+            fetch_size: Default number of records fetched per round-trip
+            max_concurrency: Maximum number of queries in flight, defaults to
+                ``max_connection_pool_size``
+        """
+        self.driver = AsyncGraphDatabase.driver(
+            uri,
+            auth=(user, password),
+            max_connection_pool_size=max_connection_pool_size,
+            fetch_size=fetch_size
+        )
+        self.max_connection_pool_size = max_connection_pool_size
+        self.fetch_size = fetch_size
+        self.max_concurrency = max_concurrency or max_connection_pool_size
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'AsyncKnowledgeGraphManager':
+        """
+        Create a manager from the ``database`` section of ``load_config``.
+
+        Args:
+            config: Configuration dictionary
+
+        Returns:
+            Connected AsyncKnowledgeGraphManager
+        """
+        database = config['database']
+        return cls(
+            uri=database['uri'],
+            user=database['username'],
+            password=database['password'],
+            max_connection_pool_size=database.get('max_connection_pool_size', 100),
+            fetch_size=database.get('fetch_size', 1000),
+            max_concurrency=database.get('max_concurrency')
+        )
+
+    async def close(self):
+        """Close the database connection."""
+        await self.driver.close()
+
+    async def gather(self, *reads: Awaitable) -> List:
+        """
+        Run independent reads concurrently.
+
+        Each read takes its own pooled connection; at most
+        ``max_concurrency`` run at once and the rest wait their turn.
+
+        Args:
+            reads: Coroutines of this manager, e.g. ``manager.get_entity(id)``
+
+        Returns:
+            Results in the order of ``reads``
+        """
+        return list(await asyncio.gather(*reads))
+
+    async def create_constraints(self):
+        """Create necessary constraints for the knowledge graph."""
+        async with self._semaphore, self.driver.session() as session:
+            for constraint in CONSTRAINT_QUERIES:
+                await session.run(constraint)
+
+    async def clear_graph(self):
+        """Clear all nodes and relationships from the graph."""
+        async with self._semaphore, self.driver.session() as session:
+            await session.run(CLEAR_QUERY)
+
+    async def add_entity(self, entity: Dict, merge: bool = True) -> None:
+        """
+        Add entity to knowledge graph.
+
+        Args:
+            entity: Entity information including type and properties
+            merge: If True, merge with existing entity instead of creating new
+        """
+        async with self._semaphore, self.driver.session() as session:
+            await session.run(_entity_query(entity, merge), id=entity['id'], properties=entity)
+
+    async def add_relationship(self, relationship: Dict, merge: bool = True) -> None:
+        """
+        Add relationship between entities.
+
+        Args:
+            relationship: Relationship information including source and target entities
+            merge: If True, merge with existing relationship instead of creating new
+        """
+        await self.add_relationships([relationship], merge)
+
+    async def add_entities(self, entities: List[Dict], merge: bool = True) -> None:
+        """
+        Add a batch of entities in one transaction, one query per label.
+
+        Args:
+            entities: Entities as accepted by ``add_entity``
+            merge: If True, merge with existing entities instead of creating new
+        """
+        async with self._semaphore, self.driver.session() as session:
+            await session.execute_write(_run_batches, entity_batch_queries(entities, merge))
+
+    async def add_relationships(self, relationships: List[Dict], merge: bool = True) -> None:
+        """
+        Add a batch of relationships in one transaction, one query per type.
+
+        Args:
+            relationships: Relationships as accepted by ``add_relationship``
+            merge: If True, merge with existing relationships instead of creating new
+        """
+        async with self._semaphore, self.driver.session() as session:
+            await session.execute_write(_run_batches, relationship_batch_queries(relationships, merge))
+
+    async def get_entity(self, entity_id: str) -> Optional[Dict]:
+        """
+        Retrieve entity by ID.
+
+        Args:
+            entity_id: Unique identifier of the entity
+
+        Returns:
+            Entity data if found, None otherwise
+        """
+        async with self._semaphore, self.driver.session() as session:
+            result = await session.run(GET_ENTITY_QUERY, id=entity_id)
+            record = await result.single()
+            return dict(record['e']) if record else None
+
+    async def get_entities(self, entity_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Retrieve several entities by ID in a single query.
+
+        Args:
+            entity_ids: Unique identifiers of the entities
+
+        Returns:
+            Mapping of entity ID to entity data for every ID that was found
+        """
+        ids = list(dict.fromkeys(entity_ids))
+        if not ids:
+            return {}
+
+        async with self._semaphore, self.driver.session() as session:
+            results = await session.run(GET_ENTITIES_QUERY, ids=ids)
+            return {record['e']['id']: dict(record['e']) async for record in results}
+
+    async def get_relationships(self, entity_id: str, rel_type: Optional[str] = None) -> List[Dict]:
+        """
+        Get all relationships for an entity.
+
+        Args:
+            entity_id: Entity ID to get relationships for
+            rel_type: Optional relationship type to filter by
+
+        Returns:
+            List of relationship dictionaries
+        """
+        async with self._semaphore, self.driver.session() as session:
+            results = await session.run(_relationships_query(rel_type), id=entity_id)
+            return [_relationship_record(record) async for record in results]
+
+    async def get_neighborhood(self, entity_id: str, depth: int = 1,
+                               rel_types: Optional[List[str]] = None,
+                               limit_per_hop: int = 100) -> Optional[Dict]:
+        """
+        Retrieve the k-hop neighborhood of an entity in a single query.
+
+        Args:
+            entity_id: ID of the entity at the center of the neighborhood
+            depth: Number of hops to expand
+            rel_types: Optional relationship types to follow
+            limit_per_hop: Maximum number of relationships fetched per hop
+
+        Returns:
+            Adjacency-list neighborhood (see ``neighborhood_result``), or None if
+            the entity does not exist
+        """
+        if depth < 0:
+            raise ValueError("depth must be non-negative")
+
+        async with self._semaphore, self.driver.session() as session:
+            result = await session.run(
+                _neighborhood_query(depth, rel_types),
+                id=entity_id,
+                limit_per_hop=limit_per_hop
+            )
+            record = await result.single()
+            if not record:
+                return None
+            return neighborhood_result(entity_id, record['nodes'], record['edges'])
+
+    async def get_neighborhoods(self, entity_ids: List[str], depth: int = 1,
+                                rel_types: Optional[List[str]] = None,
+                                limit_per_hop: int = 100) -> Dict[str, Optional[Dict]]:
+        """
+        Retrieve the neighborhoods of several entities concurrently.
+
+        Args:
+            entity_ids: IDs of the entities at the centers of the neighborhoods
+            depth: Number of hops to expand
+            rel_types: Optional relationship types to follow
+            limit_per_hop: Maximum number of relationships fetched per hop
+
+        Returns:
+            Mapping of entity ID to its neighborhood, None for missing entities
+        """
+        ids = list(dict.fromkeys(entity_ids))
+        results = await self.gather(*(self.get_neighborhood(entity_id, depth, rel_types, limit_per_hop)
+                                      for entity_id in ids))
+        return dict(zip(ids, results))
+
+    async def iter_entities(self, label: Optional[str] = None, properties: Dict = None,
+                            fields: Optional[List[str]] = None, fetch_size: Optional[int] = None,
+                            page_size: int = 10000, after_id: Optional[str] = None) -> AsyncIterator[Dict]:
+        """
+        Stream entities matching given criteria in ID order.
+
+        As in the synchronous manager, each keyset page is read completely
+        before its entities are yielded, so no connection (or semaphore slot)
+        is held while the caller processes them; memory is bounded by
+        ``page_size``. Nodes without an ``id`` are skipped.
+
+        Args:
+            label: Optional entity type to filter by
+            properties: Optional property values to match
+            fields: Optional property names to return instead of the full entity
+            fetch_size: Number of records fetched per network round-trip,
+                defaults to the manager's ``fetch_size``
+            page_size: Maximum number of records per query
+            after_id: Only return entities with an ID greater than this cursor
+
+        Yields:
+            Matching entities, projected to ``fields`` if given
+        """
+        while True:
+            query, params = _search_query(label, properties, fields, after_id)
+            async with self._semaphore, \
+                    self.driver.session(fetch_size=fetch_size or self.fetch_size) as session:
+                results = await session.run(query, limit=page_size, **params)
+                entities = [dict(record['e']) async for record in results]
+            for entity in entities:
+                yield entity
+            if len(entities) < page_size:
+                return
+            after_id = entities[-1]['id']
+
+    async def search_entities_page(self, label: Optional[str] = None, properties: Dict = None,
+                                   fields: Optional[List[str]] = None, limit: int = 100,
+                                   after_id: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Fetch one page of matching entities using a cursor on entity ID.
+
+        Args:
+            label: Optional entity type to filter by
+            properties: Optional property values to match
+            fields: Optional property names to return instead of the full entity
+            limit: Maximum number of entities to return
+            after_id: Cursor returned by the previous page, None for the first page
+
+        Returns:
+            Tuple of the entities and the cursor for the next page (None when
+            there are no more results)
+        """
+        query, params = _search_query(label, properties, fields, after_id)
+        async with self._semaphore, self.driver.session() as session:
+            results = await session.run(query, limit=limit, **params)
+            entities = [dict(record['e']) async for record in results]
+        next_cursor = entities[-1]['id'] if len(entities) == limit else None
+        return entities, next_cursor
+
+    async def search_entities(self, label: Optional[str] = None, properties: Dict = None) -> List[Dict]:
+        """
+        Search for entities matching given criteria.
+
+        Loads every match into memory; use ``iter_entities`` for large results.
+
+        Args:
+            label: Optional entity type to filter by
+            properties: Optional property values to match
+
+        Returns:
+            List of matching entities
+        """
+        return [entity async for entity in self.iter_entities(label, properties)]
+
+async def _run_batches(tx, queries: List[Tuple[str, List[Dict]]]) -> None:
+    """Run ``(query, batch)`` pairs inside an async transaction."""
+    for query, batch in queries:
+        await tx.run(query, batch=batch)
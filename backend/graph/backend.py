@@ -0,0 +1,198 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List, Optional, Tuple
+
+class GraphBackend(ABC):
+    """Storage interface implemented by every knowledge graph backend."""
+
+    @abstractmethod
+    def close(self):
+        """Release resources held by the backend."""
+
+    @abstractmethod
+    def create_constraints(self):
+        """Create necessary constraints for the knowledge graph."""
+
+    @abstractmethod
+    def clear_graph(self):
+        """Clear all nodes and relationships from the graph."""
+
+    @abstractmethod
+    def add_entity(self, entity: Dict, merge: bool = True) -> None:
+        """
+        Add entity to knowledge graph.
+
+        Args:
+            entity: Entity information including type and properties
+            merge: If True, merge with existing entity instead of creating new
+        """
+
+    @abstractmethod
+    def add_relationship(self, relationship: Dict, merge: bool = True) -> None:
+        """
+        Add relationship between entities.
+
+        Args:
+            relationship: Relationship information including source and target entities
+            merge: If True, merge with existing relationship instead of creating new
+        """
+
+    def add_entities(self, entities: List[Dict], merge: bool = True) -> None:
+        """
+        Add a batch of entities.
+
+        Args:
+            entities: Entities as accepted by ``add_entity``
+            merge: If True, merge with existing entities instead of creating new
+        """
+        for entity in entities:
+            self.add_entity(entity, merge)
+
+    def add_relationships(self, relationships: List[Dict], merge: bool = True) -> None:
+        """
+        Add a batch of relationships.
+
+        Args:
+            relationships: Relationships as accepted by ``add_relationship``
+            merge: If True, merge with existing relationships instead of creating new
+        """
+        for relationship in relationships:
+            self.add_relationship(relationship, merge)
+
+    @abstractmethod
+    def get_entity(self, entity_id: str) -> Optional[Dict]:
+        """
+        Retrieve entity by ID.
+
+        Args:
+            entity_id: Unique identifier of the entity
+
+        Returns:
+            Entity data if found, None otherwise
+        """
+
+    @abstractmethod
+    def get_entities(self, entity_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Retrieve several entities by ID.
+
+        Args:
+            entity_ids: Unique identifiers of the entities
+
+        Returns:
+            Mapping of entity ID to entity data for every ID that was found
+        """
+
+    @abstractmethod
+    def get_relationships(self, entity_id: str, rel_type: Optional[str] = None) -> List[Dict]:
+        """
+        Get all relationships for an entity.
+
+        Args:
+            entity_id: Entity ID to get relationships for
+            rel_type: Optional relationship type to filter by
+
+        Returns:
+            List of relationship dictionaries
+        """
+
+    @abstractmethod
+    def get_neighborhood(self, entity_id: str, depth: int = 1,
+                         rel_types: Optional[List[str]] = None,
+                         limit_per_hop: int = 100) -> Optional[Dict]:
+        """
+        Retrieve the k-hop neighborhood of an entity.
+
+        Args:
+            entity_id: ID of the entity at the center of the neighborhood
+            depth: Number of hops to expand
+            rel_types: Optional relationship types to follow
+            limit_per_hop: Maximum number of relationships fetched per hop
+
+        Returns:
+            Adjacency-list neighborhood (see ``neighborhood_result``), or None
+            if the entity does not exist
+        """
+
+    @abstractmethod
+    def iter_entities(self, label: Optional[str] = None, properties: Dict = None,
+                      fields: Optional[List[str]] = None, fetch_size: Optional[int] = None,
+                      page_size: int = 10000, after_id: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Stream entities matching given criteria in ID order.
+
+        Args:
+            label: Optional entity type to filter by
+            properties: Optional property values to match
+            fields: Optional property names to return instead of the full entity
+            fetch_size: Number of records fetched per round-trip
+            page_size: Maximum number of records per query
+            after_id: Only return entities with an ID greater than this cursor
+
+        Yields:
+            Matching entities, projected to ``fields`` if given
+        """
+
+    @abstractmethod
+    def search_entities_page(self, label: Optional[str] = None, properties: Dict = None,
+                             fields: Optional[List[str]] = None, limit: int = 100,
+                             after_id: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Fetch one page of matching entities using a cursor on entity ID.
+
+        Args:
+            label: Optional entity type to filter by
+            properties: Optional property values to match
+            fields: Optional property names to return instead of the full entity
+            limit: Maximum number of entities to return
+            after_id: Cursor returned by the previous page, None for the first page
+
+        Returns:
+            Tuple of the entities and the cursor for the next page
+        """
+
+    def search_entities(self, label: Optional[str] = None, properties: Dict = None) -> List[Dict]:
+        """
+        Search for entities matching given criteria.
+
+        Loads every match into memory; use ``iter_entities`` for large results.
+
+        Args:
+            label: Optional entity type to filter by
+            properties: Optional property values to match
+
+        Returns:
+            List of matching entities
+        """
+        return list(self.iter_entities(label, properties))
+
+
+def neighborhood_result(root_id: str, nodes: List[Dict], edges: List[Dict]) -> Dict:
+    """
+    Assemble a deduplicated adjacency-list neighborhood.
+
+    Args:
+        root_id: ID of the entity at the center of the neighborhood
+        nodes: Node property maps, each including its ``id``
+        edges: Edges with ``type``, ``source_id``, ``target_id`` and ``properties``
+
+    Returns:
+        Dictionary with the ``root`` ID, ``nodes`` keyed by ID and
+        ``adjacency`` mapping each source ID to its outgoing edges
+    """
+    adjacency = {}
+    seen = set()
+    for edge in edges:
+        key = (edge['source_id'], edge['type'], edge['target_id'])
+        if key in seen:
+            continue
+        seen.add(key)
+        adjacency.setdefault(edge['source_id'], []).append({
+            'type': edge['type'],
+            'target_id': edge['target_id'],
+            'properties': dict(edge['properties'])
+        })
+    return {
+        'root': root_id,
+        'nodes': {node['id']: dict(node) for node in nodes},
+        'adjacency': adjacency
+    }
@@ -0,0 +1,602 @@
+import json
+import mmap
+import os
+import shutil
+from array import array
+from bisect import bisect_right
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from graph.backend import GraphBackend, neighborhood_result
+
+SNAPSHOT_VERSION = 1
+
+# Marks a property that is not set on a node
+_MISSING = object()
+
+
+def _writable(values, typecode: str) -> array:
+    """Copy a memory-mapped snapshot array into an appendable ``array`` on first write."""
+    return array(typecode, values.tobytes()) if isinstance(values, np.ndarray) else values
+
+
+class _MappedBlob:
+    """Read-only sequence of byte strings stored as a blob plus offsets."""
+
+    def __init__(self, prefix: str):
+        self.offsets = np.load(f"{prefix}.offsets.npy", mmap_mode='r')
+        self._file = open(f"{prefix}.blob", 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> bytes:
+        return self._data[int(self.offsets[index]):int(self.offsets[index + 1])]
+
+    @staticmethod
+    def write(prefix: str, items: Iterator[bytes]) -> None:
+        """Write byte strings to ``prefix.blob`` and ``prefix.offsets.npy``."""
+        offsets = array('q', [0])
+        with open(f"{prefix}.blob", 'wb') as f:
+            for item in items:
+                f.write(item)
+                offsets.append(offsets[-1] + len(item))
+        np.save(f"{prefix}.offsets.npy", np.frombuffer(offsets, dtype=np.int64))
+
+
+class _StringTable:
+    """Interns strings to dense integer ids."""
+
+    def __init__(self):
+        self._values = []
+        self._index = {}
+        self._mapped = None
+        self._order = None
+
+    def __len__(self) -> int:
+        return len(self._mapped) if self._mapped is not None else len(self._values)
+
+    def get(self, index: int) -> str:
+        if self._mapped is not None:
+            return self._mapped[index].decode('utf-8')
+        return self._values[index]
+
+    def find(self, value: str) -> Optional[int]:
+        """Return the id of ``value``, or None if it was never interned."""
+        if self._mapped is None:
+            return self._index.get(value)
+        lo, hi = 0, len(self._order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            current = self.get(int(self._order[mid]))
+            if current == value:
+                return int(self._order[mid])
+            if current < value:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def intern(self, value: str) -> int:
+        """Return the id of ``value``, assigning a new one if needed."""
+        index = self.find(value)
+        if index is None:
+            self._materialize()
+            index = len(self._values)
+            self._values.append(value)
+            self._index[value] = index
+        return index
+
+    def sorted_ids(self) -> np.ndarray:
+        """Return ids ordered by their string value."""
+        if self._order is None:
+            self._order = np.array(sorted(range(len(self)), key=self.get), dtype=np.int64)
+        return self._order
+
+    def _materialize(self):
+        if self._mapped is not None:
+            self._values = [self.get(i) for i in range(len(self))]
+            self._index = {value: i for i, value in enumerate(self._values)}
+            self._mapped = None
+        self._order = None
+
+    def save(self, prefix: str) -> None:
+        _MappedBlob.write(prefix, (self.get(i).encode('utf-8') for i in range(len(self))))
+        np.save(f"{prefix}.order.npy", self.sorted_ids())
+
+    @classmethod
+    def load(cls, prefix: str) -> '_StringTable':
+        table = cls()
+        table._mapped = _MappedBlob(prefix)
+        table._order = np.load(f"{prefix}.order.npy", mmap_mode='r')
+        return table
+
+
+class _JsonColumn:
+    """Column of JSON values, decoded lazily when loaded from a snapshot."""
+
+    def __init__(self):
+        self._values = []
+        self._mapped = None
+
+    def __len__(self) -> int:
+        return len(self._mapped) if self._mapped is not None else len(self._values)
+
+    def get(self, index: int):
+        if index >= len(self):
+            return _MISSING
+        if self._mapped is not None:
+            raw = self._mapped[index]
+            return json.loads(raw) if raw else _MISSING
+        return self._values[index]
+
+    def set(self, index: int, value) -> None:
+        if self._mapped is not None:
+            self._values = [self.get(i) for i in range(len(self))]
+            self._mapped = None
+        if index >= len(self._values):
+            self._values.extend([_MISSING] * (index + 1 - len(self._values)))
+        self._values[index] = value
+
+    def save(self, prefix: str) -> None:
+        _MappedBlob.write(prefix, (
+            b'' if value is _MISSING else json.dumps(value, ensure_ascii=False).encode('utf-8')
+            for value in (self.get(i) for i in range(len(self)))
+        ))
+
+    @classmethod
+    def load(cls, prefix: str) -> '_JsonColumn':
+        column = cls()
+        column._mapped = _MappedBlob(prefix)
+        return column
+
+
+class _EdgeSet:
+    """Edges of one relationship type with lazily built CSR adjacency."""
+
+    def __init__(self):
+        self.sources = array('q')
+        self.targets = array('q')
+        self.properties = _JsonColumn()
+        self._pairs = None
+        self._csr = None
+
+    def __len__(self) -> int:
+        return len(self.sources)
+
+    def find(self, source: int, target: int) -> Optional[int]:
+        if self._pairs is None:
+            self._pairs = {pair: i for i, pair in enumerate(zip(self.sources, self.targets))}
+        return self._pairs.get((source, target))
+
+    def append(self, source: int, target: int, properties: Dict) -> None:
+        index = len(self.sources)
+        self.sources = _writable(self.sources, 'q')
+        self.targets = _writable(self.targets, 'q')
+        self.sources.append(source)
+        self.targets.append(target)
+        self.properties.set(index, properties)
+        if self._pairs is not None:
+            self._pairs.setdefault((source, target), index)
+        self._csr = None
+
+    def csr(self, num_nodes: int) -> Dict[str, np.ndarray]:
+        """
+        Return out- and in-adjacency in CSR form.
+
+        ``out_edges[out_indptr[n]:out_indptr[n + 1]]`` are the edge indices
+        leaving node ``n``; ``in_*`` is the same for incoming edges.
+        """
+        if self._csr is None or len(self._csr['out_indptr']) != num_nodes + 1:
+            sources = np.frombuffer(self.sources, dtype=np.int64)
+            targets = np.frombuffer(self.targets, dtype=np.int64)
+            # Built aside and published whole: concurrent readers never see a partial index
+            csr = {}
+            for direction, keys in (('out', sources), ('in', targets)):
+                order = np.argsort(keys, kind='stable')
+                counts = np.bincount(keys, minlength=num_nodes)
+                csr[f'{direction}_edges'] = order
+                csr[f'{direction}_indptr'] = np.concatenate(([0], np.cumsum(counts)))
+            self._csr = csr
+        return self._csr
+
+    def save(self, prefix: str, num_nodes: int) -> None:
+        np.save(f"{prefix}.sources.npy", np.frombuffer(self.sources, dtype=np.int64))
+        np.save(f"{prefix}.targets.npy", np.frombuffer(self.targets, dtype=np.int64))
+        for name, values in self.csr(num_nodes).items():
+            np.save(f"{prefix}.{name}.npy", values)
+        self.properties.save(f"{prefix}.properties")
+
+    @classmethod
+    def load(cls, prefix: str) -> '_EdgeSet':
+        edges = cls()
+        # Mapped read-only; copied into arrays by the first ``append``
+        edges.sources = np.load(f"{prefix}.sources.npy", mmap_mode='r')
+        edges.targets = np.load(f"{prefix}.targets.npy", mmap_mode='r')
+        edges.properties = _JsonColumn.load(f"{prefix}.properties")
+        edges._csr = {
+            name: np.load(f"{prefix}.{name}.npy", mmap_mode='r')
+            for name in ('out_edges', 'out_indptr', 'in_edges', 'in_indptr')
+        }
+        return edges
+
+
+class EmbeddedGraphBackend(GraphBackend):
+    """
+    In-process knowledge graph with array-backed storage.
+
+    Node ids are interned to dense integers, node properties are stored per
+    property in columns and every relationship type keeps its edges in arrays
+    with CSR adjacency built on demand. Snapshots are directories of ``.npy``
+    arrays and string blobs that are memory-mapped on load; a mapped array
+    is only copied into memory when a write changes it.
+    """
+
+    def __init__(self, snapshot_path: Optional[str] = None):
+        """
+        Initialize an empty graph or load one from a snapshot.
+
+        Args:
+            snapshot_path: Optional snapshot directory written by ``save``
+        """
+        self.clear_graph()
+        if snapshot_path:
+            self._load(snapshot_path)
+
+    def close(self):
+        """Nothing to release for the in-process backend."""
+
+    def create_constraints(self):
+        """Entity ids are unique by construction, so this is a no-op."""
+
+    def clear_graph(self):
+        """Clear all nodes and relationships from the graph."""
+        self._ids = _StringTable()
+        self._labels = _StringTable()
+        self._node_labels = array('i')
+        self._columns = {}
+        self._rel_types = _StringTable()
+        self._edges = []
+
+    def add_entity(self, entity: Dict, merge: bool = True) -> None:
+        """
+        Add entity to knowledge graph.
+
+        Args:
+            entity: Entity information including type and properties
+            merge: If True, merge with existing entity instead of creating new
+
+        Raises:
+            ValueError: If ``merge`` is False and the ID exists, as the
+                uniqueness constraint on entity IDs makes CREATE fail in Neo4j
+        """
+        if not merge and self._ids.find(entity['id']) is not None:
+            raise ValueError(f"Entity {entity['id']!r} already exists")
+        if 'timestamp' not in entity:
+            entity['timestamp'] = datetime.now().isoformat()
+
+        node = self._ids.intern(entity['id'])
+        if node == len(self._node_labels):
+            self._node_labels = _writable(self._node_labels, 'i')
+            self._node_labels.append(self._labels.intern(entity['type']))
+
+        for key, value in entity.items():
+            if key not in self._columns:
+                self._columns[key] = _JsonColumn()
+            self._columns[key].set(node, value)
+
+    def add_entities(self, entities: List[Dict], merge: bool = True) -> None:
+        """
+        Add a batch of entities.
+
+        Like a Neo4j transaction, a batch with an existing or repeated ID is
+        rejected as a whole when ``merge`` is False.
+
+        Args:
+            entities: Entities as accepted by ``add_entity``
+            merge: If True, merge with existing entities instead of creating new
+        """
+        if not merge:
+            seen = set()
+            for entity in entities:
+                if entity['id'] in seen or self._ids.find(entity['id']) is not None:
+                    raise ValueError(f"Entity {entity['id']!r} already exists")
+                seen.add(entity['id'])
+        for entity in entities:
+            self.add_entity(entity, merge)
+
+    def add_relationship(self, relationship: Dict, merge: bool = True) -> None:
+        """
+        Add relationship between entities.
+
+        Args:
+            relationship: Relationship information including source and target entities
+            merge: If True, merge with existing relationship instead of creating new
+        """
+        source = self._ids.find(relationship['source_id'])
+        target = self._ids.find(relationship['target_id'])
+        if source is None or target is None:
+            return
+
+        rel_type = self._rel_types.intern(relationship['type'])
+        if rel_type == len(self._edges):
+            self._edges.append(_EdgeSet())
+        edges = self._edges[rel_type]
+        properties = dict(relationship.get('properties', {}))
+
+        existing = edges.find(source, target) if merge else None
+        if existing is None:
+            edges.append(source, target, properties)
+        else:
+            edges.properties.set(existing, {**edges.properties.get(existing), **properties})
+
+    def get_entity(self, entity_id: str) -> Optional[Dict]:
+        """
+        Retrieve entity by ID.
+
+        Args:
+            entity_id: Unique identifier of the entity
+
+        Returns:
+            Entity data if found, None otherwise
+        """
+        node = self._ids.find(entity_id)
+        return self._node_properties(node) if node is not None else None
+
+    def get_entities(self, entity_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Retrieve several entities by ID.
+
+        Args:
+            entity_ids: Unique identifiers of the entities
+
+        Returns:
+            Mapping of entity ID to entity data for every ID that was found
+        """
+        entities = {}
+        for entity_id in entity_ids:
+            entity = self.get_entity(entity_id)
+            if entity is not None:
+                entities[entity_id] = entity
+        return entities
+
+    def get_relationships(self, entity_id: str, rel_type: Optional[str] = None) -> List[Dict]:
+        """
+        Get all relationships for an entity.
+
+        Args:
+            entity_id: Entity ID to get relationships for
+            rel_type: Optional relationship type to filter by
+
+        Returns:
+            List of relationship dictionaries
+        """
+        node = self._ids.find(entity_id)
+        if node is None:
+            return []
+        return [self._edge_dict(type_index, edge)
+                for type_index, edge, _ in self._incident_edges(node, [rel_type] if rel_type else None)]
+
+    def get_neighborhood(self, entity_id: str, depth: int = 1,
+                         rel_types: Optional[List[str]] = None,
+                         limit_per_hop: int = 100) -> Optional[Dict]:
+        """
+        Retrieve the k-hop neighborhood of an entity.
+
+        Follows the same rules as the Neo4j backend: each hop expands the
+        frontier in both directions and keeps at most ``limit_per_hop``
+        relationships.
+
+        Args:
+            entity_id: ID of the entity at the center of the neighborhood
+            depth: Number of hops to expand
+            rel_types: Optional relationship types to follow
+            limit_per_hop: Maximum number of relationships fetched per hop
+
+        Returns:
+            Adjacency-list neighborhood (see ``neighborhood_result``), or None
+            if the entity does not exist
+        """
+        if depth < 0:
+            raise ValueError("depth must be non-negative")
+        root = self._ids.find(entity_id)
+        if root is None:
+            return None
+
+        nodes, frontier, edges = [root], [root], []
+        seen_nodes, seen_edges = {root}, set()
+        for _ in range(depth):
+            hop = self._expand(frontier, rel_types, limit_per_hop)
+            frontier = []
+            for type_index, edge, neighbor in hop:
+                if (type_index, edge) not in seen_edges:
+                    seen_edges.add((type_index, edge))
+                    edges.append(self._edge_dict(type_index, edge))
+                if neighbor not in seen_nodes:
+                    seen_nodes.add(neighbor)
+                    nodes.append(neighbor)
+                    frontier.append(neighbor)
+
+        return neighborhood_result(entity_id, [self._node_properties(n) for n in nodes], edges)
+
+    def iter_entities(self, label: Optional[str] = None, properties: Dict = None,
+                      fields: Optional[List[str]] = None, fetch_size: Optional[int] = None,
+                      page_size: int = 10000, after_id: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Stream entities matching given criteria in ID order.
+
+        ``fetch_size`` and ``page_size`` are accepted for API compatibility;
+        results are produced one at a time without materializing the matches.
+
+        Args:
+            label: Optional entity type to filter by
+            properties: Optional property values to match
+            fields: Optional property names to return instead of the full entity
+            fetch_size: Unused
+            page_size: Unused
+            after_id: Only return entities with an ID greater than this cursor
+
+        Yields:
+            Matching entities, projected to ``fields`` if given
+        """
+        label_index = self._labels.find(label) if label else None
+        if label and label_index is None:
+            return
+
+        order = self._ids.sorted_ids()
+        start = 0
+        if after_id is not None:
+            start = bisect_right(_SortedView(self._ids, order), after_id)
+
+        filters = [(self._columns.get(key), value) for key, value in (properties or {}).items()]
+        for node in order[start:]:
+            node = int(node)
+            if label_index is not None and self._node_labels[node] != label_index:
+                continue
+            if all(column is not None and column.get(node) == value for column, value in filters):
+                yield self._node_properties(node, fields)
+
+    def search_entities_page(self, label: Optional[str] = None, properties: Dict = None,
+                             fields: Optional[List[str]] = None, limit: int = 100,
+                             after_id: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Fetch one page of matching entities using a cursor on entity ID.
+
+        Args:
+            label: Optional entity type to filter by
+            properties: Optional property values to match
+            fields: Optional property names to return instead of the full entity
+            limit: Maximum number of entities to return
+            after_id: Cursor returned by the previous page, None for the first page
+
+        Returns:
+            Tuple of the entities and the cursor for the next page
+        """
+        entities = []
+        for entity in self.iter_entities(label, properties, fields, after_id=after_id):
+            entities.append(entity)
+            if len(entities) == limit:
+                break
+        next_cursor = entities[-1]['id'] if len(entities) == limit else None
+        return entities, next_cursor
+
+    def save(self, path: str) -> None:
+        """
+        Write a snapshot of the graph to a directory.
+
+        The snapshot is written next to ``path`` and swapped in afterwards, so
+        a graph loaded from ``path`` can be saved back to it.
+
+        Args:
+            path: Snapshot directory, replaced if it exists
+        """
+        staging = f"{path}.tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+
+        columns = sorted(self._columns)
+        self._ids.save(os.path.join(staging, 'ids'))
+        self._labels.save(os.path.join(staging, 'labels'))
+        self._rel_types.save(os.path.join(staging, 'rel_types'))
+        np.save(os.path.join(staging, 'node_labels.npy'), np.frombuffer(self._node_labels, dtype=np.int32))
+        for i, key in enumerate(columns):
+            self._columns[key].save(os.path.join(staging, f'column_{i}'))
+        for i, edges in enumerate(self._edges):
+            edges.save(os.path.join(staging, f'rel_{i}'), len(self._ids))
+        with open(os.path.join(staging, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({'version': SNAPSHOT_VERSION, 'columns': columns}, f, ensure_ascii=False)
+
+        if os.path.exists(path):
+            retired = f"{path}.old"
+            shutil.rmtree(retired, ignore_errors=True)
+            os.rename(path, retired)
+            os.rename(staging, path)
+            shutil.rmtree(retired)
+        else:
+            os.rename(staging, path)
+
+    def _load(self, path: str) -> None:
+        with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta['version'] != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version: {meta['version']}")
+
+        self._ids = _StringTable.load(os.path.join(path, 'ids'))
+        self._labels = _StringTable.load(os.path.join(path, 'labels'))
+        self._rel_types = _StringTable.load(os.path.join(path, 'rel_types'))
+        self._node_labels = np.load(os.path.join(path, 'node_labels.npy'), mmap_mode='r')
+        self._columns = {
+            key: _JsonColumn.load(os.path.join(path, f'column_{i}'))
+            for i, key in enumerate(meta['columns'])
+        }
+        self._edges = [_EdgeSet.load(os.path.join(path, f'rel_{i}')) for i in range(len(self._rel_types))]
+
+    def _node_properties(self, node: int, fields: Optional[List[str]] = None) -> Dict:
+        keys = ['id'] + [field for field in fields if field != 'id'] if fields else self._columns
+        properties = {}
+        for key in keys:
+            value = self._columns[key].get(node) if key in self._columns else _MISSING
+            if value is not _MISSING:
+                properties[key] = value
+            elif fields:
+                properties[key] = None
+        return properties
+
+    def _edge_dict(self, type_index: int, edge: int) -> Dict:
+        edges = self._edges[type_index]
+        return {
+            'type': self._rel_types.get(type_index),
+            'properties': dict(edges.properties.get(edge)),
+            'source_id': self._ids.get(edges.sources[edge]),
+            'target_id': self._ids.get(edges.targets[edge])
+        }
+
+    def _type_indices(self, rel_types: Optional[List[str]]) -> List[int]:
+        if not rel_types:
+            return list(range(len(self._edges)))
+        indices = (self._rel_types.find(rel_type) for rel_type in rel_types)
+        return [index for index in indices if index is not None]
+
+    def _incident_edges(self, node: int, rel_types: Optional[List[str]]) -> Iterator[Tuple[int, int, int]]:
+        """Yield ``(type index, edge index, neighbor)`` for edges touching ``node``."""
+        num_nodes = len(self._ids)
+        for type_index in self._type_indices(rel_types):
+            edges = self._edges[type_index]
+            csr = edges.csr(num_nodes)
+            for edge in csr['out_edges'][csr['out_indptr'][node]:csr['out_indptr'][node + 1]]:
+                yield type_index, int(edge), edges.targets[edge]
+            for edge in csr['in_edges'][csr['in_indptr'][node]:csr['in_indptr'][node + 1]]:
+                if edges.sources[edge] != node:  # self-loops were already yielded
+                    yield type_index, int(edge), edges.sources[edge]
+
+    def _expand(self, frontier: List[int], rel_types: Optional[List[str]],
+                limit: int) -> List[Tuple[int, int, int]]:
+        """Collect up to ``limit`` distinct relationships around the frontier."""
+        hop, seen = [], set()
+        for node in frontier:
+            for type_index, edge, neighbor in self._incident_edges(node, rel_types):
+                if (type_index, edge, neighbor) in seen:
+                    continue
+                if len(hop) == limit:
+                    return hop
+                seen.add((type_index, edge, neighbor))
+                hop.append((type_index, edge, neighbor))
+        return hop
+
+
+class _SortedView:
+    """Sequence view of interned strings in sorted order, for ``bisect``."""
+
+    def __init__(self, table: _StringTable, order: np.ndarray):
+        self._table = table
+        self._order = order
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __getitem__(self, index: int) -> str:
+        return self._table.get(int(self._order[index]))
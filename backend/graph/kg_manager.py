@@ -1,11 +1,13 @@
-from typing import Dict, List, Optional, Union
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 from neo4j import GraphDatabase
 from datetime import datetime
+from graph.backend import GraphBackend, neighborhood_result
 
-class KnowledgeGraphManager:
-    """Manages operations on the Knowledge Graph."""
+class KnowledgeGraphManager(GraphBackend):
+    """Manages operations on the Knowledge Graph stored in Neo4j."""
     
-    def __init__(self, uri: str, user: str, password: str):
+    def __init__(self, uri: str, user: str, password: str,
+                 max_connection_pool_size: int = 100, fetch_size: int = 1000):
         """
         Initialize connection to Neo4j database.
         
@@ -13,8 +15,37 @@ class KnowledgeGraphManager:
             uri: Neo4j database URI
             user: Database username
             password: Database password
+            max_connection_pool_size: Maximum number of pooled connections
+            fetch_size: Default number of records fetched per round-trip
         """
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = GraphDatabase.driver(
+            uri,
+            auth=(user, password),
+            max_connection_pool_size=max_connection_pool_size,
+            fetch_size=fetch_size
+        )
+        self.max_connection_pool_size = max_connection_pool_size
+        self.fetch_size = fetch_size
+        
+    @classmethod
+    def from_config(cls, config: Dict) -> 'KnowledgeGraphManager':
+        """
+        Create a manager from the ``database`` section of ``load_config``.
+        
+        Args:
+            config: Configuration dictionary
+            
+        Returns:
+            Connected KnowledgeGraphManager
+        """
+        database = config['database']
+        return cls(
+            uri=database['uri'],
+            user=database['username'],
+            password=database['password'],
+            max_connection_pool_size=database.get('max_connection_pool_size', 100),
+            fetch_size=database.get('fetch_size', 1000)
+        )
         
     def close(self):
         """Close the database connection."""
@@ -23,22 +54,13 @@ class KnowledgeGraphManager:
     def create_constraints(self):
         """Create necessary constraints for the knowledge graph."""
         with self.driver.session() as session:
-            # Create constraints for unique IDs
-            constraints = [
-                "CREATE CONSTRAINT IF NOT EXISTS FOR (n:Entity) REQUIRE n.id IS UNIQUE",
-                "CREATE CONSTRAINT IF NOT EXISTS FOR (n:Article) REQUIRE n.id IS UNIQUE",
-                "CREATE CONSTRAINT IF NOT EXISTS FOR (n:Section) REQUIRE n.id IS UNIQUE",
-                "CREATE CONSTRAINT IF NOT EXISTS FOR (n:Reference) REQUIRE n.id IS UNIQUE",
-                "CREATE CONSTRAINT IF NOT EXISTS FOR (n:Category) REQUIRE n.id IS UNIQUE"
-            ]
-            
-            for constraint in constraints:
+            for constraint in CONSTRAINT_QUERIES:
                 session.run(constraint)
                 
     def clear_graph(self):
         """Clear all nodes and relationships from the graph."""
         with self.driver.session() as session:
-            session.run("MATCH (n) DETACH DELETE n")
+            session.run(CLEAR_QUERY)
             
     def add_entity(self, entity: Dict, merge: bool = True) -> None:
         """
@@ -49,53 +71,43 @@ class KnowledgeGraphManager:
             merge: If True, merge with existing entity instead of creating new
         """
         with self.driver.session() as session:
-            # Add timestamp if not present
-            if 'timestamp' not in entity:
-                entity['timestamp'] = datetime.now().isoformat()
-                
-            if merge:
-                query = """
-                MERGE (e:{label} {{id: $id}})
-                SET e += $properties
-                """.format(label=entity['type'])
-            else:
-                query = """
-                CREATE (e:{label})
-                SET e = $properties
-                """.format(label=entity['type'])
-                
-            session.run(query, id=entity['id'], properties=entity)
+            session.run(_entity_query(entity, merge), id=entity['id'], properties=entity)
             
     def add_relationship(self, relationship: Dict, merge: bool = True) -> None:
         """
         Add relationship between entities.
         
+        Endpoints are matched as ``Entity`` nodes unless the relationship
+        names their labels in ``source_label`` and ``target_label``.
+        
         Args:
             relationship: Relationship information including source and target entities
             merge: If True, merge with existing relationship instead of creating new
         """
+        self.add_relationships([relationship], merge)
+        
+    def add_entities(self, entities: List[Dict], merge: bool = True) -> None:
+        """
+        Add a batch of entities in one transaction, one query per label.
+        
+        Args:
+            entities: Entities as accepted by ``add_entity``
+            merge: If True, merge with existing entities instead of creating new
+        """
         with self.driver.session() as session:
-            if merge:
-                query = """
-                MATCH (source {id: $source_id})
-                MATCH (target {id: $target_id})
-                MERGE (source)-[r:$rel_type]->(target)
-                SET r += $properties
-                """
-            else:
-                query = """
-                MATCH (source {id: $source_id})
-                MATCH (target {id: $target_id})
-                CREATE (source)-[r:$rel_type]->(target)
-                SET r = $properties
-                """
-                
-            session.run(query, 
-                       source_id=relationship['source_id'],
-                       target_id=relationship['target_id'],
-                       rel_type=relationship['type'],
-                       properties=relationship.get('properties', {}))
-                       
+            session.execute_write(run_batches, entity_batch_queries(entities, merge))
+            
+    def add_relationships(self, relationships: List[Dict], merge: bool = True) -> None:
+        """
+        Add a batch of relationships in one transaction, one query per type.
+        
+        Args:
+            relationships: Relationships as accepted by ``add_relationship``
+            merge: If True, merge with existing relationships instead of creating new
+        """
+        with self.driver.session() as session:
+            session.execute_write(run_batches, relationship_batch_queries(relationships, merge))
+            
     def get_entity(self, entity_id: str) -> Optional[Dict]:
         """
         Retrieve entity by ID.
@@ -107,13 +119,28 @@ class KnowledgeGraphManager:
             Entity data if found, None otherwise
         """
         with self.driver.session() as session:
-            result = session.run(
-                "MATCH (e {id: $id}) RETURN e",
-                id=entity_id
-            )
+            result = session.run(GET_ENTITY_QUERY, id=entity_id)
             record = result.single()
             return dict(record['e']) if record else None
             
+    def get_entities(self, entity_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Retrieve several entities by ID in a single query.
+        
+        Args:
+            entity_ids: Unique identifiers of the entities
+            
+        Returns:
+            Mapping of entity ID to entity data for every ID that was found
+        """
+        ids = list(dict.fromkeys(entity_ids))
+        if not ids:
+            return {}
+            
+        with self.driver.session() as session:
+            results = session.run(GET_ENTITIES_QUERY, ids=ids)
+            return {record['e']['id']: dict(record['e']) for record in results}
+            
     def get_relationships(self, entity_id: str, rel_type: Optional[str] = None) -> List[Dict]:
         """
         Get all relationships for an entity.
@@ -126,60 +153,299 @@ class KnowledgeGraphManager:
             List of relationship dictionaries
         """
         with self.driver.session() as session:
-            query = """
-            MATCH (e {id: $id})-[r{}]->(target)
-            RETURN type(r) as type, r as props, target.id as target_id
-            UNION
-            MATCH (source)-[r{}]->(e {id: $id})
-            RETURN type(r) as type, r as props, source.id as source_id
-            """.format(
-                f":{rel_type}" if rel_type else "",
-                f":{rel_type}" if rel_type else ""
-            )
-            
-            results = session.run(query, id=entity_id)
-            relationships = []
-            
-            for record in results:
-                rel = {
-                    'type': record['type'],
-                    'properties': dict(record['props']),
-                }
-                if 'source_id' in record:
-                    rel['source_id'] = record['source_id']
-                    rel['target_id'] = entity_id
-                else:
-                    rel['source_id'] = entity_id
-                    rel['target_id'] = record['target_id']
-                relationships.append(rel)
-                
-            return relationships
+            results = session.run(_relationships_query(rel_type), id=entity_id)
+            return [_relationship_record(record) for record in results]
+            
+    def get_neighborhood(self, entity_id: str, depth: int = 1,
+                         rel_types: Optional[List[str]] = None,
+                         limit_per_hop: int = 100) -> Optional[Dict]:
+        """
+        Retrieve the k-hop neighborhood of an entity in a single query.
+        
+        Every hop expands the current frontier in both directions and keeps at
+        most ``limit_per_hop`` relationships, so expanding a hub costs one
+        round-trip regardless of its degree.
+        
+        Args:
+            entity_id: ID of the entity at the center of the neighborhood
+            depth: Number of hops to expand
+            rel_types: Optional relationship types to follow
+            limit_per_hop: Maximum number of relationships fetched per hop
+            
+        Returns:
+            Adjacency-list neighborhood (see ``neighborhood_result``), or None if
+            the entity does not exist
+        """
+        if depth < 0:
+            raise ValueError("depth must be non-negative")
+            
+        with self.driver.session() as session:
+            record = session.run(
+                _neighborhood_query(depth, rel_types),
+                id=entity_id,
+                limit_per_hop=limit_per_hop
+            ).single()
+            if not record:
+                return None
+            return neighborhood_result(entity_id, record['nodes'], record['edges'])
             
-    def search_entities(self, label: Optional[str] = None, properties: Dict = None) -> List[Dict]:
+    def iter_entities(self, label: Optional[str] = None, properties: Dict = None,
+                      fields: Optional[List[str]] = None, fetch_size: Optional[int] = None,
+                      page_size: int = 10000, after_id: Optional[str] = None) -> Iterator[Dict]:
         """
-        Search for entities matching given criteria.
+        Stream entities matching given criteria in ID order.
+        
+        Results are read in keyset-paginated pages of ``page_size``, each
+        pulled from the server ``fetch_size`` records at a time. A page is
+        read completely before its entities are yielded, so no connection is
+        held while the caller processes them; memory is bounded by
+        ``page_size``. Nodes without an ``id`` cannot be paginated and are
+        skipped.
         
         Args:
             label: Optional entity type to filter by
             properties: Optional property values to match
+            fields: Optional property names to return instead of the full entity
+            fetch_size: Number of records fetched per network round-trip,
+                defaults to the manager's ``fetch_size``
+            page_size: Maximum number of records per query
+            after_id: Only return entities with an ID greater than this cursor
+            
+        Yields:
+            Matching entities, projected to ``fields`` if given
+        """
+        while True:
+            query, params = _search_query(label, properties, fields, after_id)
+            # Read the page before yielding so a slow consumer does not pin a pooled connection
+            with self.driver.session(fetch_size=fetch_size or self.fetch_size) as session:
+                entities = [dict(record['e']) for record in session.run(query, limit=page_size, **params)]
+            yield from entities
+            if len(entities) < page_size:
+                return
+            after_id = entities[-1]['id']
+                
+    def search_entities_page(self, label: Optional[str] = None, properties: Dict = None,
+                             fields: Optional[List[str]] = None, limit: int = 100,
+                             after_id: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Fetch one page of matching entities using a cursor on entity ID.
+        
+        Args:
+            label: Optional entity type to filter by
+            properties: Optional property values to match
+            fields: Optional property names to return instead of the full entity
+            limit: Maximum number of entities to return
+            after_id: Cursor returned by the previous page, None for the first page
             
         Returns:
-            List of matching entities
+            Tuple of the entities and the cursor for the next page (None when
+            there are no more results)
         """
         with self.driver.session() as session:
-            where_clauses = []
-            params = {}
-            
-            if properties:
-                for key, value in properties.items():
-                    where_clauses.append(f"e.{key} = ${key}")
-                    params[key] = value
-                    
+            query, params = _search_query(label, properties, fields, after_id)
+            entities = [dict(record['e']) for record in session.run(query, limit=limit, **params)]
+        next_cursor = entities[-1]['id'] if len(entities) == limit else None
+        return entities, next_cursor
+
+CONSTRAINT_QUERIES = [
+    "CREATE CONSTRAINT IF NOT EXISTS FOR (n:{}) REQUIRE n.id IS UNIQUE".format(label)
+    for label in ('Entity', 'Article', 'Section', 'Reference', 'Category')
+]
+
+CLEAR_QUERY = "MATCH (n) DETACH DELETE n"
+
+GET_ENTITY_QUERY = "MATCH (e {id: $id}) RETURN e"
+
+GET_ENTITIES_QUERY = "UNWIND $ids AS id MATCH (e {id: id}) RETURN e"
+
+
+def _entity_query(entity: Dict, merge: bool) -> str:
+    """Build the single-entity write query, adding a timestamp to ``entity`` if missing."""
+    if 'timestamp' not in entity:
+        entity['timestamp'] = datetime.now().isoformat()
+        
+    if merge:
+        return """
+        MERGE (e:{label} {{id: $id}})
+        SET e += $properties
+        """.format(label=entity['type'])
+    return """
+    CREATE (e:{label})
+    SET e = $properties
+    """.format(label=entity['type'])
+
+
+def _relationships_query(rel_type: Optional[str]) -> str:
+    """Build the query returning every relationship of the entity ``$id``."""
+    return """
+    MATCH (e {{id: $id}})-[r{}]-()
+    WITH DISTINCT r
+    RETURN type(r) AS type, properties(r) AS properties,
+           startNode(r).id AS source_id, endNode(r).id AS target_id
+    """.format(_rel_type_filter([rel_type] if rel_type else None))
+
+
+def _relationship_record(record) -> Dict:
+    """Convert a record of ``_relationships_query`` to a relationship dictionary."""
+    return {
+        'type': record['type'],
+        'properties': dict(record['properties']),
+        'source_id': record['source_id'],
+        'target_id': record['target_id']
+    }
+
+
+def _rel_type_filter(rel_types: Optional[List[str]]) -> str:
+    """Build a relationship type filter such as ``:`A`|`B``` for a pattern."""
+    if not rel_types:
+        return ""
+    return ":" + "|".join(_quote(t) for t in rel_types)
+
+
+def entity_batch_queries(entities: List[Dict], merge: bool = True) -> List[Tuple[str, List[Dict]]]:
+    """
+    Group entities by label into UNWIND write queries.
+    
+    Args:
+        entities: Entities as accepted by ``KnowledgeGraphManager.add_entity``
+        merge: If True, merge with existing entities instead of creating new
+        
+    Returns:
+        List of ``(query, batch)`` pairs, each run with a ``$batch`` parameter
+    """
+    by_label = {}
+    for entity in entities:
+        if 'timestamp' not in entity:
+            entity['timestamp'] = datetime.now().isoformat()
+        by_label.setdefault(entity['type'], []).append(entity)
+        
+    queries = []
+    for label, batch in by_label.items():
+        if merge:
             query = f"""
-            MATCH (e{f':{label}' if label else ''})
-            {f'WHERE ' + ' AND '.join(where_clauses) if where_clauses else ''}
-            RETURN e
+            UNWIND $batch AS entity
+            MERGE (e:{_quote(label)} {{id: entity.id}})
+            SET e += entity
             """
-            
-            results = session.run(query, **params)
-            return [dict(record['e']) for record in results] 
\ No newline at end of file
+        else:
+            query = f"""
+            UNWIND $batch AS entity
+            CREATE (e:{_quote(label)})
+            SET e = entity
+            """
+        queries.append((query, batch))
+    return queries
+
+
+def relationship_batch_queries(relationships: List[Dict], merge: bool = True) -> List[Tuple[str, List[Dict]]]:
+    """
+    Group relationships by type and endpoint labels into UNWIND write queries.
+    
+    Endpoints are matched on their label (``source_label``/``target_label``,
+    default ``Entity``) so each row is an index seek on the label's unique
+    ``id`` constraint instead of a scan over all nodes.
+    
+    Args:
+        relationships: Relationships as accepted by ``KnowledgeGraphManager.add_relationship``
+        merge: If True, merge with existing relationships instead of creating new
+        
+    Returns:
+        List of ``(query, batch)`` pairs, each run with a ``$batch`` parameter
+    """
+    groups = {}
+    for relationship in relationships:
+        key = (relationship['type'], relationship.get('source_label', 'Entity'),
+               relationship.get('target_label', 'Entity'))
+        groups.setdefault(key, []).append({
+            'source_id': relationship['source_id'],
+            'target_id': relationship['target_id'],
+            'properties': relationship.get('properties', {})
+        })
+        
+    return [(f"""
+            UNWIND $batch AS rel
+            MATCH (source:{_quote(source_label)} {{id: rel.source_id}})
+            MATCH (target:{_quote(target_label)} {{id: rel.target_id}})
+            {'MERGE' if merge else 'CREATE'} (source)-[r:{_quote(rel_type)}]->(target)
+            SET r {'+=' if merge else '='} rel.properties
+            """, batch) for (rel_type, source_label, target_label), batch in groups.items()]
+
+
+def run_batches(tx, queries: List[Tuple[str, List[Dict]]]) -> None:
+    """Run ``(query, batch)`` pairs inside a transaction."""
+    for query, batch in queries:
+        tx.run(query, batch=batch)
+
+
+def _search_query(label: Optional[str], properties: Optional[Dict],
+                  fields: Optional[List[str]], after_id: Optional[str]) -> Tuple[str, Dict]:
+    """
+    Build a keyset-paginated entity search query.
+    
+    Returns:
+        Tuple of the Cypher query (expecting a ``$limit`` parameter) and its
+        remaining parameters
+    """
+    # Keyset pagination needs an ID on every row
+    where_clauses = ["e.id IS NOT NULL"]
+    params = {}
+    
+    for i, (key, value) in enumerate((properties or {}).items()):
+        where_clauses.append(f"e.{_quote(key)} = $p{i}")
+        params[f"p{i}"] = value
+        
+    if after_id is not None:
+        where_clauses.append("e.id > $after_id")
+        params['after_id'] = after_id
+        
+    if fields:
+        keys = ['id'] + [field for field in fields if field != 'id']
+        projection = "e {" + ", ".join(f".{_quote(key)}" for key in keys) + "}"
+    else:
+        projection = "e"
+        
+    query = f"""
+    MATCH (e{f':{_quote(label)}' if label else ''})
+    WHERE {' AND '.join(where_clauses)}
+    WITH e ORDER BY e.id LIMIT $limit
+    RETURN {projection} AS e
+    """
+    return query, params
+
+
+def _quote(name: str) -> str:
+    """Quote a label, type or property name for safe use in Cypher."""
+    return "`{}`".format(name.replace("`", "``"))
+
+
+def _neighborhood_query(depth: int, rel_types: Optional[List[str]] = None) -> str:
+    """
+    Build a Cypher query expanding ``depth`` hops around a node.
+    
+    Each hop is a subquery over the previous frontier capped at
+    ``$limit_per_hop`` relationships; nodes and relationships already
+    collected are not returned twice.
+    """
+    hop = """
+    CALL {{
+        WITH frontier
+        UNWIND frontier AS f
+        MATCH (f)-[r{types}]-(n)
+        WITH DISTINCT r, n
+        LIMIT $limit_per_hop
+        RETURN collect(r) AS hop_rels, collect(DISTINCT n) AS hop_nodes
+    }}
+    WITH nodes + [n IN hop_nodes WHERE NOT n IN nodes] AS nodes,
+         [n IN hop_nodes WHERE NOT n IN nodes] AS frontier,
+         rels + [r IN hop_rels WHERE NOT r IN rels] AS rels
+    """.format(types=_rel_type_filter(rel_types))
+    
+    return """
+    MATCH (root {id: $id})
+    WITH [root] AS nodes, [root] AS frontier, [] AS rels
+    """ + hop * depth + """
+    RETURN [n IN nodes | n {.*}] AS nodes,
+           [r IN rels | {type: type(r), properties: properties(r),
+                         source_id: startNode(r).id, target_id: endNode(r).id}] AS edges
+    """
+
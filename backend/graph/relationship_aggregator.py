@@ -0,0 +1,259 @@
+import argparse
+import json
+from array import array
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from graph.backend import GraphBackend
+
+STATE_FIELDS = ('source', 'target', 'type', 'count', 'articles', 'score_sum', 'score_max')
+
+
+class RelationshipAggregator:
+    """
+    Aggregates relationship occurrences into one weighted edge per (source, target, type).
+
+    Entity IDs and relationship types are interned to integers and every
+    occurrence is appended to flat COO buffers. When the buffers grow past
+    ``compact_every`` they are reduced to one row per distinct edge by a
+    lexsort and segmented reductions, so memory is bounded by the number of
+    distinct edges, not occurrences. ``flush`` writes each distinct edge
+    once, with its count, the number of articles it was found in, mean and
+    max score, and PMI.
+    """
+
+    def __init__(self, backend: Optional[GraphBackend] = None, compact_every: int = 1000000,
+                 min_count: int = 1, batch_size: int = 5000):
+        """
+        Args:
+            backend: Graph backend (or writer with ``add_relationships``) for ``flush``
+            compact_every: Buffered occurrences that trigger a compaction
+            min_count: Edges seen fewer times are not written
+            batch_size: Relationships per ``add_relationships`` call
+        """
+        self.backend = backend
+        self.compact_every = compact_every
+        self.min_count = min_count
+        self.batch_size = batch_size
+
+        self.entity_ids: Dict[str, int] = {}
+        self.entity_names: List[str] = []
+        self.type_ids: Dict[str, int] = {}
+        self.type_names: List[str] = []
+
+        self._source, self._target, self._type = array('q'), array('q'), array('q')
+        self._score, self._first = array('d'), array('q')
+        self.state = _empty_state()
+        self.occurrences = 0
+
+    def __len__(self) -> int:
+        """Number of distinct edges (compacts pending occurrences)."""
+        self.compact()
+        return len(self.state['count'])
+
+    def _intern(self, name: str, ids: Dict[str, int], names: List[str]) -> int:
+        index = ids.get(name)
+        if index is None:
+            index = ids[name] = len(names)
+            names.append(name)
+        return index
+
+    def add(self, relationships: List[Dict]) -> None:
+        """
+        Record the relationships extracted from one article.
+
+        Args:
+            relationships: Relationships as accepted by
+                ``GraphBackend.add_relationships``; ``properties.score`` is
+                aggregated if present. Each distinct edge counts once
+                towards ``articles`` per call.
+        """
+        seen = set()
+        for relationship in relationships:
+            source = self._intern(relationship['source_id'], self.entity_ids, self.entity_names)
+            target = self._intern(relationship['target_id'], self.entity_ids, self.entity_names)
+            rel_type = self._intern(relationship['type'], self.type_ids, self.type_names)
+            key = (source, target, rel_type)
+            self._source.append(source)
+            self._target.append(target)
+            self._type.append(rel_type)
+            self._score.append(float(relationship.get('properties', {}).get('score', 0.0)))
+            self._first.append(key not in seen)
+            seen.add(key)
+        self.occurrences += len(relationships)
+        if len(self._source) >= self.compact_every:
+            self.compact()
+
+    def compact(self) -> None:
+        """Reduce the buffered occurrences and the current state to one row per distinct edge."""
+        if not len(self._source):
+            return
+        score = np.frombuffer(self._score, dtype=np.float64)
+        pending = {
+            'source': np.frombuffer(self._source, dtype=np.int64),
+            'target': np.frombuffer(self._target, dtype=np.int64),
+            'type': np.frombuffer(self._type, dtype=np.int64),
+            'count': np.ones(len(score), dtype=np.int64),
+            'articles': np.frombuffer(self._first, dtype=np.int64),
+            'score_sum': score,
+            'score_max': score
+        }
+        self.state = _reduce({name: np.concatenate((self.state[name], pending[name])) for name in STATE_FIELDS})
+        self._source, self._target, self._type = array('q'), array('q'), array('q')
+        self._score, self._first = array('d'), array('q')
+
+    def weights(self) -> Dict[str, np.ndarray]:
+        """
+        Aggregated edge arrays: the state plus ``score_mean`` and ``pmi``.
+
+        PMI is ``log(p(x, y) / (p(x) p(y)))`` with ``p(x, y)`` the share of
+        all occurrences on the edge and ``p(x)`` the share of edge ends at
+        entity ``x``, over everything aggregated so far.
+        """
+        self.compact()
+        state = self.state
+        counts = state['count'].astype(np.float64)
+        total = counts.sum()
+        ends = np.bincount(state['source'], weights=counts, minlength=len(self.entity_names)) + \
+            np.bincount(state['target'], weights=counts, minlength=len(self.entity_names))
+        pmi = np.log(counts * 4 * total / (ends[state['source']] * ends[state['target']]))
+        return dict(state, score_mean=state['score_sum'] / np.maximum(counts, 1), pmi=pmi)
+
+    def edges(self) -> Iterator[Dict]:
+        """Yield one relationship per distinct edge seen at least ``min_count`` times."""
+        weights = self.weights()
+        for row in np.flatnonzero(weights['count'] >= self.min_count):
+            yield {
+                'source_id': self.entity_names[weights['source'][row]],
+                'target_id': self.entity_names[weights['target'][row]],
+                'type': self.type_names[weights['type'][row]],
+                'properties': {
+                    'score': float(weights['score_mean'][row]),
+                    'score_max': float(weights['score_max'][row]),
+                    'count': int(weights['count'][row]),
+                    'articles': int(weights['articles'][row]),
+                    'pmi': float(weights['pmi'][row])
+                }
+            }
+
+    def flush(self) -> int:
+        """
+        Write every aggregated edge to the backend once and reset.
+
+        Edges are written with MERGE and overwrite earlier weights, so flush
+        once per run (or merge the saved states of several workers first).
+
+        Returns:
+            Number of relationships written
+        """
+        written = 0
+        batch = []
+        for edge in self.edges():
+            batch.append(edge)
+            if len(batch) >= self.batch_size:
+                self.backend.add_relationships(batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            self.backend.add_relationships(batch)
+            written += len(batch)
+        self.report(written)
+        self.state = _empty_state()
+        self.occurrences = 0
+        return written
+
+    def report(self, written: Optional[int] = None) -> None:
+        """Print how many occurrences were folded into how many edges."""
+        edges = len(self)
+        message = f"Relationship aggregation: {self.occurrences} occurrences -> {edges} distinct edges"
+        if self.occurrences and edges:
+            message += f" ({self.occurrences / edges:.1f}x fewer writes)"
+        if written is not None:
+            message += f", {written} written"
+        print(message)
+
+    def save(self, path: str) -> None:
+        """Save the aggregated state (with the interned names) to an .npz file."""
+        self.compact()
+        np.savez(path, names=np.array(json.dumps({'entities': self.entity_names, 'types': self.type_names})),
+                 occurrences=np.array(self.occurrences), **self.state)
+
+    def merge_file(self, path: str) -> None:
+        """Add a state saved by ``save``, e.g. by another worker."""
+        self.compact()
+        with np.load(path) as data:
+            names = json.loads(str(data['names']))
+            entity_map = np.array([self._intern(name, self.entity_ids, self.entity_names)
+                                   for name in names['entities']], dtype=np.int64)
+            type_map = np.array([self._intern(name, self.type_ids, self.type_names)
+                                 for name in names['types']], dtype=np.int64)
+            other = {name: data[name] for name in STATE_FIELDS}
+            self.occurrences += int(data['occurrences'])
+        if len(other['count']):
+            other['source'] = entity_map[other['source']]
+            other['target'] = entity_map[other['target']]
+            other['type'] = type_map[other['type']]
+        self.state = _reduce({name: np.concatenate((self.state[name], other[name])) for name in STATE_FIELDS})
+
+
+def _empty_state() -> Dict[str, np.ndarray]:
+    state = {name: np.zeros(0, dtype=np.int64) for name in STATE_FIELDS}
+    state['score_sum'] = np.zeros(0, dtype=np.float64)
+    state['score_max'] = np.zeros(0, dtype=np.float64)
+    return state
+
+
+def _reduce(rows: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Combine rows with the same (source, target, type)."""
+    if not len(rows['count']):
+        return rows
+    order = np.lexsort((rows['target'], rows['source'], rows['type']))
+    rows = {name: values[order] for name, values in rows.items()}
+    changed = (np.diff(rows['source']) != 0) | (np.diff(rows['target']) != 0) | (np.diff(rows['type']) != 0)
+    starts = np.concatenate(([0], np.flatnonzero(changed) + 1))
+    return {
+        'source': rows['source'][starts],
+        'target': rows['target'][starts],
+        'type': rows['type'][starts],
+        'count': np.add.reduceat(rows['count'], starts),
+        'articles': np.add.reduceat(rows['articles'], starts),
+        'score_sum': np.add.reduceat(rows['score_sum'], starts),
+        'score_max': np.maximum.reduceat(rows['score_max'], starts)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge saved relationship aggregates and write them to the graph")
+    parser.add_argument('states', nargs='+', help="State files written by RelationshipAggregator.save")
+    parser.add_argument('--env', default='development', help="Configuration environment")
+    parser.add_argument('--min-count', type=int, default=1, help="Skip edges seen fewer times")
+    parser.add_argument('--dry-run', action='store_true', help="Only print the strongest edges")
+    parser.add_argument('--top', type=int, default=20, help="Edges printed with --dry-run")
+    args = parser.parse_args()
+
+    aggregator = RelationshipAggregator(min_count=args.min_count)
+    for path in args.states:
+        aggregator.merge_file(path)
+
+    if args.dry_run:
+        aggregator.report()
+        edges = sorted(aggregator.edges(), key=lambda edge: -edge['properties']['count'])[:args.top]
+        for edge in edges:
+            props = edge['properties']
+            print(f"{edge['source_id']} -[{edge['type']}]-> {edge['target_id']}: count {props['count']}, "
+                  f"articles {props['articles']}, score {props['score']:.3f}, "
+                  f"pmi {props['pmi']:.2f}")
+        return
+
+    from config import load_config
+    from graph.kg_manager import KnowledgeGraphManager
+
+    aggregator.backend = KnowledgeGraphManager.from_config(load_config(args.env))
+    try:
+        aggregator.flush()
+    finally:
+        aggregator.backend.close()
+
+if __name__ == '__main__':
+    main()
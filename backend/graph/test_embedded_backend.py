@@ -0,0 +1,137 @@
+import numpy as np
+import pytest
+
+from graph.embedded_backend import EmbeddedGraphBackend
+
+
+def _entity(entity_id, entity_type='PERSON', **properties):
+    return dict({'id': entity_id, 'type': entity_type, 'timestamp': 't0'}, **properties)
+
+
+def _relationship(source_id, target_id, rel_type='KNOWS', **properties):
+    return {'source_id': source_id, 'target_id': target_id, 'type': rel_type, 'properties': properties}
+
+
+@pytest.fixture
+def graph():
+    backend = EmbeddedGraphBackend()
+    backend.add_entities([
+        _entity('a', name='Ada'),
+        _entity('b', name='Bob'),
+        _entity('c', 'ORG', name='Corp'),
+        _entity('d', name='Dan')
+    ])
+    backend.add_relationships([
+        _relationship('a', 'b', weight=1),
+        _relationship('b', 'c', 'WORKS_AT'),
+        _relationship('c', 'd', 'EMPLOYS')
+    ])
+    return backend
+
+
+def test_add_and_get_entity(graph):
+    assert graph.get_entity('a') == {'id': 'a', 'type': 'PERSON', 'timestamp': 't0', 'name': 'Ada'}
+    assert graph.get_entity('missing') is None
+    assert set(graph.get_entities(['a', 'c', 'missing'])) == {'a', 'c'}
+
+
+def test_merge_updates_properties(graph):
+    graph.add_entity({'id': 'a', 'type': 'PERSON', 'age': 36})
+    assert graph.get_entity('a')['name'] == 'Ada'
+    assert graph.get_entity('a')['age'] == 36
+
+
+def test_create_rejects_existing_ids(graph):
+    with pytest.raises(ValueError):
+        graph.add_entity(_entity('a'), merge=False)
+    assert graph.get_entity('a')['name'] == 'Ada'
+
+    # The whole batch is rejected, including IDs repeated within it
+    with pytest.raises(ValueError):
+        graph.add_entities([_entity('e'), _entity('a')], merge=False)
+    with pytest.raises(ValueError):
+        graph.add_entities([_entity('e'), _entity('e')], merge=False)
+    assert graph.get_entity('e') is None
+
+    graph.add_entities([_entity('e', name='Eve')], merge=False)
+    assert graph.get_entity('e')['name'] == 'Eve'
+
+
+def test_relationship_needs_both_endpoints(graph):
+    graph.add_relationship(_relationship('a', 'missing'))
+    assert [r['target_id'] for r in graph.get_relationships('a')] == ['b']
+
+
+def test_merged_relationship_keeps_one_edge(graph):
+    graph.add_relationship(_relationship('a', 'b', weight=2, note='x'))
+    relationships = graph.get_relationships('a', 'KNOWS')
+    assert len(relationships) == 1
+    assert relationships[0]['properties'] == {'weight': 2, 'note': 'x'}
+
+    graph.add_relationship(_relationship('a', 'b'), merge=False)
+    assert len(graph.get_relationships('a', 'KNOWS')) == 2
+
+
+def test_get_relationships_in_both_directions(graph):
+    relationships = graph.get_relationships('b')
+    assert {(r['source_id'], r['type'], r['target_id']) for r in relationships} == {
+        ('a', 'KNOWS', 'b'), ('b', 'WORKS_AT', 'c')
+    }
+    assert graph.get_relationships('b', 'WORKS_AT')[0]['target_id'] == 'c'
+    assert graph.get_relationships('missing') == []
+
+
+def test_neighborhood_depths(graph):
+    assert set(graph.get_neighborhood('a', depth=0)['nodes']) == {'a'}
+    one_hop = graph.get_neighborhood('a', depth=1)
+    assert set(one_hop['nodes']) == {'a', 'b'}
+    assert one_hop['adjacency'] == {'a': [{'type': 'KNOWS', 'target_id': 'b', 'properties': {'weight': 1}}]}
+
+    two_hops = graph.get_neighborhood('a', depth=2)
+    assert set(two_hops['nodes']) == {'a', 'b', 'c'}
+    assert two_hops['root'] == 'a'
+    assert graph.get_neighborhood('missing') is None
+    with pytest.raises(ValueError):
+        graph.get_neighborhood('a', depth=-1)
+
+
+def test_neighborhood_filters_and_limits(graph):
+    assert set(graph.get_neighborhood('b', depth=1, rel_types=['WORKS_AT'])['nodes']) == {'b', 'c'}
+    assert len(graph.get_neighborhood('b', depth=1, limit_per_hop=1)['nodes']) == 2
+
+
+def test_iter_entities_and_pages(graph):
+    assert [e['id'] for e in graph.iter_entities()] == ['a', 'b', 'c', 'd']
+    assert [e['id'] for e in graph.iter_entities(label='ORG')] == ['c']
+    assert [e['id'] for e in graph.iter_entities(properties={'name': 'Dan'})] == ['d']
+    assert list(graph.iter_entities(fields=['name'], after_id='c')) == [{'id': 'd', 'name': 'Dan'}]
+
+    page, cursor = graph.search_entities_page(limit=3)
+    assert [e['id'] for e in page] == ['a', 'b', 'c'] and cursor == 'c'
+    page, cursor = graph.search_entities_page(limit=3, after_id=cursor)
+    assert [e['id'] for e in page] == ['d'] and cursor is None
+
+
+def test_save_and_load_round_trip(graph, tmp_path):
+    path = str(tmp_path / 'snapshot')
+    graph.save(path)
+    loaded = EmbeddedGraphBackend(path)
+
+    # Arrays stay memory-mapped until a write changes them
+    assert isinstance(loaded._node_labels, np.memmap)
+    assert all(isinstance(edges.sources, np.memmap) for edges in loaded._edges)
+
+    for entity_id in 'abcd':
+        assert loaded.get_entity(entity_id) == graph.get_entity(entity_id)
+    assert loaded.get_neighborhood('a', depth=3) == graph.get_neighborhood('a', depth=3)
+    assert [e['id'] for e in loaded.iter_entities(after_id='b')] == ['c', 'd']
+
+    # A loaded graph accepts writes and can be saved over its own snapshot
+    loaded.add_entity(_entity('e', name='Eve'))
+    loaded.add_relationship(_relationship('d', 'e'))
+    assert loaded.get_relationships('e')[0]['source_id'] == 'd'
+    assert loaded.get_neighborhood('a', depth=3)['root'] == 'a'
+    loaded.save(path)
+    reloaded = EmbeddedGraphBackend(path)
+    assert reloaded.get_entity('e')['name'] == 'Eve'
+    assert [r['source_id'] for r in reloaded.get_relationships('e')] == ['d']
@@ -0,0 +1,120 @@
+import random
+
+import pytest
+
+from graph.embedded_backend import EmbeddedGraphBackend
+from graph.relationship_aggregator import RelationshipAggregator
+
+
+def _articles(seed, count=60):
+    """Articles of relationships over a small vocabulary, so edges repeat within and across articles."""
+    rng = random.Random(seed)
+    entities = [f'E{i}' for i in range(12)]
+    return [[{'source_id': rng.choice(entities), 'target_id': rng.choice(entities),
+              'type': rng.choice(['RELATED_TO', 'PART_OF']), 'properties': {'score': round(rng.random(), 3)}}
+             for _ in range(rng.randint(1, 8))]
+            for _ in range(count)]
+
+
+def _edges(aggregator):
+    return {(e['source_id'], e['target_id'], e['type']): e['properties'] for e in aggregator.edges()}
+
+
+def _naive(articles):
+    """Per-edge count, articles, mean and max score computed directly."""
+    edges = {}
+    for index, article in enumerate(articles):
+        for rel in article:
+            edge = edges.setdefault((rel['source_id'], rel['target_id'], rel['type']),
+                                    {'scores': [], 'articles': set()})
+            edge['scores'].append(rel['properties']['score'])
+            edge['articles'].add(index)
+    return edges
+
+
+def _assert_same(actual, expected):
+    assert actual.keys() == expected.keys()
+    for key, properties in expected.items():
+        assert actual[key] == pytest.approx(properties)
+
+
+def test_aggregates_match_direct_computation():
+    articles = _articles(0)
+    aggregator = RelationshipAggregator(compact_every=7)
+    for article in articles:
+        aggregator.add(article)
+    edges = _edges(aggregator)
+
+    naive = _naive(articles)
+    assert edges.keys() == naive.keys()
+    for key, edge in naive.items():
+        assert edges[key]['count'] == len(edge['scores'])
+        assert edges[key]['articles'] == len(edge['articles'])
+        assert edges[key]['score'] == pytest.approx(sum(edge['scores']) / len(edge['scores']))
+        assert edges[key]['score_max'] == max(edge['scores'])
+    assert aggregator.occurrences == sum(len(article) for article in articles)
+
+
+def test_compaction_does_not_change_result():
+    articles = _articles(1)
+    small, large = RelationshipAggregator(compact_every=3), RelationshipAggregator(compact_every=10 ** 9)
+    for article in articles:
+        small.add(article)
+        large.add(article)
+    _assert_same(_edges(small), _edges(large))
+
+
+def test_merged_worker_states_equal_single_aggregate(tmp_path):
+    articles = _articles(2, count=90)
+    single = RelationshipAggregator()
+    for article in articles:
+        single.add(article)
+
+    # Three workers intern names in different orders; merging has to remap them
+    paths = []
+    for worker in range(3):
+        aggregator = RelationshipAggregator(compact_every=5)
+        for article in articles[worker::3]:
+            aggregator.add(article)
+        paths.append(str(tmp_path / f'worker_{worker}.npz'))
+        aggregator.save(paths[-1])
+
+    merged = RelationshipAggregator()
+    for path in reversed(paths):
+        merged.merge_file(path)
+    _assert_same(_edges(merged), _edges(single))
+    assert merged.occurrences == single.occurrences
+
+
+def test_merge_into_aggregator_with_pending_occurrences(tmp_path):
+    articles = _articles(3)
+    single = RelationshipAggregator()
+    for article in articles:
+        single.add(article)
+
+    other = RelationshipAggregator()
+    for article in articles[30:]:
+        other.add(article)
+    other.save(str(tmp_path / 'other.npz'))
+    merged = RelationshipAggregator()
+    for article in articles[:30]:
+        merged.add(article)
+    merged.merge_file(str(tmp_path / 'other.npz'))
+    _assert_same(_edges(merged), _edges(single))
+
+
+def test_flush_writes_each_edge_once_above_min_count():
+    backend = EmbeddedGraphBackend()
+    backend.add_entities([{'id': name, 'type': 'MISC', 'timestamp': 't0'} for name in 'abc'])
+    aggregator = RelationshipAggregator(backend, min_count=2, batch_size=1)
+    aggregator.add([{'source_id': 'a', 'target_id': 'b', 'type': 'R', 'properties': {'score': 0.5}}] * 2)
+    aggregator.add([{'source_id': 'a', 'target_id': 'b', 'type': 'R', 'properties': {'score': 1.0}},
+                    {'source_id': 'b', 'target_id': 'c', 'type': 'R', 'properties': {'score': 1.0}}])
+    assert aggregator.flush() == 1
+    assert len(aggregator) == 0
+
+    [edge] = backend.get_relationships('a')
+    assert edge['properties']['count'] == 3
+    assert edge['properties']['articles'] == 2
+    assert edge['properties']['score'] == pytest.approx(2 / 3)
+    assert backend.get_relationships('c') == []
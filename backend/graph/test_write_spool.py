@@ -0,0 +1,150 @@
+import json
+import os
+
+from neo4j.exceptions import ServiceUnavailable
+
+from graph.embedded_backend import EmbeddedGraphBackend
+from graph.write_spool import SpooledGraphWriter, WriteSpool
+
+
+def _records(*ids):
+    return [('entity', {'id': entity_id, 'type': 'PERSON', 'timestamp': 't0'}) for entity_id in ids]
+
+
+def test_segments_are_sealed_and_read_back(tmp_path):
+    spool = WriteSpool(str(tmp_path), fsync=False)
+    spool.append(_records('a', 'b'))
+    assert spool.sealed_segments() == []
+    assert spool.seal() == 0
+    spool.append(_records('c'))
+    assert spool.seal() == 1
+    assert spool.sealed_segments() == [0, 1]
+    assert [(line, data['id']) for line, _, data in spool.read_segment(0)] == [(0, 'a'), (1, 'b')]
+
+
+def test_size_limit_seals_segment(tmp_path):
+    spool = WriteSpool(str(tmp_path), segment_max_bytes=1, fsync=False)
+    spool.append(_records('a'))
+    spool.append(_records('b'))
+    assert spool.sealed_segments() == [0, 1]
+
+
+def test_checkpoint_skips_applied_lines(tmp_path):
+    spool = WriteSpool(str(tmp_path), fsync=False)
+    spool.append(_records('a', 'b', 'c'))
+    spool.seal()
+    spool.checkpoint(0, 2)
+    assert [data['id'] for _, _, data in spool.read_segment(0)] == ['c']
+
+    # The checkpoint survives reopening the spool
+    reopened = WriteSpool(str(tmp_path), fsync=False)
+    assert [data['id'] for _, _, data in reopened.read_segment(0)] == ['c']
+
+    reopened.remove_segment(0)
+    assert reopened.sealed_segments() == []
+    assert os.listdir(tmp_path) == []
+
+
+def test_torn_last_line_is_skipped(tmp_path):
+    spool = WriteSpool(str(tmp_path), fsync=False)
+    spool.append(_records('a'))
+    spool.seal()
+    with open(tmp_path / 'segment_00000000.log', 'a', encoding='utf-8') as f:
+        f.write('{"op": "entity", "da')
+    assert [data['id'] for _, _, data in WriteSpool(str(tmp_path)).read_segment(0)] == ['a']
+
+
+def test_reopened_spool_continues_numbering(tmp_path):
+    spool = WriteSpool(str(tmp_path), fsync=False)
+    spool.append(_records('a'))
+    spool.close()
+    reopened = WriteSpool(str(tmp_path), fsync=False)
+    reopened.append(_records('b'))
+    assert reopened.seal() == 1
+
+
+def test_writer_replays_leftover_segments(tmp_path):
+    spool = WriteSpool(str(tmp_path), fsync=False)
+    spool.append(_records('a', 'b'))
+    spool.append([('relationship', {'source_id': 'a', 'target_id': 'b', 'type': 'KNOWS', 'properties': {}})])
+    spool.close()
+
+    backend = EmbeddedGraphBackend()
+    writer = SpooledGraphWriter(backend, str(tmp_path), flush_interval=0.05)
+    assert writer.flush(timeout=10)
+    writer.close(timeout=10)
+    assert backend.get_entity('a') is not None
+    assert [r['target_id'] for r in backend.get_relationships('a')] == ['b']
+    assert writer.stats() == {'pending_segments': 0, 'records_flushed': 3, 'failed_batches': 0, 'dead_letters': 0}
+
+
+def test_writer_checkpoints_batches_and_retries(tmp_path):
+    class FlakyBackend(EmbeddedGraphBackend):
+        failures = 1
+
+        def add_entities(self, entities, merge=True):
+            if self.failures:
+                self.failures -= 1
+                raise ServiceUnavailable("database unavailable")
+            super().add_entities(entities, merge)
+
+    backend = FlakyBackend()
+    writer = SpooledGraphWriter(backend, str(tmp_path), batch_size=2, flush_interval=0.05, retry_delay=0.01)
+    writer.write([record for _, record in _records('a', 'b', 'c', 'd', 'e')], [])
+    assert writer.flush(timeout=10)
+    writer.close(timeout=10)
+    assert [e['id'] for e in backend.iter_entities()] == ['a', 'b', 'c', 'd', 'e']
+    assert writer.failed_batches == 1
+    assert writer.records_flushed == 5
+    assert os.listdir(tmp_path) == []
+
+
+def test_flush_without_writes_returns_immediately(tmp_path):
+    writer = SpooledGraphWriter(EmbeddedGraphBackend(), str(tmp_path))
+    assert writer.flush(timeout=0)
+    writer.close()
+
+
+class RejectingBackend(EmbeddedGraphBackend):
+    """Rejects entities named 'bad', like a constraint violation would."""
+
+    def add_entities(self, entities, merge=True):
+        if any(entity['id'] == 'bad' for entity in entities):
+            raise ValueError("constraint violated")
+        super().add_entities(entities, merge)
+
+
+def _dead_letters(tmp_path):
+    with open(tmp_path / 'dead_letter.log', 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_rejected_records_are_dead_lettered_and_the_rest_written(tmp_path):
+    backend = RejectingBackend()
+    writer = SpooledGraphWriter(backend, str(tmp_path), batch_size=10, flush_interval=0.05, retry_delay=0.01)
+    writer.write([record for _, record in _records('a', 'bad', 'c')], [])
+    assert writer.flush(timeout=10)
+    # Later writes keep draining
+    writer.write([record for _, record in _records('d')], [])
+    assert writer.flush(timeout=10)
+    writer.close(timeout=10)
+
+    assert [e['id'] for e in backend.iter_entities()] == ['a', 'c', 'd']
+    [dead] = _dead_letters(tmp_path)
+    assert dead['op'] == 'entity' and dead['data']['id'] == 'bad' and 'constraint violated' in dead['error']
+    assert writer.stats()['dead_letters'] == 1
+    assert writer.records_flushed == 3
+    assert os.listdir(tmp_path) == ['dead_letter.log']
+
+
+def test_batch_is_dead_lettered_after_the_last_retry(tmp_path):
+    class DownBackend(EmbeddedGraphBackend):
+        def add_entities(self, entities, merge=True):
+            raise ServiceUnavailable("database unavailable")
+
+    writer = SpooledGraphWriter(DownBackend(), str(tmp_path), flush_interval=0.05, retry_delay=0.01, max_retries=2)
+    writer.write([record for _, record in _records('a', 'b')], [])
+    assert writer.flush(timeout=10)
+    writer.close(timeout=10)
+    assert [dead['data']['id'] for dead in _dead_letters(tmp_path)] == ['a', 'b']
+    assert writer.stats() == {'pending_segments': 0, 'records_flushed': 0, 'failed_batches': 3, 'dead_letters': 2}
@@ -0,0 +1,289 @@
+import queue
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from neo4j.exceptions import ServiceUnavailable, SessionExpired, TransientError
+
+from graph.backend import GraphBackend
+from graph.kg_manager import (
+    KnowledgeGraphManager,
+    entity_batch_queries,
+    relationship_batch_queries,
+    run_batches
+)
+
+# Errors after which a write transaction is retried (deadlocks are transient)
+RETRYABLE_ERRORS = (TransientError, ServiceUnavailable, SessionExpired)
+
+
+def partition_of(node_id: str, num_partitions: int) -> int:
+    """Return the stable partition a node ID belongs to."""
+    return zlib.crc32(node_id.encode('utf-8')) % num_partitions
+
+
+def schedule_rounds(groups: Dict[Tuple[int, int], List]) -> List[List[Tuple[int, int]]]:
+    """
+    Order partition-pair groups into rounds that share no partition.
+
+    A relationship locks both of its endpoints, so the group of edges
+    between partitions ``(a, b)`` may only run alongside groups touching
+    neither ``a`` nor ``b``. Each round is a matching built greedily from
+    the largest remaining groups; edges into a hub are all in groups
+    containing the hub's partition and therefore never run concurrently.
+
+    Args:
+        groups: Mapping of ``(low, high)`` partition pair to its relationships
+
+    Returns:
+        Rounds of partition pairs
+    """
+    remaining = sorted(groups, key=lambda pair: -len(groups[pair]))
+    rounds = []
+    while remaining:
+        used = set()
+        current, deferred = [], []
+        for pair in remaining:
+            if pair[0] in used or pair[1] in used:
+                deferred.append(pair)
+            else:
+                current.append(pair)
+                used.update(pair)
+        rounds.append(current)
+        remaining = deferred
+    return rounds
+
+
+class _PartitionWriter(threading.Thread):
+    """Writer thread owning one session and applying one partition's batches."""
+
+    def __init__(self, manager: KnowledgeGraphManager, index: int, max_retries: int, stats: Dict,
+                 stats_lock: threading.Lock):
+        super().__init__(name=f"graph-writer-{index}", daemon=True)
+        self.manager = manager
+        self.max_retries = max_retries
+        self.jobs = queue.Queue()
+        self._stats = stats
+        self._stats_lock = stats_lock
+
+    def submit(self, queries: List[Tuple[str, List[Dict]]]) -> Future:
+        future = Future()
+        self.jobs.put((queries, future))
+        return future
+
+    def run(self):
+        session = self.manager.driver.session()
+        try:
+            while True:
+                job = self.jobs.get()
+                if job is None:
+                    return
+                queries, future = job
+                try:
+                    self._write(session, queries)
+                    future.set_result(None)
+                except Exception as e:
+                    future.set_exception(e)
+        finally:
+            session.close()
+
+    def _write(self, session, queries: List[Tuple[str, List[Dict]]]) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                with session.begin_transaction() as tx:
+                    run_batches(tx, queries)
+                    tx.commit()
+                self._count(commits=1, records=sum(len(batch) for _, batch in queries))
+                return
+            except RETRYABLE_ERRORS:
+                if attempt == self.max_retries:
+                    raise
+                self._count(retries=1)
+                time.sleep(min(0.05 * 2 ** attempt, 2.0))
+
+    def _count(self, **increments: int) -> None:
+        with self._stats_lock:
+            for key, value in increments.items():
+                self._stats[key] += value
+
+
+class PartitionedGraphWriter(GraphBackend):
+    """
+    Parallel graph writer that partitions upserts by a hash of node ID.
+
+    Every partition is served by a dedicated thread with its own session.
+    Entities are written by the partition of their ID, so concurrent entity
+    MERGEs never touch the same node; ``add_entities`` returns once every
+    entity partition is committed, before the caller writes relationships
+    with ``add_relationships``. Relationships lock
+    both endpoints, so they are grouped by the partition pair of their
+    endpoints and written in rounds (see ``schedule_rounds``) in which no
+    two transactions share a partition, and hence no node.
+
+    The rounds only coordinate the writers of one process: the corpus
+    driver's workers each run their own scheduler, so transactions from
+    different workers can still contend and are retried on deadlocks.
+
+    Reads are delegated to the wrapped ``KnowledgeGraphManager``.
+    """
+
+    def __init__(self, manager: KnowledgeGraphManager, num_partitions: Optional[int] = None,
+                 max_retries: int = 5):
+        """
+        Start one writer per partition.
+
+        Args:
+            manager: Manager whose driver pool the writers draw sessions from
+            num_partitions: Number of parallel writers, at most the pool size
+                (defaults to a quarter of the pool)
+            max_retries: Retries per transaction on transient errors such as deadlocks
+        """
+        pool_size = manager.max_connection_pool_size
+        self.manager = manager
+        self.num_partitions = min(num_partitions or max(1, pool_size // 4), pool_size)
+        self._stats = {'commits': 0, 'retries': 0, 'records': 0}
+        self._stats_lock = threading.Lock()
+        self._started = time.monotonic()
+        self._writers = [
+            _PartitionWriter(manager, i, max_retries, self._stats, self._stats_lock)
+            for i in range(self.num_partitions)
+        ]
+        for writer in self._writers:
+            writer.start()
+
+    @classmethod
+    def from_config(cls, manager: KnowledgeGraphManager, config: Dict) -> 'PartitionedGraphWriter':
+        """
+        Create a writer from the ``graph_writer`` section of ``load_config``.
+
+        Args:
+            manager: Manager whose driver pool the writers draw sessions from
+            config: Configuration dictionary
+
+        Returns:
+            Started PartitionedGraphWriter
+        """
+        writer_config = config.get('graph_writer', {})
+        return cls(
+            manager,
+            num_partitions=writer_config.get('partitions'),
+            max_retries=writer_config.get('max_retries', 5)
+        )
+
+    def add_entities(self, entities: List[Dict], merge: bool = True) -> None:
+        """
+        Write entities in parallel, one transaction per partition.
+
+        Args:
+            entities: Entities as accepted by ``add_entity``
+            merge: If True, merge with existing entities instead of creating new
+        """
+        partitions = [[] for _ in range(self.num_partitions)]
+        for entity in entities:
+            partitions[partition_of(entity['id'], self.num_partitions)].append(entity)
+        self._run([
+            entity_batch_queries(sorted(batch, key=lambda e: e['id']), merge) for batch in partitions
+        ])
+
+    def add_relationships(self, relationships: List[Dict], merge: bool = True) -> None:
+        """
+        Write relationships in parallel rounds of endpoint-disjoint transactions.
+
+        Args:
+            relationships: Relationships as accepted by ``add_relationship``
+            merge: If True, merge with existing relationships instead of creating new
+        """
+        groups = {}
+        for relationship in relationships:
+            source = partition_of(relationship['source_id'], self.num_partitions)
+            target = partition_of(relationship['target_id'], self.num_partitions)
+            groups.setdefault((min(source, target), max(source, target)), []).append(relationship)
+        for pairs in schedule_rounds(groups):
+            self._run([
+                relationship_batch_queries(sorted(groups[pair], key=lambda r: (r['source_id'], r['target_id'])),
+                                           merge)
+                for pair in pairs
+            ])
+
+    def add_entity(self, entity: Dict, merge: bool = True) -> None:
+        """Add a single entity through its partition writer."""
+        self.add_entities([entity], merge)
+
+    def add_relationship(self, relationship: Dict, merge: bool = True) -> None:
+        """Add a single relationship through its partition writer."""
+        self.add_relationships([relationship], merge)
+
+    def stats(self) -> Dict:
+        """
+        Return write counters.
+
+        Returns:
+            Dictionary with commits, retries, records and commits per second
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        elapsed = time.monotonic() - self._started
+        stats['commits_per_sec'] = stats['commits'] / elapsed if elapsed > 0 else 0.0
+        return stats
+
+    def report(self) -> None:
+        """Print write throughput and retry counts."""
+        stats = self.stats()
+        print(f"Graph writes: {stats['commits']} commits ({stats['commits_per_sec']:.1f}/s), "
+              f"{stats['records']} records, {stats['retries']} retries "
+              f"across {self.num_partitions} partitions")
+
+    def close(self):
+        """Stop the partition writers; the wrapped manager stays open."""
+        for writer in self._writers:
+            writer.jobs.put(None)
+        for writer in self._writers:
+            writer.join()
+
+    def _run(self, partition_queries: List[List[Tuple[str, List[Dict]]]]) -> None:
+        """Run the i-th query list on the i-th writer and wait for all of them."""
+        futures = [
+            writer.submit(queries)
+            for writer, queries in zip(self._writers, partition_queries) if queries
+        ]
+        for future in futures:
+            future.result()
+
+    def create_constraints(self) -> None:
+        """Create constraints through the wrapped manager."""
+        self.manager.create_constraints()
+
+    def clear_graph(self) -> None:
+        """Clear the graph through the wrapped manager."""
+        self.manager.clear_graph()
+
+    def get_entity(self, entity_id: str) -> Optional[Dict]:
+        """Retrieve an entity by ID from the wrapped manager."""
+        return self.manager.get_entity(entity_id)
+
+    def get_entities(self, entity_ids: List[str]) -> Dict[str, Dict]:
+        """Retrieve several entities by ID from the wrapped manager."""
+        return self.manager.get_entities(entity_ids)
+
+    def get_relationships(self, entity_id: str, rel_type: Optional[str] = None) -> List[Dict]:
+        """Get the relationships of an entity from the wrapped manager."""
+        return self.manager.get_relationships(entity_id, rel_type)
+
+    def get_neighborhood(self, entity_id: str, depth: int = 1, rel_types: Optional[List[str]] = None,
+                         limit_per_hop: int = 100) -> Optional[Dict]:
+        """Retrieve the k-hop neighborhood of an entity from the wrapped manager."""
+        return self.manager.get_neighborhood(entity_id, depth, rel_types, limit_per_hop)
+
+    def iter_entities(self, label: Optional[str] = None, properties: Dict = None,
+                      fields: Optional[List[str]] = None, fetch_size: Optional[int] = None,
+                      page_size: int = 10000, after_id: Optional[str] = None) -> Iterator[Dict]:
+        """Stream matching entities in ID order from the wrapped manager."""
+        return self.manager.iter_entities(label, properties, fields, fetch_size, page_size, after_id)
+
+    def search_entities_page(self, label: Optional[str] = None, properties: Dict = None,
+                             fields: Optional[List[str]] = None, limit: int = 100,
+                             after_id: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """Fetch one keyset page of matching entities from the wrapped manager."""
+        return self.manager.search_entities_page(label, properties, fields, limit, after_id)
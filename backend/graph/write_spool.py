@@ -0,0 +1,352 @@
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from graph.backend import GraphBackend
+from graph.write_scheduler import RETRYABLE_ERRORS
+
+SEGMENT_SUFFIX = ".log"
+CHECKPOINT_SUFFIX = ".ckpt"
+# Records that could not be written; not a segment, so never replayed
+DEAD_LETTER_FILE = "dead_letter.log"
+MAX_RETRY_DELAY = 300.0
+
+
+class WriteSpool:
+    """
+    Append-only, segmented spool of pending graph writes.
+
+    Records are JSON lines ``{"op": "entity" | "relationship", "data": {...}}``
+    appended to the active segment. Once a segment is sealed it is only read
+    by the flusher, which records its progress in a checkpoint file next to
+    the segment and deletes both when the segment is fully applied. Records
+    the backend rejects are moved to ``dead_letter.log`` with their error.
+    """
+
+    def __init__(self, directory: str, segment_max_bytes: int = 64 * 1024 * 1024, fsync: bool = True):
+        """
+        Open a spool directory, sealing any segments left by a previous run.
+
+        Args:
+            directory: Directory holding the segment files
+            segment_max_bytes: Size after which the active segment is sealed
+            fsync: If True, every append is synced to disk before returning
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        # Notified whenever a segment is removed, for ``wait_removed``
+        self._removed = threading.Condition(self._lock)
+        self._sealed = sorted(self._segment_numbers())
+        self._next_number = self._sealed[-1] + 1 if self._sealed else 0
+        self._active = None
+        self._active_number = None
+        self._active_opened = 0.0
+
+    def append(self, records: List[Tuple[str, Dict]]) -> None:
+        """
+        Durably append a group of records to the active segment.
+
+        Args:
+            records: ``(op, data)`` pairs where op is "entity" or "relationship"
+        """
+        payload = ''.join(
+            json.dumps({'op': op, 'data': data}, ensure_ascii=False) + '\n' for op, data in records
+        ).encode('utf-8')
+
+        with self._lock:
+            if self._active is None:
+                self._open_segment()
+            self._active.write(payload)
+            self._active.flush()
+            if self.fsync:
+                os.fsync(self._active.fileno())
+            if self._active.tell() >= self.segment_max_bytes:
+                self._seal_active()
+
+    def seal(self, min_age: float = 0.0) -> Optional[int]:
+        """
+        Seal the active segment so the flusher can pick it up.
+
+        Args:
+            min_age: Only seal if the segment has been open at least this many seconds
+
+        Returns:
+            Number of the newest sealed segment (None if none was ever
+            opened); with ``min_age=0`` every segment up to it is sealed
+        """
+        with self._lock:
+            if self._active is not None and time.monotonic() - self._active_opened >= min_age:
+                self._seal_active()
+            return self._next_number - 1 if self._next_number else None
+
+    def wait_removed(self, number: int, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every segment up to ``number`` has been applied and removed.
+
+        Args:
+            number: Segment number returned by ``seal``
+            timeout: Maximum number of seconds to wait
+
+        Returns:
+            True if all those segments were removed within the timeout
+        """
+        with self._removed:
+            return self._removed.wait_for(lambda: not self._sealed or self._sealed[0] > number, timeout)
+
+    def sealed_segments(self) -> List[int]:
+        """Return the numbers of sealed, not yet flushed segments in order."""
+        with self._lock:
+            return list(self._sealed)
+
+    def read_segment(self, number: int) -> Iterator[Tuple[int, str, Dict]]:
+        """
+        Yield ``(line number, op, data)`` for records not yet checkpointed.
+
+        A torn last line left by a crash is skipped.
+        """
+        done = self._read_checkpoint(number)
+        with open(self._path(number, SEGMENT_SUFFIX), 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f):
+                if line_number < done or not line.endswith('\n'):
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"Skipping corrupt record {line_number} in spool segment {number}", file=sys.stderr)
+                    continue
+                yield line_number, record['op'], record['data']
+
+    def checkpoint(self, number: int, lines_done: int) -> None:
+        """Record that the first ``lines_done`` lines of a segment are applied."""
+        path = self._path(number, CHECKPOINT_SUFFIX)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(str(lines_done))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + '.tmp', path)
+
+    def remove_segment(self, number: int) -> None:
+        """Delete a fully applied segment and its checkpoint."""
+        os.remove(self._path(number, SEGMENT_SUFFIX))
+        if os.path.exists(self._path(number, CHECKPOINT_SUFFIX)):
+            os.remove(self._path(number, CHECKPOINT_SUFFIX))
+        with self._removed:
+            self._sealed.remove(number)
+            self._removed.notify_all()
+
+    def dead_letter(self, records: List[Tuple[str, Dict]], error: str) -> None:
+        """
+        Durably set aside records that could not be applied.
+
+        Args:
+            records: ``(op, data)`` pairs as passed to ``append``
+            error: Why they failed
+        """
+        payload = ''.join(
+            json.dumps({'op': op, 'data': data, 'error': error}, ensure_ascii=False) + '\n' for op, data in records
+        ).encode('utf-8')
+        with self._lock:
+            with open(os.path.join(self.directory, DEAD_LETTER_FILE), 'ab') as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def close(self) -> None:
+        """Seal the active segment and stop accepting appends to it."""
+        self.seal()
+
+    def _open_segment(self):
+        self._active_number = self._next_number
+        self._next_number += 1
+        self._active = open(self._path(self._active_number, SEGMENT_SUFFIX), 'ab')
+        self._active_opened = time.monotonic()
+
+    def _seal_active(self):
+        self._active.close()
+        self._sealed.append(self._active_number)
+        self._active = None
+        self._active_number = None
+
+    def _read_checkpoint(self, number: int) -> int:
+        try:
+            with open(self._path(number, CHECKPOINT_SUFFIX), 'r', encoding='utf-8') as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _segment_numbers(self) -> Iterator[int]:
+        for name in os.listdir(self.directory):
+            if name.startswith('segment_') and name.endswith(SEGMENT_SUFFIX):
+                yield int(name[len('segment_'):-len(SEGMENT_SUFFIX)])
+
+    def _path(self, number: int, suffix: str) -> str:
+        return os.path.join(self.directory, f"segment_{number:08d}{suffix}")
+
+
+class SpooledGraphWriter:
+    """
+    Asynchronous graph writer backed by a crash-safe ``WriteSpool``.
+
+    ``write`` returns as soon as the records are on local disk; a background
+    thread drains sealed segments into the graph backend in batches. Batches
+    failing with transient driver errors are retried with backoff; records
+    that still fail, or that the backend rejects (e.g. a constraint
+    violation), go to the spool's dead-letter file so later segments keep
+    draining. Segments left over from a previous run are replayed first.
+    """
+
+    def __init__(self, backend: GraphBackend, spool_dir: str, batch_size: int = 500,
+                 flush_interval: float = 1.0, retry_delay: float = 5.0, max_retries: int = 8,
+                 segment_max_bytes: int = 64 * 1024 * 1024):
+        """
+        Initialize the writer and start the background flusher.
+
+        Args:
+            backend: Graph backend the spooled records are written to
+            spool_dir: Directory for spool segments
+            batch_size: Maximum number of records per backend call
+            flush_interval: Seconds after which a partly filled segment is sealed
+            retry_delay: Seconds to wait before the first retry of a failed
+                batch; doubled on every further retry
+            max_retries: Retries on transient errors before a batch is dead-lettered
+            segment_max_bytes: Size after which a segment is sealed
+        """
+        self.backend = backend
+        self.spool = WriteSpool(spool_dir, segment_max_bytes)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_delay = retry_delay
+        self.max_retries = max_retries
+        self.records_flushed = 0
+        self.failed_batches = 0
+        self.dead_letters = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="graph-spool-flusher", daemon=True)
+        self._thread.start()
+
+    def write(self, entities: List[Dict], relationships: List[Dict]) -> None:
+        """
+        Spool entities and the relationships between them.
+
+        Args:
+            entities: Entities as accepted by ``GraphBackend.add_entity``
+            relationships: Relationships as accepted by ``GraphBackend.add_relationship``
+        """
+        records = [('entity', entity) for entity in entities]
+        records.extend(('relationship', relationship) for relationship in relationships)
+        if records:
+            self.spool.append(records)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Seal the active segment and wait until everything spooled is applied.
+
+        Args:
+            timeout: Maximum number of seconds to wait
+
+        Returns:
+            True if the spool was drained within the timeout
+        """
+        newest = self.spool.seal()
+        if newest is None:
+            return True
+        # Waits on segment removal itself, so a flusher pass that started
+        # before the seal cannot report the spool drained too early
+        return self.spool.wait_removed(newest, timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Drain the spool and stop the background flusher.
+
+        Args:
+            timeout: Maximum number of seconds to wait for the drain
+        """
+        self.flush(timeout)
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict:
+        """Return counters describing the flusher's progress."""
+        return {
+            'pending_segments': len(self.spool.sealed_segments()),
+            'records_flushed': self.records_flushed,
+            'failed_batches': self.failed_batches,
+            'dead_letters': self.dead_letters
+        }
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.spool.seal(min_age=self.flush_interval)
+            segments = self.spool.sealed_segments()
+            if not segments:
+                self._stop.wait(min(self.flush_interval, 0.1))
+                continue
+            for number in segments:
+                if not self._flush_segment(number):
+                    break
+
+    def _flush_segment(self, number: int) -> bool:
+        """Apply one segment; return False if the flusher was stopped midway."""
+        batch = []
+        for line_number, op, data in self.spool.read_segment(number):
+            batch.append((op, data))
+            if len(batch) >= self.batch_size:
+                if not self._apply(batch):
+                    return False
+                self.spool.checkpoint(number, line_number + 1)
+                batch = []
+        if batch and not self._apply(batch):
+            return False
+        self.spool.remove_segment(number)
+        return True
+
+    def _apply(self, batch: List[Tuple[str, Dict]]) -> bool:
+        """Write a batch, dead-lettering what cannot be written; return False if stopped."""
+        try:
+            return self._write(batch)
+        except RETRYABLE_ERRORS as e:
+            # Out of retries: the backend is down, not the records at fault
+            self._dead_letter(batch, e)
+        except Exception as e:
+            self.failed_batches += 1
+            if len(batch) == 1:
+                self._dead_letter(batch, e)
+            else:
+                # Write the records one by one so only the rejected ones are set aside
+                for record in batch:
+                    if not self._apply([record]):
+                        return False
+        return True
+
+    def _write(self, batch: List[Tuple[str, Dict]]) -> bool:
+        """Write a batch, entities before relationships, retrying transient errors."""
+        entities = [data for op, data in batch if op == 'entity']
+        relationships = [data for op, data in batch if op == 'relationship']
+        for attempt in range(self.max_retries + 1):
+            try:
+                if entities:
+                    self.backend.add_entities(entities)
+                if relationships:
+                    self.backend.add_relationships(relationships)
+                self.records_flushed += len(batch)
+                return True
+            except RETRYABLE_ERRORS as e:
+                self.failed_batches += 1
+                if attempt == self.max_retries:
+                    raise
+                delay = min(self.retry_delay * 2 ** attempt, MAX_RETRY_DELAY)
+                print(f"Graph write failed, retrying in {delay}s: {e}", file=sys.stderr)
+                if self._stop.wait(delay):
+                    return False
+
+    def _dead_letter(self, batch: List[Tuple[str, Dict]], error: Exception) -> None:
+        self.dead_letters += len(batch)
+        self.spool.dead_letter(batch, f"{type(error).__name__}: {error}")
+        print(f"Graph write of {len(batch)} records failed, moved to the dead-letter file: {error}",
+              file=sys.stderr)
@@ -65,4 +65,70 @@ class BERTNamedEntityRecognizer:
             'end': entity['end']
         } for entity in entities]
         
-        return formatted_entities 
\ No newline at end of file
+        return formatted_entities
+
+    def predict_encoded(self, segments: List[Dict], batch_size: int = 8) -> List[List[Dict]]:
+        """
+        Perform NER on segments already tokenized by ``TextPreprocessor``.
+        
+        Segments are batched by length and padded only to the longest
+        segment in their batch; their token IDs are used as they are.
+        
+        Args:
+            segments: Segments from ``TextPreprocessor.split_into_segments``
+            batch_size: Number of segments per forward pass
+            
+        Returns:
+            One list of entities per segment, with character positions in
+            the article the segments were cut from
+        """
+        results = [[] for _ in segments]
+        order = sorted(range(len(segments)), key=lambda i: len(segments[i]['input_ids']), reverse=True)
+        pad_id = self.tokenizer.pad_token_id if self.tokenizer.pad_token_id is not None else 0
+        
+        for batch_start in range(0, len(order), batch_size):
+            batch = order[batch_start:batch_start + batch_size]
+            width = max(len(segments[i]['input_ids']) for i in batch)
+            input_ids = torch.full((len(batch), width), pad_id, dtype=torch.long)
+            attention_mask = torch.zeros((len(batch), width), dtype=torch.long)
+            for row, i in enumerate(batch):
+                length = len(segments[i]['input_ids'])
+                input_ids[row, :length] = torch.tensor(segments[i]['input_ids'], dtype=torch.long)
+                attention_mask[row, :length] = 1
+            
+            with torch.no_grad():
+                logits = self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+            scores, labels = logits.softmax(dim=-1).max(dim=-1)
+            
+            for row, i in enumerate(batch):
+                length = len(segments[i]['input_ids'])
+                results[i] = self._group_entities(segments[i], labels[row, :length].tolist(),
+                                                  scores[row, :length].tolist())
+        return results
+    
+    def _group_entities(self, segment: Dict, labels: List[int], scores: List[float]) -> List[Dict]:
+        """Merge B-/I- tagged tokens into entities (like the "simple" aggregation)."""
+        entities = []
+        current = None
+        for label_id, score, offset in zip(labels, scores, segment['offsets']):
+            if offset is None:
+                continue
+            label = self.model.config.id2label[label_id]
+            if label == 'O':
+                current = None
+                continue
+            prefix, entity_type = label.split('-', 1)
+            if current is not None and prefix == 'I' and current['type'] == entity_type:
+                current['end'] = offset[1]
+                current['scores'].append(score)
+            else:
+                current = {'type': entity_type, 'start': offset[0], 'end': offset[1], 'scores': [score]}
+                entities.append(current)
+        
+        return [{
+            'text': segment['text'][entity['start'] - segment['start']:entity['end'] - segment['start']],
+            'type': entity['type'],
+            'score': sum(entity['scores']) / len(entity['scores']),
+            'start': entity['start'],
+            'end': entity['end']
+        } for entity in entities]
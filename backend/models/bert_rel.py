@@ -1,8 +1,14 @@
 from transformers import AutoTokenizer, AutoModel
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 import torch
 import torch.nn.functional as F
 
+# Special tokens marking the two entities of a pair
+ENTITY_MARKERS = ["[E1]", "[/E1]", "[E2]", "[/E2]"]
+
+# Label of relationships found by similarity alone, without a relation classifier
+RELATED_TO = "RELATED_TO"
+
 class BERTRelationshipExtractor:
     """Relationship extraction using ModernBERT model."""
     
@@ -15,18 +21,16 @@ class BERTRelationshipExtractor:
             max_length: Maximum sequence length (8192 for ModernBERT)
         """
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-        # Initialize ModernBERT base model
-        self.model = AutoModel.from_pretrained(
-            model_name,
-            add_pooling_layer=True  # Ensure we get the pooled output for relationship scoring
-        )
+        # Initialize ModernBERT base model (it has no pooling layer; the [CLS] state is used below)
+        self.model = AutoModel.from_pretrained(model_name)
         self.model.eval()
         self.max_length = max_length
         
         # Add special tokens for entity marking
-        special_tokens = {"additional_special_tokens": ["[E1]", "[/E1]", "[E2]", "[/E2]"]}
+        special_tokens = {"additional_special_tokens": ENTITY_MARKERS}
         self.tokenizer.add_special_tokens(special_tokens)
         self.model.resize_token_embeddings(len(self.tokenizer))
+        self.marker_ids = self.tokenizer.convert_tokens_to_ids(special_tokens["additional_special_tokens"])
         
     def extract_relationships(self, text: str, entities: List[Dict]) -> List[Dict]:
         """
@@ -37,7 +41,8 @@ class BERTRelationshipExtractor:
             entities: List of entities detected by NER
             
         Returns:
-            List of relationships between entities
+            List of relationships between entities, each labelled with its
+            relation ``type``
         """
         if len(entities) < 2:
             return []
@@ -77,7 +82,81 @@ class BERTRelationshipExtractor:
                         'source_type': entity1['type'],
                         'target': entity2['text'],
                         'target_type': entity2['type'],
+                        'type': RELATED_TO,
                         'score': similarity
                     })
         
-        return relationships 
\ No newline at end of file
+        return relationships 
+    
+    def extract_relationships_encoded(self, segment: Dict, entities: List[Dict],
+                                      batch_size: int = 16) -> List[Dict]:
+        """
+        Extract relationships from a segment already tokenized by ``TextPreprocessor``.
+        
+        Instead of re-tokenizing a marked copy of the text for every pair,
+        the marker token IDs are spliced into the segment's ``input_ids`` at
+        the token boundaries of the two entities, and the pairs of a segment
+        are scored in batches (all rows have the same length). Segments must
+        leave room for the markers (``max_length - len(ENTITY_MARKERS)``
+        tokens); rows are never truncated, as that could cut off a marker,
+        so the pairs of a longer segment are skipped.
+        
+        Args:
+            segment: Segment from ``TextPreprocessor.split_into_segments``
+            entities: Entities of the segment with character positions in
+                the article, as returned by ``BERTNERModel.predict_encoded``
+            batch_size: Number of entity pairs per forward pass
+            
+        Returns:
+            List of relationships between entities, each labelled with its
+            relation ``type``
+        """
+        input_ids = segment['input_ids']
+        if len(input_ids) + len(self.marker_ids) > self.max_length:
+            return []
+        spans = [self._token_span(segment['offsets'], entity) for entity in entities]
+        pairs = [
+            (i, j) for i in range(len(entities)) for j in range(i + 1, len(entities))
+            if spans[i] is not None and spans[j] is not None and spans[i][1] <= spans[j][0]
+        ]
+        e1, e1_end, e2, e2_end = self.marker_ids
+        relationships = []
+        
+        for batch_start in range(0, len(pairs), batch_size):
+            batch = pairs[batch_start:batch_start + batch_size]
+            rows = []
+            for i, j in batch:
+                (start1, end1), (start2, end2) = spans[i], spans[j]
+                rows.append(
+                    input_ids[:start1] + [e1] + input_ids[start1:end1] + [e1_end]
+                    + input_ids[end1:start2] + [e2] + input_ids[start2:end2] + [e2_end] + input_ids[end2:]
+                )
+            
+            with torch.no_grad():
+                outputs = self.model(input_ids=torch.tensor(rows, dtype=torch.long))
+                embeddings = outputs.last_hidden_state[:, 0, :]  # Use [CLS] token embedding
+            
+            # Simple relationship scoring using cosine similarity
+            similarities = F.cosine_similarity(embeddings, embeddings).tolist()
+            
+            for (i, j), similarity in zip(batch, similarities):
+                if similarity > 0.5:  # Threshold for relationship detection
+                    relationships.append({
+                        'source': entities[i]['text'],
+                        'source_type': entities[i]['type'],
+                        'target': entities[j]['text'],
+                        'target_type': entities[j]['type'],
+                        'type': RELATED_TO,
+                        'score': similarity
+                    })
+        
+        return relationships
+    
+    @staticmethod
+    def _token_span(offsets: List[Optional[Tuple[int, int]]], entity: Dict) -> Optional[Tuple[int, int]]:
+        """Token range ``[first, last)`` of the tokens overlapping an entity, or None."""
+        tokens = [
+            i for i, offset in enumerate(offsets)
+            if offset is not None and offset[0] < entity['end'] and offset[1] > entity['start']
+        ]
+        return (tokens[0], tokens[-1] + 1) if tokens else None
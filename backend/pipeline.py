@@ -1,35 +1,84 @@
+import os
 from typing import List, Dict
 from models.bert_ner import BERTNamedEntityRecognizer
-from models.bert_rel import BERTRelationshipExtractor
+from models.bert_rel import ENTITY_MARKERS, RELATED_TO, BERTRelationshipExtractor
 from data_processing.wiki_parser import WikipediaParser
 from data_processing.text_preprocessor import TextPreprocessor
+from data_processing.instrumentation import DISABLED, Metrics
+from data_processing.near_duplicates import NearDuplicateIndex
 from graph.kg_manager import KnowledgeGraphManager
+from graph.write_scheduler import PartitionedGraphWriter
+from graph.write_spool import SpooledGraphWriter
+from graph.relationship_aggregator import RelationshipAggregator
 
 class WikipediaKGPipeline:
     """Pipeline for processing Wikipedia articles and building knowledge graph."""
     
-    def __init__(self, config: Dict):
+    def __init__(self, config: Dict, metrics: Metrics = DISABLED):
         """
         Initialize pipeline components.
         
         Args:
             config: Configuration dictionary
+            metrics: Records per-stage timings and volumes (disabled by default)
         """
-        self.wiki_parser = WikipediaParser()
-        self.preprocessor = TextPreprocessor()
+        self.metrics = metrics
+        self.wiki_parser = WikipediaParser.from_config(config)
         self.ner_model = BERTNamedEntityRecognizer(
             model_name=config['bert']['model_name'],
             max_length=config['bert']['max_length']
         )
+        # Segments are tokenized once with the NER tokenizer and packed to a token budget
+        # that leaves room for the relation extractor's entity markers
+        self.preprocessor = TextPreprocessor(
+            tokenizer=self.ner_model.tokenizer,
+            max_tokens=min(config.get('preprocessing', {}).get('max_tokens', 512),
+                           config['bert']['max_length'] - len(ENTITY_MARKERS))
+        )
         self.rel_model = BERTRelationshipExtractor(
             model_name=config['bert']['model_name'],
             max_length=config['bert']['max_length']
         )
-        self.kg_manager = KnowledgeGraphManager(
-            uri=config['database']['uri'],
-            user=config['database']['username'],
-            password=config['database']['password']
-        )
+        self.kg_manager = KnowledgeGraphManager.from_config(config)
+        
+        # Write through partitioned parallel writers if configured
+        writer_config = config.get('graph_writer', {})
+        self.graph_backend = self.kg_manager
+        if writer_config.get('partitions'):
+            self.graph_backend = PartitionedGraphWriter.from_config(self.kg_manager, config)
+        
+        # Spool graph writes locally and flush them in the background if configured
+        self.graph_writer = None
+        if writer_config.get('spool_dir'):
+            self.graph_writer = SpooledGraphWriter(
+                self.graph_backend,
+                spool_dir=writer_config['spool_dir'],
+                batch_size=writer_config.get('batch_size', 500),
+                flush_interval=writer_config.get('flush_interval', 1.0),
+                max_retries=writer_config.get('spool_max_retries', 8)
+            )
+        
+        # Aggregate relationships over the whole run and write each distinct edge once on close
+        self.aggregator = None
+        self.aggregate_state = writer_config.get('aggregate_state')
+        if writer_config.get('aggregate') or self.aggregate_state:
+            self.aggregator = RelationshipAggregator(
+                self.graph_backend,
+                min_count=writer_config.get('aggregate_min_count', 1)
+            )
+        
+        # Reuse the extraction results of sections already processed in this or earlier runs
+        self.near_duplicates = None
+        dedup_config = config.get('near_duplicates', {})
+        if dedup_config.get('index'):
+            self.near_duplicates = NearDuplicateIndex(
+                dedup_config['index'],
+                threshold=dedup_config.get('threshold', 0.9),
+                num_perm=dedup_config.get('num_perm', 128),
+                shingle_size=dedup_config.get('shingle_size', 5),
+                min_shingles=dedup_config.get('min_shingles', 20),
+                recall=dedup_config.get('recall', 0.95)
+            )
     
     def process_article(self, title: str) -> Dict:
         """
@@ -41,37 +90,150 @@ class WikipediaKGPipeline:
         Returns:
             Dictionary with processing statistics
         """
+        metrics = self.metrics
+        
         # Fetch article
-        article_data = self.wiki_parser.get_article(title)
+        with metrics.stage('parse'):
+            article_data = self.wiki_parser.get_article(title)
         if not article_data:
+            metrics.count('articles_missing')
             return {'error': f'Article {title} not found'}
             
         # Preprocess text
-        clean_text = self.preprocessor.clean_text(article_data['text'])
-        segments = self.preprocessor.split_into_segments(clean_text)
+        with metrics.stage('clean'):
+            clean_text = self.preprocessor.clean_text(article_data['text'])
+        with metrics.stage('segment'):
+            segments = self.preprocessor.split_into_segments(clean_text)
+        
+        # Skip inference on sections that (nearly) repeat an already processed one
+        reuse = None
+        if self.near_duplicates:
+            with metrics.stage('near_duplicates'):
+                reuse = self.near_duplicates.article(clean_text, segments)
+            segments = reuse.segments
+        
+        # Extract entities from all segments in padded batches
+        with metrics.stage('ner'):
+            segment_entities = self.ner_model.predict_encoded(segments)
         
         # Process each segment
         all_entities = []
         all_relationships = []
         
-        for segment in segments:
-            # Extract entities
-            entities = self.ner_model.predict(segment)
-            all_entities.extend(entities)
-            
-            # Extract relationships
-            relationships = self.rel_model.extract_relationships(segment, entities)
-            all_relationships.extend(relationships)
+        with metrics.stage('relation'):
+            for segment, entities in zip(segments, segment_entities):
+                all_entities.extend(entities)
+                
+                # Extract relationships on the segment's tokens (entity positions in the article)
+                relationships = self.rel_model.extract_relationships_encoded(segment, entities)
+                all_relationships.extend(relationships)
+                if reuse:
+                    reuse.record(segment, entities, relationships)
+        
+        if reuse:
+            all_entities.extend(reuse.entities)
+            all_relationships.extend(reuse.relationships)
+            reuse.commit()
             
         # Add to knowledge graph
-        for entity in all_entities:
-            self.kg_manager.add_entity(entity)
-            
-        for relationship in all_relationships:
-            self.kg_manager.add_relationship(relationship)
+        with metrics.stage('graph_write'):
+            graph_entities = [to_graph_entity(entity, title) for entity in all_entities]
+            graph_relationships = [to_graph_relationship(rel, title) for rel in all_relationships]
+            if self.aggregator:
+                self.aggregator.add(graph_relationships)
+                graph_relationships = []
+                # Repeated mentions would only MERGE the same node again
+                graph_entities = list({entity['id']: entity for entity in graph_entities}.values())
+            if self.graph_writer:
+                self.graph_writer.write(graph_entities, graph_relationships)
+            else:
+                self.graph_backend.add_entities(graph_entities)
+                self.graph_backend.add_relationships(graph_relationships)
+        
+        if metrics.enabled:
+            metrics.count('articles')
+            metrics.count('bytes', len(article_data['text'].encode('utf-8')))
+            metrics.count('segments', len(segments))
+            metrics.count('tokens', sum(len(segment['input_ids']) for segment in segments))
+            metrics.count('entities', len(all_entities))
+            metrics.count('relationships', len(all_relationships))
+            if reuse:
+                for match in reuse.matches:
+                    metrics.cache('near_duplicates', match is not None)
+                metrics.count('segments_skipped', reuse.skipped_segments)
+                metrics.count('tokens_skipped', reuse.skipped_tokens)
             
         return {
             'title': title,
             'entities_found': len(all_entities),
             'relationships_found': len(all_relationships)
-        } 
\ No newline at end of file
+        }
+    
+    def close(self):
+        """Flush pending graph writes and close the database connection and article store."""
+        if self.graph_writer:
+            self.graph_writer.close()
+        if self.aggregator:
+            # After the entity writes, since relationships MATCH their end nodes
+            if self.aggregate_state:
+                # One state file per process ('{pid}' in the path); merge them with relationship_aggregator.py
+                self.aggregator.save(self.aggregate_state.format(pid=os.getpid()))
+                self.aggregator.report()
+            else:
+                self.aggregator.flush()
+        if self.graph_backend is not self.kg_manager:
+            self.graph_backend.report()
+            self.graph_backend.close()
+        if self.near_duplicates:
+            self.near_duplicates.report()
+            self.near_duplicates.close()
+        self.kg_manager.close()
+        self.wiki_parser.close()
+
+
+def entity_id(text: str, ner_type: str) -> str:
+    """Build a stable graph ID for an extracted entity mention."""
+    return f"{ner_type}:{' '.join(text.split()).lower()}"
+
+
+def to_graph_entity(entity: Dict, source: str) -> Dict:
+    """
+    Convert an NER prediction into a graph entity.
+    
+    Args:
+        entity: Entity predicted by ``BERTNamedEntityRecognizer``
+        source: Title of the article the entity was found in
+        
+    Returns:
+        Entity as accepted by ``KnowledgeGraphManager.add_entity``
+    """
+    return {
+        'id': entity_id(entity['text'], entity['type']),
+        'type': 'Entity',
+        'name': entity['text'],
+        'ner_type': entity['type'],
+        'source': source
+    }
+
+
+def to_graph_relationship(relationship: Dict, source: str) -> Dict:
+    """
+    Convert an extracted relationship into a graph relationship.
+    
+    The relation label becomes the relationship type, so aggregated edges
+    keep one weight per type. Results reused from a near-duplicate index
+    written before labels were recorded count as ``RELATED_TO``.
+    
+    Args:
+        relationship: Relationship predicted by ``BERTRelationshipExtractor``
+        source: Title of the article the relationship was found in
+        
+    Returns:
+        Relationship as accepted by ``KnowledgeGraphManager.add_relationship``
+    """
+    return {
+        'source_id': entity_id(relationship['source'], relationship['source_type']),
+        'target_id': entity_id(relationship['target'], relationship['target_type']),
+        'type': relationship.get('type', RELATED_TO),
+        'properties': {'score': relationship['score'], 'source': source}
+    }
@@ -0,0 +1,64 @@
+from typing import List
+
+import numpy as np
+import torch
+from transformers import AutoModel, AutoTokenizer
+
+
+class SectionEncoder:
+    """Embeds text with ModernBERT by mean pooling over the last hidden state."""
+
+    def __init__(self, model_name: str = "answerdotai/ModernBERT-base", max_length: int = 512,
+                 batch_size: int = 32, device: str = None):
+        """
+        Initialize the encoder.
+
+        Args:
+            model_name: Pre-trained ModernBERT model name
+            max_length: Maximum tokens per section; longer sections are truncated
+            batch_size: Sections per forward pass
+            device: Torch device, defaults to CUDA when available
+        """
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModel.from_pretrained(model_name)
+        self.device = device or ('cuda' if torch.cuda.is_available() else 'cpu')
+        self.model.to(self.device)
+        self.model.eval()
+        self.max_length = max_length
+        self.batch_size = batch_size
+
+    @property
+    def dim(self) -> int:
+        return self.model.config.hidden_size
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts into L2-normalized float16 vectors.
+
+        Texts are sorted by length before batching so each batch is padded
+        only to its own longest text.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            Array of shape (len(texts), dim)
+        """
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float16)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            inputs = self.tokenizer(
+                [texts[i] for i in batch],
+                return_tensors="pt",
+                max_length=self.max_length,
+                truncation=True,
+                padding=True
+            ).to(self.device)
+            with torch.no_grad():
+                hidden = self.model(**inputs).last_hidden_state
+            mask = inputs['attention_mask'].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+            pooled = torch.nn.functional.normalize(pooled.float(), dim=-1)
+            vectors[batch] = pooled.cpu().numpy().astype(np.float16)
+        return vectors
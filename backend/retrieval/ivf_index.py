@@ -0,0 +1,181 @@
+import json
+import os
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+INDEX_FILES = ('centroids', 'list_indptr', 'list_rows')
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _assign(vectors, centroids: np.ndarray, chunk: int = 65536) -> np.ndarray:
+    """Nearest centroid (by inner product) for every row, in chunks."""
+    labels = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), chunk):
+        block = np.asarray(vectors[start:start + chunk], dtype=np.float32)
+        labels[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return labels
+
+
+def train_centroids(vectors, nlist: int, iterations: int = 15, sample_size: Optional[int] = None,
+                    seed: int = 0) -> np.ndarray:
+    """
+    Spherical k-means on a sample of the vectors.
+
+    Args:
+        vectors: (n, dim) array or memmap of normalized vectors
+        nlist: Number of clusters
+        iterations: Lloyd iterations
+        sample_size: Training sample size (default: 64 points per cluster)
+        seed: Random seed
+
+    Returns:
+        (nlist, dim) float32 array of normalized centroids
+    """
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vectors), sample_size or 64 * nlist)
+    sample = np.sort(rng.choice(len(vectors), sample_size, replace=False))
+    sample = np.asarray(vectors[sample], dtype=np.float32)
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        labels = _assign(sample, centroids)
+        counts = np.bincount(labels, minlength=nlist)
+        order = np.argsort(labels, kind='stable')
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        nonempty = counts > 0
+        sums = np.zeros_like(centroids)
+        sums[nonempty] = np.add.reduceat(sample[order], starts[nonempty], axis=0)
+        # Re-seed empty clusters with random sample points
+        empty = np.flatnonzero(counts == 0)
+        sums[empty] = sample[rng.choice(len(sample), len(empty), replace=False)]
+        centroids = _normalize(sums)
+    return centroids
+
+
+class IVFIndex:
+    """
+    Inverted-file approximate nearest-neighbor index over a SectionStore.
+
+    Vectors are clustered around ``nlist`` centroids; every list holds the
+    store rows of its cluster, sorted so each list is one contiguous slice
+    of ``list_rows``. A query scores the centroids, scans the ``nprobe``
+    closest lists with one matrix product and keeps the top ``k``.
+    """
+
+    def __init__(self, centroids: np.ndarray, list_indptr: np.ndarray, list_rows: np.ndarray,
+                 list_vectors: np.ndarray):
+        self.centroids = centroids
+        self.list_indptr = list_indptr
+        self.list_rows = list_rows
+        self.list_vectors = list_vectors
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, vectors, index_dir: str, nlist: Optional[int] = None, **train_args) -> 'IVFIndex':
+        """
+        Train and write an index for the rows of ``vectors``.
+
+        The vectors are copied in list order into ``list_vectors.f16`` so
+        that scanning a list reads contiguous memory.
+
+        Args:
+            vectors: (n, dim) float16 matrix, e.g. ``SectionStore.vectors``
+            index_dir: Output directory
+            nlist: Number of lists (default: about 4 * sqrt(n))
+            **train_args: Passed to ``train_centroids``
+
+        Returns:
+            Loaded IVFIndex
+        """
+        start = time.time()
+        num_vectors, dim = vectors.shape
+        nlist = max(1, min(num_vectors, nlist or int(4 * np.sqrt(num_vectors))))
+        centroids = train_centroids(vectors, nlist, **train_args)
+        labels = _assign(vectors, centroids)
+        list_rows = np.argsort(labels, kind='stable').astype(np.int64)
+        list_indptr = np.concatenate(([0], np.cumsum(np.bincount(labels, minlength=nlist)))).astype(np.int64)
+
+        os.makedirs(index_dir, exist_ok=True)
+        np.save(os.path.join(index_dir, 'centroids.npy'), centroids)
+        np.save(os.path.join(index_dir, 'list_indptr.npy'), list_indptr)
+        np.save(os.path.join(index_dir, 'list_rows.npy'), list_rows)
+        with open(os.path.join(index_dir, 'list_vectors.f16'), 'wb') as f:
+            for chunk in range(0, num_vectors, 65536):
+                rows = np.sort(list_rows[chunk:chunk + 65536])
+                block = np.asarray(vectors[rows], dtype=np.float16)
+                # Restore list order within the chunk after the sorted (sequential) read
+                f.write(block[np.argsort(np.argsort(list_rows[chunk:chunk + 65536]))].tobytes())
+        with open(os.path.join(index_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({'dim': dim, 'count': num_vectors, 'nlist': nlist}, f)
+        print(f"Built IVF index with {nlist} lists over {num_vectors} vectors in {time.time() - start:.1f}s")
+        return cls.load(index_dir)
+
+    @classmethod
+    def load(cls, index_dir: str) -> 'IVFIndex':
+        """Memory-map an index written by ``build``."""
+        with open(os.path.join(index_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(index_dir, f'{name}.npy'), mmap_mode='r') for name in INDEX_FILES}
+        arrays['centroids'] = np.asarray(arrays['centroids'])
+        arrays['list_vectors'] = np.memmap(os.path.join(index_dir, 'list_vectors.f16'), dtype=np.float16,
+                                           mode='r', shape=(meta['count'], meta['dim']))
+        return cls(**arrays)
+
+    def search(self, query: np.ndarray, k: int = 10, nprobe: int = 16,
+               row_mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the rows with the highest inner product with ``query``.
+
+        Args:
+            query: (dim,) query vector, normalized like the indexed vectors
+            k: Number of results
+            nprobe: Number of lists to scan
+            row_mask: Optional boolean array over store rows; only rows where
+                it is True are returned
+
+        Returns:
+            Tuple of (store rows, scores), best first
+        """
+        query = _normalize(query)
+        nprobe = min(nprobe, self.nlist)
+        probe = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+
+        positions = [np.arange(self.list_indptr[l], self.list_indptr[l + 1]) for l in probe]
+        positions = np.concatenate(positions) if positions else np.zeros(0, dtype=np.int64)
+        rows = np.asarray(self.list_rows[positions])
+        if row_mask is not None:
+            keep = row_mask[rows]
+            positions, rows = positions[keep], rows[keep]
+        if not len(rows):
+            return rows, np.zeros(0, dtype=np.float32)
+
+        scores = np.asarray(self.list_vectors[positions], dtype=np.float32) @ query
+        return _top_k(rows, scores, k)
+
+
+def _top_k(rows: np.ndarray, scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    if len(scores) > k:
+        best = np.argpartition(-scores, k - 1)[:k]
+        rows, scores = rows[best], scores[best]
+    order = np.argsort(-scores, kind='stable')
+    return rows[order], scores[order]
+
+
+def exact_search(vectors, rows: np.ndarray, query: np.ndarray, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+    """Score only the given store rows; used when a filter leaves few candidates."""
+    query = _normalize(query)
+    rows = np.sort(np.asarray(rows, dtype=np.int64))
+    if not len(rows):
+        return rows, np.zeros(0, dtype=np.float32)
+    scores = np.asarray(vectors[rows], dtype=np.float32) @ query
+    return _top_k(rows, scores, k)
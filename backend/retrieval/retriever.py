@@ -0,0 +1,186 @@
+import argparse
+import os
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+
+from retrieval.ivf_index import IVFIndex, exact_search
+from retrieval.section_store import SectionStore
+
+
+class SectionRetriever:
+    """
+    Top-k section retrieval over a SectionStore.
+
+    Unfiltered queries go through the IVF index. Queries restricted to a
+    set of pages score those pages' sections exactly when there are few of
+    them, and fall back to a masked IVF search otherwise. A masked search
+    can find fewer than ``k`` allowed sections in the probed lists; it is
+    then retried with more lists and finally scored exactly.
+    """
+
+    def __init__(self, store_dir: str, index_dir: Optional[str] = None, encoder=None,
+                 title_resolver: Optional[Callable[[str], Optional[int]]] = None,
+                 exact_threshold: int = 50000):
+        """
+        Args:
+            store_dir: Directory written by ``build_section_store``
+            index_dir: Directory written by ``IVFIndex.build``; without it
+                every query is scored exactly
+            encoder: Encoder for text queries (e.g. SectionEncoder)
+            title_resolver: Maps article titles to page IDs for neighborhood
+                filtering (e.g. ``TitleLookup.id_of``)
+            exact_threshold: Filtered queries with at most this many candidate
+                sections are scored exactly
+        """
+        self.store = SectionStore(store_dir)
+        self.index = IVFIndex.load(index_dir) if index_dir else None
+        self.encoder = encoder
+        self.title_resolver = title_resolver
+        self.exact_threshold = exact_threshold
+
+        # Sections of a page are stored contiguously; index the runs by page ID
+        page_ids = np.asarray(self.store.page_ids)
+        starts = np.flatnonzero(np.concatenate(([True], page_ids[1:] != page_ids[:-1]))) if len(page_ids) \
+            else np.zeros(0, dtype=np.int64)
+        ends = np.append(starts[1:], len(page_ids))
+        order = np.argsort(page_ids[starts], kind='stable')
+        self._run_pages = page_ids[starts][order]
+        self._run_starts = starts[order]
+        self._run_ends = ends[order]
+
+    def rows_for_pages(self, page_ids: Iterable[int]) -> np.ndarray:
+        """Return the store rows of all sections of the given pages."""
+        page_ids = np.unique(np.fromiter(page_ids, dtype=np.int64))
+        lo = np.searchsorted(self._run_pages, page_ids, side='left')
+        hi = np.searchsorted(self._run_pages, page_ids, side='right')
+        ranges = [np.arange(self._run_starts[i], self._run_ends[i])
+                  for first, last in zip(lo, hi) for i in range(first, last)]
+        return np.concatenate(ranges) if ranges else np.zeros(0, dtype=np.int64)
+
+    def search(self, query: Union[str, np.ndarray], k: int = 10, page_ids: Optional[Iterable[int]] = None,
+               nprobe: int = 16) -> List[Dict]:
+        """
+        Retrieve the sections closest to a query.
+
+        Args:
+            query: Query text (needs an encoder) or query vector
+            k: Number of results
+            page_ids: Optional pages to restrict the results to
+            nprobe: IVF lists scanned per query
+
+        Returns:
+            List of dicts with ``page_id``, ``section`` and ``score``, best first
+        """
+        vector = self.encoder.encode([query])[0] if isinstance(query, str) else query
+        if page_ids is not None:
+            rows = self.rows_for_pages(page_ids)
+            if self.index is None or len(rows) <= self.exact_threshold:
+                rows, scores = exact_search(self.store.vectors, rows, vector, k)
+            else:
+                rows, scores = self._masked_search(vector, rows, k, nprobe)
+        elif self.index is not None:
+            rows, scores = self.index.search(vector, k, nprobe)
+        else:
+            rows, scores = exact_search(self.store.vectors, np.arange(len(self.store)), vector, k)
+
+        return [{
+            'page_id': int(self.store.page_ids[row]),
+            'section': int(self.store.sections[row]),
+            'score': float(score)
+        } for row, score in zip(rows, scores)]
+
+    def _masked_search(self, vector: np.ndarray, rows: np.ndarray, k: int, nprobe: int,
+                       widen: int = 4):
+        """IVF search restricted to ``rows``, guaranteeing min(k, len(rows)) results."""
+        mask = np.zeros(len(self.store), dtype=bool)
+        mask[rows] = True
+        wanted = min(k, len(rows))
+        found, scores = self.index.search(vector, k, nprobe, row_mask=mask)
+        if len(found) < wanted and nprobe < self.index.nlist:
+            found, scores = self.index.search(vector, k, nprobe * widen, row_mask=mask)
+        if len(found) < wanted:
+            found, scores = exact_search(self.store.vectors, rows, vector, k)
+        return found, scores
+
+    def search_neighborhood(self, query: Union[str, np.ndarray], backend, node_id: str, depth: int = 1,
+                            k: int = 10, nprobe: int = 16) -> List[Dict]:
+        """
+        Retrieve sections from the articles a graph node's neighborhood was extracted from.
+
+        Args:
+            query: Query text or vector
+            backend: GraphBackend holding the node
+            node_id: ID of the node at the center of the neighborhood
+            depth: Number of hops to expand
+            k: Number of results
+            nprobe: IVF lists scanned if the filter is large
+
+        Returns:
+            Results as returned by ``search``; empty if the node is unknown
+        """
+        if self.title_resolver is None:
+            raise ValueError("search_neighborhood needs a title_resolver")
+        neighborhood = backend.get_neighborhood(node_id, depth)
+        if neighborhood is None:
+            return []
+        titles = {node.get('source') for node in neighborhood['nodes'].values()} - {None}
+        page_ids = [page_id for page_id in map(self.title_resolver, titles) if page_id is not None]
+        return self.search(query, k, page_ids=page_ids, nprobe=nprobe)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embed article sections and build or query the ANN index")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help="Embed sections and build the index")
+    build.add_argument('processed_dir', help="Directory with process_all_pages output")
+    build.add_argument('--store', default='section_store', help="Section store directory")
+    build.add_argument('--index', default='section_index', help="IVF index directory")
+    build.add_argument('--model', default='answerdotai/ModernBERT-base', help="Encoder model")
+    build.add_argument('--max-length', type=int, default=512, help="Maximum tokens per section")
+    build.add_argument('--batch-size', type=int, default=32, help="Sections per forward pass")
+    build.add_argument('--nlist', type=int, help="Number of IVF lists (default: 4 * sqrt(n))")
+    build.add_argument('--skip-embedding', action='store_true', help="Only rebuild the index")
+
+    query = subparsers.add_parser('query', help="Query the index")
+    query.add_argument('--store', default='section_store', help="Section store directory")
+    query.add_argument('--index', default='section_index', help="IVF index directory")
+    query.add_argument('--model', default='answerdotai/ModernBERT-base', help="Encoder model")
+    query.add_argument('--text', help="Query text")
+    query.add_argument('--k', type=int, default=10, help="Number of results")
+    query.add_argument('--nprobe', type=int, default=16, help="IVF lists scanned per query")
+    query.add_argument('--benchmark', type=int, default=0,
+                       help="Time this many queries using stored vectors instead of --text")
+
+    args = parser.parse_args()
+    if args.command == 'build':
+        if not args.skip_embedding:
+            from retrieval.encoder import SectionEncoder
+            from retrieval.section_store import build_section_store
+            encoder = SectionEncoder(args.model, args.max_length, args.batch_size)
+            build_section_store(args.processed_dir, args.store, encoder, workers=os.cpu_count())
+        IVFIndex.build(SectionStore(args.store).vectors, args.index, args.nlist)
+        return
+
+    retriever = SectionRetriever(args.store, args.index)
+    if args.benchmark:
+        rng = np.random.default_rng(0)
+        queries = np.asarray(retriever.store.vectors[np.sort(rng.choice(len(retriever.store), args.benchmark))])
+        latencies = []
+        for vector in queries:
+            start = time.perf_counter()
+            retriever.search(vector, args.k, nprobe=args.nprobe)
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        print(f"{len(latencies)} queries: p50 {1000 * latencies[len(latencies) // 2]:.2f} ms, "
+              f"p99 {1000 * latencies[int(0.99 * (len(latencies) - 1))]:.2f} ms")
+    if args.text:
+        from retrieval.encoder import SectionEncoder
+        retriever.encoder = SectionEncoder(args.model)
+        for result in retriever.search(args.text, args.k, nprobe=args.nprobe):
+            print(f"{result['page_id']}\t{result['section']}\t{result['score']:.4f}")
+
+if __name__ == '__main__':
+    main()
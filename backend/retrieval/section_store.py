@@ -0,0 +1,95 @@
+import json
+import os
+import time
+from array import array
+from typing import Iterator, List, Tuple
+
+import numpy as np
+from tqdm import tqdm
+
+from data_processing.corpus_reader import CorpusReader
+
+STORE_FILES = ('page_ids', 'sections')
+
+
+def iter_sections(page) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (section number, text) for every non-empty section of a processed page.
+
+    Sections and their subsections are numbered in document order, the same
+    order ``WikipediaParser.get_article`` joins them in.
+    """
+    number = 0
+    for section in page['sections']:
+        for block in [section] + section['subsections']:
+            if block['content']:
+                title = block['title'] if block['title'] != 'Introduction' else page['title']
+                yield number, f"{title}\n{block['content']}"
+            number += 1
+
+
+class SectionStore:
+    """
+    Float16 section embeddings in a memory-mapped matrix.
+
+    Row ``i`` of ``vectors`` embeds section ``sections[i]`` of page
+    ``page_ids[i]``. Rows are appended in corpus order, so the matrix can
+    be written incrementally without knowing its size up front.
+    """
+
+    def __init__(self, store_dir: str):
+        with open(os.path.join(store_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.dim = self.meta['dim']
+        count = self.meta['count']
+        self.vectors = np.memmap(os.path.join(store_dir, 'vectors.f16'), dtype=np.float16, mode='r',
+                                 shape=(count, self.dim)) if count else np.zeros((0, self.dim), np.float16)
+        for name in STORE_FILES:
+            setattr(self, name, np.load(os.path.join(store_dir, f'{name}.npy'), mmap_mode='r'))
+
+    def __len__(self) -> int:
+        return len(self.page_ids)
+
+
+def build_section_store(processed_dir: str, store_dir: str, encoder, batch_sections: int = 4096,
+                        workers: int = 1) -> int:
+    """
+    Embed every section of the ``process_all_pages`` shards.
+
+    Args:
+        processed_dir: Directory with ``wiki_pages_*.jsonl`` shards
+        store_dir: Output directory
+        encoder: Object with ``dim`` and ``encode(texts)``, e.g. SectionEncoder
+        batch_sections: Sections collected before each call to the encoder
+        workers: Reader processes for the shards
+
+    Returns:
+        Number of embedded sections
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    page_ids, sections = array('q'), array('i')
+    texts: List[str] = []
+    start = time.time()
+
+    with open(os.path.join(store_dir, 'vectors.f16'), 'wb') as out:
+        def flush():
+            out.write(np.ascontiguousarray(encoder.encode(texts), dtype=np.float16).tobytes())
+            texts.clear()
+
+        reader = CorpusReader(processed_dir, fields=('id', 'title', 'sections'), workers=workers)
+        for page in tqdm(reader, desc="Embedding sections"):
+            for number, text in iter_sections(page):
+                page_ids.append(int(page['id']))
+                sections.append(number)
+                texts.append(text)
+                if len(texts) >= batch_sections:
+                    flush()
+        if texts:
+            flush()
+
+    np.save(os.path.join(store_dir, 'page_ids.npy'), np.frombuffer(page_ids, dtype=np.int64))
+    np.save(os.path.join(store_dir, 'sections.npy'), np.frombuffer(sections, dtype=np.int32))
+    with open(os.path.join(store_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({'dim': encoder.dim, 'count': len(page_ids)}, f)
+    print(f"Embedded {len(page_ids)} sections in {time.time() - start:.1f}s")
+    return len(page_ids)
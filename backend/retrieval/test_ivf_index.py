@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from retrieval.ivf_index import IVFIndex, exact_search, train_centroids
+
+
+def _vectors(rng, count, dim=16, clusters=8):
+    centers = rng.normal(size=(clusters, dim))
+    vectors = centers[rng.integers(clusters, size=count)] + 0.3 * rng.normal(size=(count, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float16)
+
+
+@pytest.fixture(scope='module')
+def data():
+    return _vectors(np.random.default_rng(0), 3000)
+
+
+@pytest.fixture(scope='module')
+def index(data, tmp_path_factory):
+    return IVFIndex.build(data, str(tmp_path_factory.mktemp('ivf')), nlist=32)
+
+
+def _brute_force(data, query, k, rows=None):
+    rows = np.arange(len(data)) if rows is None else np.sort(rows)
+    scores = data[rows].astype(np.float32) @ (query / np.linalg.norm(query))
+    return rows[np.argsort(-scores, kind='stable')[:k]]
+
+
+def test_lists_partition_all_rows(index, data):
+    assert index.nlist == 32
+    assert index.list_indptr[-1] == len(data)
+    assert sorted(index.list_rows.tolist()) == list(range(len(data)))
+    # Vectors are stored in list order
+    np.testing.assert_array_equal(index.list_vectors, data[np.asarray(index.list_rows)])
+
+
+def test_centroids_are_normalized(data):
+    centroids = train_centroids(data, 8, iterations=5)
+    np.testing.assert_allclose(np.linalg.norm(centroids, axis=1), 1.0, rtol=1e-5)
+
+
+def test_probing_every_list_is_exact(index, data):
+    rng = np.random.default_rng(1)
+    for query in rng.normal(size=(10, 16)):
+        rows, scores = index.search(query, k=10, nprobe=index.nlist)
+        np.testing.assert_array_equal(rows, _brute_force(data, query, 10))
+        assert np.all(np.diff(scores) <= 0)
+
+
+def test_recall_with_few_probes(index, data):
+    queries = data[np.random.default_rng(2).choice(len(data), 50, replace=False)].astype(np.float32)
+    recall = np.mean([
+        len(set(index.search(query, k=10, nprobe=4)[0]) & set(_brute_force(data, query, 10))) / 10
+        for query in queries
+    ])
+    assert recall >= 0.9
+
+
+def test_row_mask_restricts_results(index, data):
+    allowed = np.random.default_rng(3).choice(len(data), 300, replace=False)
+    mask = np.zeros(len(data), dtype=bool)
+    mask[allowed] = True
+    query = data[allowed[0]].astype(np.float32)
+    rows, _ = index.search(query, k=10, nprobe=index.nlist, row_mask=mask)
+    assert set(rows) <= set(allowed)
+    np.testing.assert_array_equal(rows, _brute_force(data, query, 10, allowed))
+
+
+def test_load_matches_build(index, data, tmp_path):
+    IVFIndex.build(data, str(tmp_path), nlist=32)
+    loaded = IVFIndex.load(str(tmp_path))
+    query = data[7].astype(np.float32)
+    np.testing.assert_array_equal(loaded.search(query, 5, 32)[0], index.search(query, 5, 32)[0])
+
+
+def test_exact_search(data):
+    rows = np.array([5, 1, 900, 42])
+    query = data[42].astype(np.float32)
+    found, scores = exact_search(data, rows, query, k=2)
+    assert found[0] == 42 and len(found) == 2
+    assert exact_search(data, np.zeros(0, dtype=np.int64), query)[0].size == 0
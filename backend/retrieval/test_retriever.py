@@ -0,0 +1,48 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from retrieval.ivf_index import IVFIndex
+from retrieval.retriever import SectionRetriever
+
+
+@pytest.fixture(scope='module')
+def store_dir(tmp_path_factory):
+    """Section store of 500 pages with 4 sections each, and an IVF index over it."""
+    path = str(tmp_path_factory.mktemp('store'))
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(2000, 16))
+    vectors = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float16)
+    vectors.tofile(os.path.join(path, 'vectors.f16'))
+    np.save(os.path.join(path, 'page_ids.npy'), np.repeat(np.arange(500) * 10, 4).astype(np.int64))
+    np.save(os.path.join(path, 'sections.npy'), np.tile(np.arange(4), 500).astype(np.int32))
+    with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({'dim': 16, 'count': 2000}, f)
+    IVFIndex.build(vectors, os.path.join(path, 'index'), nlist=64)
+    return path
+
+
+def test_rows_for_pages(store_dir):
+    retriever = SectionRetriever(store_dir)
+    assert retriever.rows_for_pages([10, 0, 10]).tolist() == [0, 1, 2, 3, 4, 5, 6, 7]
+    assert retriever.rows_for_pages([5]).size == 0
+
+
+@pytest.mark.parametrize('exact_threshold', [0, 100000])
+def test_filtered_search_returns_k_results_from_the_pages(store_dir, exact_threshold):
+    retriever = SectionRetriever(store_dir, os.path.join(store_dir, 'index'), exact_threshold=exact_threshold)
+    pages = [30, 2000, 4990]
+    exact = SectionRetriever(store_dir).search(np.ones(16), k=10, page_ids=pages)
+    # One probed list rarely holds ten of these twelve sections: the search must widen or fall back
+    results = retriever.search(np.ones(16), k=10, page_ids=pages, nprobe=1)
+    assert results == exact
+    assert len(results) == 10 and {r['page_id'] for r in results} <= set(pages)
+
+
+def test_unfiltered_search(store_dir):
+    retriever = SectionRetriever(store_dir, os.path.join(store_dir, 'index'))
+    query = np.asarray(retriever.store.vectors[123], dtype=np.float32)
+    best = retriever.search(query, k=3, nprobe=8)[0]
+    assert best == {'page_id': 300, 'section': 3, 'score': pytest.approx(1, abs=1e-2)}
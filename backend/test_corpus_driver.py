@@ -0,0 +1,106 @@
+import json
+import os
+import time
+
+import pytest
+
+import corpus_driver
+from corpus_driver import LeaseLost, Manifest, _worker_main, run_worker
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    page_index = tmp_path / 'page_index.jsonl'
+    page_index.write_text(''.join(json.dumps({'id': i, 'title': f'Page {i}', 'file': 'x'}) + '\n'
+                                  for i in range(5)), encoding='utf-8')
+    manifest = Manifest(str(tmp_path / 'manifest'), lease_timeout=60)
+    assert manifest.create(str(page_index), unit_size=2) == 3
+    return manifest
+
+
+def _expire(lease):
+    old = time.time() - 3600
+    os.utime(lease, (old, old))
+
+
+def test_create_splits_pages_into_units(manifest, tmp_path):
+    assert manifest.counts() == {'pending': 3, 'leased': 0, 'done': 0}
+    with pytest.raises(FileExistsError):
+        manifest.create(str(tmp_path / 'page_index.jsonl'))
+
+
+def test_claims_are_exclusive_and_in_order(manifest):
+    claims = [manifest.claim(f'worker-{i}') for i in range(4)]
+    assert [unit['unit'] for _, unit in claims[:3]] == [0, 1, 2]
+    assert claims[0][1]['pages'] == [{'id': 0, 'title': 'Page 0'}, {'id': 1, 'title': 'Page 1'}]
+    assert claims[3] is None
+    assert manifest.counts() == {'pending': 0, 'leased': 3, 'done': 0}
+    assert '@worker-1@' in claims[1][0]
+
+
+def test_fresh_lease_is_not_reclaimed(manifest):
+    manifest.claim('worker')
+    assert manifest.reclaim_expired() == 0
+    assert manifest.counts()['leased'] == 1
+
+
+def test_expired_lease_is_reclaimed_and_old_owner_loses_it(manifest):
+    lease, unit = manifest.claim('slow-worker')
+    _expire(lease)
+    assert manifest.reclaim_expired() == 1
+    assert manifest.counts() == {'pending': 3, 'leased': 0, 'done': 0}
+
+    with pytest.raises(LeaseLost):
+        manifest.heartbeat(lease)
+    with pytest.raises(LeaseLost):
+        manifest.complete(lease, unit, [], {})
+
+    # The unit is claimed again, first in line
+    new_lease, again = manifest.claim('fast-worker')
+    assert again['unit'] == unit['unit']
+    manifest.complete(new_lease, again, [{'id': 0}], {'unit': again['unit'], 'pages': 2})
+    assert manifest.counts() == {'pending': 2, 'leased': 0, 'done': 1}
+    assert list(manifest.iter_stats()) == [{'unit': 0, 'pages': 2}]
+
+
+def test_heartbeat_keeps_lease_alive(manifest):
+    lease, _ = manifest.claim('worker')
+    _expire(lease)
+    manifest.heartbeat(lease)
+    assert manifest.reclaim_expired() == 0
+
+
+def test_run_worker_completes_all_units_and_records_errors(manifest):
+    def process_page(page):
+        if page['id'] == 3:
+            raise ValueError("bad page")
+        return {'title': page['title'], 'entities_found': 1}
+
+    assert run_worker(manifest, process_page, 'worker', idle_wait=0) == 3
+    assert manifest.counts() == {'pending': 0, 'leased': 0, 'done': 3}
+    stats = list(manifest.iter_stats())
+    assert sum(s['pages'] for s in stats) == 5
+    assert sum(s['errors'] for s in stats) == 1
+    assert sum(s['entities'] for s in stats) == 4
+
+
+@pytest.mark.parametrize('fail', [False, True])
+def test_worker_closes_its_processor(manifest, monkeypatch, fail):
+    closed = []
+
+    def processor(config, metrics):
+        def process_page(page):
+            if fail:
+                raise KeyboardInterrupt
+            return {'title': page['title']}
+        return process_page, lambda: closed.append(True)
+
+    monkeypatch.setitem(corpus_driver.PROCESSORS, 'fake', processor)
+    monkeypatch.setattr(corpus_driver, '_load_config', lambda env, processed_dir: {})
+    if fail:
+        with pytest.raises(KeyboardInterrupt):
+            _worker_main(manifest.path, 60, 'fake', 'test', None, 'worker')
+    else:
+        _worker_main(manifest.path, 60, 'fake', 'test', None, 'worker')
+        assert manifest.counts()['done'] == 3
+    assert closed == [True]
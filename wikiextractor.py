@@ -1,9 +1,10 @@
 import subprocess
 import sys
 import os
-import json
 from pathlib import Path
 
+from backend.data_processing.corpus_reader import CorpusReader
+
 def process_wiki_dump(input_file, output_dir, options=None):
     """
     Process Wikipedia XML dump using WikiExtractor.
@@ -72,24 +73,19 @@ def process_wiki_dump(input_file, output_dir, options=None):
     # Run WikiExtractor as a subprocess
     subprocess.run(cmd, check=True)
 
-def read_extracted_files(output_dir):
+def read_extracted_files(output_dir, fields=None, workers=1):
     """
     Generator function to read and yield extracted articles.
     
     Args:
         output_dir (str): Directory containing extracted files
+        fields (list, optional): Only decode these top-level fields
+        workers (int): Number of reader processes
         
     Yields:
         dict: Article data including title, text, and metadata
     """
-    for root, _, files in os.walk(output_dir):
-        for file in files:
-            if file.startswith('wiki_'):
-                file_path = os.path.join(root, file)
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        if line.strip():
-                            yield json.loads(line)
+    yield from CorpusReader(output_dir, fields=fields, workers=workers)
 
 if __name__ == "__main__":
     # Example usage